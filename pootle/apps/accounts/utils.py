@@ -220,31 +220,33 @@ class UserPurger(object):
         """
         stores = set()
         # Revert unit comments where self.user is latest commenter.
-        for unit_change in self.user.commented.select_related("unit").iterator():
-            unit = unit_change.unit
-            stores.add(unit.store)
-
-            # Find comments by other self.users
-            comments = unit.get_comments().exclude(submitter=self.user)
-            change = {}
-            if comments.exists():
-                # If there are previous comments by others update the
-                # translator_comment, commented_by, and commented_on
-                last_comment = comments.latest('pk')
-                translator_comment = last_comment.new_value
-                change["commented_by_id"] = last_comment.submitter_id
-                change["commented_on"] = last_comment.creation_time
-                logger.debug("Unit comment reverted: %s", repr(unit))
-            else:
-                translator_comment = ""
-                change["commented_by"] = None
-                change["commented_on"] = None
-                logger.debug("Unit comment removed: %s", repr(unit))
-            unit_change.__class__.objects.filter(id=unit_change.id).update(
-                **change)
-            unit.__class__.objects.filter(id=unit.id).update(
-                translator_comment=translator_comment,
-                revision=Revision.incr())
+        commented = self.user.commented.select_related("unit")
+        with Revision.reserved(commented.count()):
+            for unit_change in commented.iterator():
+                unit = unit_change.unit
+                stores.add(unit.store)
+
+                # Find comments by other self.users
+                comments = unit.get_comments().exclude(submitter=self.user)
+                change = {}
+                if comments.exists():
+                    # If there are previous comments by others update the
+                    # translator_comment, commented_by, and commented_on
+                    last_comment = comments.latest('pk')
+                    translator_comment = last_comment.new_value
+                    change["commented_by_id"] = last_comment.submitter_id
+                    change["commented_on"] = last_comment.creation_time
+                    logger.debug("Unit comment reverted: %s", repr(unit))
+                else:
+                    translator_comment = ""
+                    change["commented_by"] = None
+                    change["commented_on"] = None
+                    logger.debug("Unit comment removed: %s", repr(unit))
+                unit_change.__class__.objects.filter(id=unit_change.id).update(
+                    **change)
+                unit.__class__.objects.filter(id=unit.id).update(
+                    translator_comment=translator_comment,
+                    revision=Revision.incr())
         return stores
 
     @write_stdout(" * Reverting units edited by: %(user)s... ")
@@ -253,35 +255,37 @@ class UserPurger(object):
         """
         stores = set()
         # Revert unit target where user is the last submitter.
-        for unit_change in self.user.submitted.select_related("unit").iterator():
-            unit = unit_change.unit
-            stores.add(unit.store)
+        submitted = self.user.submitted.select_related("unit")
+        with Revision.reserved(submitted.count()):
+            for unit_change in submitted.iterator():
+                unit = unit_change.unit
+                stores.add(unit.store)
+
+                # Find the last submission by different user that updated the
+                # unit.target.
+                edits = unit.get_edits().exclude(submitter=self.user)
+                updates = {}
+                unit_updates = {}
+                if edits.exists():
+                    last_edit = edits.latest("pk")
+                    unit_updates["target_f"] = last_edit.new_value
+                    updates["submitted_by_id"] = last_edit.submitter_id
+                    updates["submitted_on"] = last_edit.creation_time
+                    logger.debug("Unit edit reverted: %s", repr(unit))
+                else:
+                    # if there is no previous submissions set the target to "" and
+                    # set the unit.change.submitted_by to None
+                    unit_updates["target_f"] = ""
+                    updates["submitted_by"] = None
+                    updates["submitted_on"] = unit.creation_time
+                    logger.debug("Unit edit removed: %s", repr(unit))
 
-            # Find the last submission by different user that updated the
-            # unit.target.
-            edits = unit.get_edits().exclude(submitter=self.user)
-            updates = {}
-            unit_updates = {}
-            if edits.exists():
-                last_edit = edits.latest("pk")
-                unit_updates["target_f"] = last_edit.new_value
-                updates["submitted_by_id"] = last_edit.submitter_id
-                updates["submitted_on"] = last_edit.creation_time
-                logger.debug("Unit edit reverted: %s", repr(unit))
-            else:
-                # if there is no previous submissions set the target to "" and
-                # set the unit.change.submitted_by to None
-                unit_updates["target_f"] = ""
-                updates["submitted_by"] = None
-                updates["submitted_on"] = unit.creation_time
-                logger.debug("Unit edit removed: %s", repr(unit))
-
-            # Increment revision
-            unit_change.__class__.objects.filter(id=unit_change.id).update(
-                **updates)
-            unit.__class__.objects.filter(id=unit.id).update(
-                revision=Revision.incr(),
-                **unit_updates)
+                # Increment revision
+                unit_change.__class__.objects.filter(id=unit_change.id).update(
+                    **updates)
+                unit.__class__.objects.filter(id=unit.id).update(
+                    revision=Revision.incr(),
+                    **unit_updates)
         return stores
 
     @write_stdout(" * Reverting units reviewed by: %(user)s... ")
@@ -314,34 +318,36 @@ class UserPurger(object):
             # Remove the review.
             review.delete()
 
-        for unit_change in self.user.reviewed.select_related("unit").iterator():
-            unit = unit_change.unit
-            stores.add(unit.store)
-            unit.suggestion_set.filter(reviewer=self.user).update(
-                state=SuggestionState.objects.get(name="pending"),
-                reviewer=None)
-            unit_updates = {}
-            updates = {}
-            if not unit.target:
-                unit_updates["state"] = UNTRANSLATED
-                updates["reviewed_by"] = None
-                updates["reviewed_on"] = None
-            else:
-                old_state_sub = unit.submission_set.exclude(
-                    submitter=self.user).filter(
-                        field=SubmissionFields.STATE).order_by(
-                            "-creation_time", "-pk").first()
-                if old_state_sub:
-                    unit_updates["state"] = old_state_sub.new_value
-                    updates["reviewed_by"] = old_state_sub.submitter
-                    updates["reviewed_on"] = old_state_sub.creation_time
-            logger.debug("Unit reviewed_by removed: %s", repr(unit))
-            unit_change.__class__.objects.filter(id=unit_change.id).update(
-                **updates)
-            # Increment revision
-            unit.__class__.objects.filter(id=unit.id).update(
-                revision=Revision.incr(),
-                **unit_updates)
+        reviewed = self.user.reviewed.select_related("unit")
+        with Revision.reserved(reviewed.count()):
+            for unit_change in reviewed.iterator():
+                unit = unit_change.unit
+                stores.add(unit.store)
+                unit.suggestion_set.filter(reviewer=self.user).update(
+                    state=SuggestionState.objects.get(name="pending"),
+                    reviewer=None)
+                unit_updates = {}
+                updates = {}
+                if not unit.target:
+                    unit_updates["state"] = UNTRANSLATED
+                    updates["reviewed_by"] = None
+                    updates["reviewed_on"] = None
+                else:
+                    old_state_sub = unit.submission_set.exclude(
+                        submitter=self.user).filter(
+                            field=SubmissionFields.STATE).order_by(
+                                "-creation_time", "-pk").first()
+                    if old_state_sub:
+                        unit_updates["state"] = old_state_sub.new_value
+                        updates["reviewed_by"] = old_state_sub.submitter
+                        updates["reviewed_on"] = old_state_sub.creation_time
+                logger.debug("Unit reviewed_by removed: %s", repr(unit))
+                unit_change.__class__.objects.filter(id=unit_change.id).update(
+                    **updates)
+                # Increment revision
+                unit.__class__.objects.filter(id=unit.id).update(
+                    revision=Revision.incr(),
+                    **unit_updates)
         return stores
 
     @write_stdout(" * Reverting unit state changes by: %(user)s... ")
@@ -352,35 +358,37 @@ class UserPurger(object):
         # Delete orphaned submissions.
         self.user.submission_set.filter(unit__isnull=True).delete()
 
-        for submission in self.user.get_unit_states_changed().iterator():
-            unit = submission.unit
-            stores.add(unit.store)
-
-            # We have to get latest by pk as on mysql precision is not to
-            # microseconds - so creation_time can be ambiguous
-            if submission != unit.get_state_changes().latest('pk'):
-                # If the unit has been changed more recently we don't need to
-                # revert the unit state.
+        state_changes = self.user.get_unit_states_changed()
+        with Revision.reserved(state_changes.count()):
+            for submission in state_changes.iterator():
+                unit = submission.unit
+                stores.add(unit.store)
+
+                # We have to get latest by pk as on mysql precision is not to
+                # microseconds - so creation_time can be ambiguous
+                if submission != unit.get_state_changes().latest('pk'):
+                    # If the unit has been changed more recently we don't need to
+                    # revert the unit state.
+                    submission.delete()
+                    return
                 submission.delete()
-                return
-            submission.delete()
-            other_submissions = (unit.get_state_changes()
-                                     .exclude(submitter=self.user))
-            if other_submissions.exists():
-                new_state = other_submissions.latest('pk').new_value
-            else:
-                new_state = UNTRANSLATED
-            if new_state != unit.state:
-                if unit.state == FUZZY:
-                    unit.markfuzzy(False)
-                elif new_state == FUZZY:
-                    unit.markfuzzy(True)
-                unit.state = new_state
-
-                # Increment revision
-                unit.__class__.objects.filter(id=unit.id).update(
-                    revision=Revision.incr())
-                logger.debug("Unit state reverted: %s", repr(unit))
+                other_submissions = (unit.get_state_changes()
+                                         .exclude(submitter=self.user))
+                if other_submissions.exists():
+                    new_state = other_submissions.latest('pk').new_value
+                else:
+                    new_state = UNTRANSLATED
+                if new_state != unit.state:
+                    if unit.state == FUZZY:
+                        unit.markfuzzy(False)
+                    elif new_state == FUZZY:
+                        unit.markfuzzy(True)
+                    unit.state = new_state
+
+                    # Increment revision
+                    unit.__class__.objects.filter(id=unit.id).update(
+                        revision=Revision.incr())
+                    logger.debug("Unit state reverted: %s", repr(unit))
         return stores
 
 
@@ -57,7 +57,7 @@ class Command(PootleCommand):
     def _create_zip(self, stores, prefix):
         with open("%s.zip" % (prefix), "wb") as f:
             with ZipFile(f, "w") as zf:
-                for store in stores:
+                for store in stores.iterator():
                     zf.writestr(prefix + store.pootle_path, store.serialize())
 
         self.stdout.write("Created %s\n" % (f.name))
@@ -119,7 +119,8 @@ class Command(PootleCommand):
         if stores.count() == 1:
             store = stores.get()
             with open(os.path.basename(store.pootle_path), "wb") as f:
-                f.write(store.serialize())
+                for chunk in store.stream():
+                    f.write(chunk)
 
             self.stdout.write("Created '%s'" % (f.name))
             return
@@ -32,6 +32,45 @@ from .exceptions import (FileImportError, MissingPootlePathError,
 logger = logging.getLogger(__name__)
 
 
+class ZipStreamBuffer(object):
+    """Write-only file object for streaming a `ZipFile` as it is written"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.offset += len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(stores, prefix):
+    """Yields a zip file of serialized stores, one store at a time"""
+    buf = ZipStreamBuffer()
+    with ZipFile(buf, "w") as zf:
+        for store in stores.iterator():
+            try:
+                data = store.serialize()
+            except Exception as e:
+                logger.error("Could not serialize %r: %s",
+                             store.pootle_path, e)
+                continue
+            zf.writestr(prefix + store.pootle_path, data)
+            yield buf.pop()
+    yield buf.pop()
+
+
 def import_file(f, user=None):
     ttk = getclass(f)(f.read())
     if not hasattr(ttk, "parseheader"):
@@ -6,13 +6,11 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-import logging
 import os
-from io import BytesIO
 from zipfile import ZipFile, is_zipfile
 
 from django.contrib.auth import get_user_model
-from django.http import Http404, HttpResponse
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import redirect
 
 from pootle.core.delegate import language_team
@@ -22,11 +20,11 @@ from pootle_store.models import Store
 from pootle_translationproject.views import TPDirectoryMixin
 
 from .forms import UploadForm
-from .utils import TPTMXExporter, import_file
+from .utils import TPTMXExporter, import_file, stream_zip
 
 
 def download(contents, name, content_type):
-    response = HttpResponse(contents, content_type=content_type)
+    response = StreamingHttpResponse(contents, content_type=content_type)
     response["Content-Disposition"] = "attachment; filename=%s" % (name)
     return response
 
@@ -48,28 +46,19 @@ def export(request):
 
     if num_items == 1:
         store = stores.get()
-        contents = BytesIO(store.serialize())
-        name = os.path.basename(store.pootle_path)
-        contents.seek(0)
-        return download(contents.read(), name, "application/octet-stream")
+        return download(
+            store.stream(),
+            os.path.basename(store.pootle_path),
+            "application/octet-stream")
 
     # zip all the stores together
-    f = BytesIO()
     prefix = path.strip("/").replace("/", "-")
     if not prefix:
         prefix = "export"
-    with BytesIO() as f:
-        with ZipFile(f, "w") as zf:
-            for store in stores:
-                try:
-                    data = store.serialize()
-                except Exception as e:
-                    logging.error("Could not serialize %r: %s",
-                                  store.pootle_path, e)
-                    continue
-                zf.writestr(prefix + store.pootle_path, data)
-
-        return download(f.getvalue(), "%s.zip" % (prefix), "application/zip")
+    return download(
+        stream_zip(stores, prefix),
+        "%s.zip" % (prefix),
+        "application/zip")
 
 
 def handle_upload_form(request, tp):
@@ -30,3 +30,4 @@ class PootleConfig(AppConfig):
         checks.register(deprecation.check_deprecated_settings, "settings")
         importlib.import_module("pootle_app.getters")
         importlib.import_module("pootle_app.providers")
+        importlib.import_module("pootle_app.receivers")
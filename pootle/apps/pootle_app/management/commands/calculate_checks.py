@@ -12,6 +12,7 @@ import os
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
 from pootle.core.signals import update_checks
+from pootle_checks.utils import ParallelQCUpdater
 from pootle_translationproject.models import TranslationProject
 
 from . import PootleCommand
@@ -30,8 +31,28 @@ class Command(PootleCommand):
             default=None,
             help='Check to recalculate',
         )
+        parser.add_argument(
+            '--jobs',
+            action='store',
+            dest='jobs',
+            type=int,
+            default=None,
+            help='Number of processes to run the checkers in',
+        )
 
-    def update_checks(self, check_names, translation_project=None):
+    def update_checks(self, check_names, translation_project=None,
+                      jobs=None):
+        if jobs:
+            updater = ParallelQCUpdater(
+                check_names=check_names,
+                translation_project=translation_project,
+                jobs=jobs)
+            updater.update(clear_unknown=True, update_data_after=True)
+            for pid, (count, elapsed) in sorted(updater.worker_stats.items()):
+                self.stdout.write(
+                    u"Worker %s checked %s units in %.2fs"
+                    % (pid, count, elapsed))
+            return
         update_checks.send(
             TranslationProject,
             check_names=check_names,
@@ -42,11 +63,16 @@ class Command(PootleCommand):
     def handle_all_stores(self, translation_project, **options):
         self.stdout.write(u"Running %s for %s" %
                           (self.name, translation_project))
-        self.update_checks(options["check_names"], translation_project)
+        self.update_checks(
+            options["check_names"],
+            translation_project,
+            jobs=options["jobs"])
 
     def handle_all(self, **options):
         if not self.projects and not self.languages:
             self.stdout.write(u"Running %s (noargs)" % self.name)
-            self.update_checks(options["check_names"])
+            self.update_checks(
+                options["check_names"],
+                jobs=options["jobs"])
         else:
             super(Command, self).handle_all(**options)
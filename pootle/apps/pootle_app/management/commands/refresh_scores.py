@@ -9,9 +9,11 @@
 import os
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 from pootle.core.delegate import score_updater
+from pootle_score.updater import IncrementalScoreUpdater
 from pootle_translationproject.models import TranslationProject
 
 from . import PootleCommand
@@ -29,6 +31,13 @@ class Command(PootleCommand):
             default=False,
             help='Reset all scores to zero',
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            dest='incremental',
+            default=False,
+            help='Only add scores for events since the last refresh',
+        )
         parser.add_argument(
             '--user',
             action='append',
@@ -52,11 +61,31 @@ class Command(PootleCommand):
             updater.refresh_scores(users)
 
     def handle_all(self, **options):
+        if options["incremental"]:
+            scores = IncrementalScoreUpdater().update()
+            self.stdout.write(
+                "Added scores for %s users in %s stores"
+                % (len(set(k[2] for k in scores)),
+                   len(set(k[0] for k in scores))))
+            return
         if not self.projects and not self.languages:
             users = self.get_users(**options)
-            if options["reset"]:
-                score_updater.get(get_user_model())(users=users).clear()
-            else:
-                score_updater.get(get_user_model())().refresh_scores(users)
+            if users:
+                if options["reset"]:
+                    score_updater.get(get_user_model())(users=users).clear()
+                else:
+                    score_updater.get(get_user_model())().refresh_scores(users)
+                return
+            incremental = IncrementalScoreUpdater()
+            # events before the refresh started are scored by it, and later
+            # events incrementally
+            with incremental.refreshing() as timestamp:
+                if options["reset"]:
+                    score_updater.get(get_user_model())(users=users).clear()
+                else:
+                    score_updater.get(get_user_model())().refresh_scores(
+                        end=timestamp)
+            if settings.POOTLE_SCORE_INCREMENTAL:
+                incremental.update()
         else:
             super(Command, self).handle_all(**options)
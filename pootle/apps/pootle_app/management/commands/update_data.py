@@ -11,6 +11,7 @@ import os
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
 from pootle.core.signals import update_data
+from pootle_data.tp_data import TPDataReconciler
 from pootle_app.management.commands import PootleCommand
 from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
@@ -29,6 +30,21 @@ class Command(PootleCommand):
             action='append',
             dest='stores',
             help='Store to update data')
+        parser.add_argument(
+            '--reconcile',
+            action='store_true',
+            dest='reconcile',
+            default=False,
+            help='Verify and repair translation project data')
+
+    def handle_reconcile(self, tps):
+        for tp in tps:
+            drift = TPDataReconciler(tp).reconcile()
+            if drift:
+                logger.warning(
+                    "Repaired data for translation project %s: %s",
+                    tp.pootle_path,
+                    ", ".join(sorted(drift.keys())))
 
     def handle_stores(self, stores):
         stores = Store.objects.filter(pootle_path__in=stores)
@@ -56,6 +72,8 @@ class Command(PootleCommand):
             tps = tps.filter(project__code__in=projects)
         if languages:
             tps = tps.filter(language__code__in=languages)
+        if options.get("reconcile"):
+            return self.handle_reconcile(tps)
         for tp in tps:
             for store in tp.stores.all():
                 update_data.send(store.__class__, instance=store)
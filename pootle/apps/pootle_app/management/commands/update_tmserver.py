@@ -8,6 +8,7 @@
 
 import os
 from hashlib import md5
+from multiprocessing.pool import ThreadPool
 
 # This must be run before importing Django.
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
@@ -16,12 +17,19 @@ from elasticsearch import Elasticsearch, helpers
 from translate.storage import factory
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand, CommandError
-from django.utils import dateparse
+from django.db import connection
 from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
 
+from pootle.core.delegate import revision
+from pootle.core.search import LocalTMBackend
+from pootle.core.search.broker import update_tm_revision
 from pootle.core.utils import dateformat
-from pootle_store.models import Unit
+from pootle_revision.models import Revision
+from pootle_store.models import Store, Unit
 from pootle_translationproject.models import TranslationProject
 
 
@@ -50,20 +58,45 @@ class DBParser(BaseParser):
         super(DBParser, self).__init__(*args, **kwargs)
 
         self.exclude_disabled_projects = not kwargs.pop('disabled_projects')
-        self.tp_pk = None
+        self.last_indexed_revision = -1
 
-    def get_units(self):
-        """Gets the units to import and its total count."""
+    @cached_property
+    def users(self):
+        """Username, display name and email hash of every user, so that
+        they are not retrieved and hashed for each unit.
+        """
+        users = {}
+        for pk, username, full_name, email in get_user_model().objects.values_list(
+                'id', 'username', 'full_name', 'email').iterator():
+            users[pk] = (
+                username,
+                full_name or username,
+                md5(force_bytes(email)).hexdigest() if email else None)
+        return users
+
+    def get_tp_context(self, tp_pk):
+        """Returns the data shared by the units of a TP."""
+        tp = TranslationProject.objects.select_related(
+            'project', 'language').get(pk=tp_pk)
+        return dict(
+            project=tp.project.fullname,
+            language=tp.language.code,
+            paths=dict(
+                Store.objects.filter(
+                    translation_project_id=tp_pk).values_list(
+                        'id', 'pootle_path')))
+
+    def get_units(self, tp_pk, revision=None):
+        """Gets the units of a TP changed after `revision`, ordered by
+        revision, and their total count.
+        """
+        if revision is None:
+            revision = self.last_indexed_revision
         units_qs = (
             Unit.objects.exclude(target_f__isnull=True)
                         .exclude(target_f__exact='')
-                        .filter(store__translation_project__pk=self.tp_pk)
-                        .filter(revision__gt=self.last_indexed_revision))
-        units_qs = units_qs.select_related(
-            'change__submitted_by',
-            'store',
-            'store__translation_project__project',
-            'store__translation_project__language')
+                        .filter(store__translation_project__pk=tp_pk)
+                        .filter(revision__gt=revision))
 
         if self.exclude_disabled_projects:
             units_qs = units_qs.exclude(
@@ -75,43 +108,32 @@ class DBParser(BaseParser):
             'revision',
             'source_f',
             'target_f',
+            'store_id',
             'change__submitted_on',
-            'change__submitted_by__username',
-            'change__submitted_by__full_name',
-            'change__submitted_by__email',
-            'store__translation_project__project__fullname',
-            'store__pootle_path',
-            'store__translation_project__language__code'
-        ).order_by()
+            'change__submitted_by_id',
+        ).order_by('revision')
 
         return units_qs.iterator(), units_qs.count()
 
-    def get_unit_data(self, unit):
+    def get_unit_data(self, unit, context):
         """Return dict with data to import for a single unit."""
-        fullname = (unit['change__submitted_by__full_name'] or
-                    unit['change__submitted_by__username'])
-
-        email_md5 = None
-        if unit['change__submitted_by__email']:
-            email_md5 = md5(
-                force_bytes(unit['change__submitted_by__email'])).hexdigest()
+        username, fullname, email_md5 = self.users.get(
+            unit['change__submitted_by_id'], (None, None, None))
 
         iso_submitted_on = unit.get('change__submitted_on', None)
 
         display_submitted_on = None
         if iso_submitted_on:
-            display_submitted_on = dateformat.format(
-                dateparse.parse_datetime(str(iso_submitted_on))
-            )
+            display_submitted_on = dateformat.format(iso_submitted_on)
 
         return {
             '_index': self.INDEX_NAME,
-            '_type': unit['store__translation_project__language__code'],
+            '_type': context['language'],
             '_id': unit['id'],
             'revision': int(unit['revision']),
-            'project': unit['store__translation_project__project__fullname'],
-            'path': unit['store__pootle_path'],
-            'username': unit['change__submitted_by__username'],
+            'project': context['project'],
+            'path': context['paths'][unit['store_id']],
+            'username': username,
             'fullname': fullname,
             'email_md5': email_md5,
             'source': unit['source_f'],
@@ -216,6 +238,14 @@ class Command(BaseCommand):
             default=False,
             help='Report the number of translations to index and quit'
         )
+        parser.add_argument(
+            '--jobs',
+            action='store',
+            dest='jobs',
+            type=int,
+            default=1,
+            help='Number of translation projects to index concurrently'
+        )
 
         # Local TM specific options.
         local = parser.add_argument_group('Local TM', 'Pootle Local '
@@ -302,12 +332,16 @@ class Command(BaseCommand):
         self.INDEX_NAME = self.tm_settings['INDEX_NAME']
         self.is_local_tm = options['tm'] == 'local'
 
-        self.es = Elasticsearch([
-            {
-                'host': self.tm_settings['HOST'],
-                'port': self.tm_settings['PORT'],
-            }], retry_on_timeout=True
-        )
+        self.backend = None
+        if self.tm_settings['ENGINE'].split('.')[-1] == 'LocalTMBackend':
+            self.backend = LocalTMBackend(options['tm'])
+        else:
+            self.es = Elasticsearch([
+                {
+                    'host': self.tm_settings['HOST'],
+                    'port': self.tm_settings['PORT'],
+                }], retry_on_timeout=True
+            )
 
         # If files to import have been provided.
         if options['files']:
@@ -333,9 +367,12 @@ class Command(BaseCommand):
     def _set_latest_indexed_revision(self, **options):
         self.last_indexed_revision = -1
 
-        if (not options['rebuild'] and
-            not options['refresh'] and
-            self.es.indices.exists(self.INDEX_NAME)):
+        if self.backend is not None:
+            if not options['rebuild'] and not options['refresh']:
+                self.last_indexed_revision = self.backend.revision
+        elif (not options['rebuild'] and
+              not options['refresh'] and
+              self.es.indices.exists(self.INDEX_NAME)):
 
             result = self.es.search(
                 index=self.INDEX_NAME,
@@ -357,16 +394,159 @@ class Command(BaseCommand):
         self.stdout.write("Last indexed revision = %s" %
                           self.last_indexed_revision)
 
+    @property
+    def checkpoint_key(self):
+        return "pootle.tm.checkpoint.%s" % self.INDEX_NAME
+
+    def _get_checkpoints(self):
+        """Returns the last revision indexed for each TP, keyed by TP pk."""
+        checkpoints = Revision.objects.filter(
+            content_type=ContentType.objects.get_for_model(
+                TranslationProject),
+            key=self.checkpoint_key)
+        return {
+            int(object_id): int(value)
+            for object_id, value
+            in checkpoints.values_list("object_id", "value")}
+
+    def _set_checkpoint(self, tp, last_revision):
+        revision.get(TranslationProject)(tp).set(
+            keys=[self.checkpoint_key],
+            value=str(last_revision))
+
+    def _bulk_index(self, docs):
+        if self.backend is None:
+            languages = set()
+            helpers.bulk(self.es, self._collect_languages(docs, languages))
+            self._update_tm_revisions(languages)
+            return
+        chunks = {}
+        for doc in docs:
+            language = doc['_type']
+            chunk = chunks.setdefault(language, [])
+            chunk.append(
+                dict(((k, v) for k, v in doc.items() if not k.startswith('_')),
+                     id=doc['_id']))
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                self.backend.bulk_update(language, chunk)
+                chunks[language] = []
+        for language, chunk in chunks.items():
+            self.backend.bulk_update(language, chunk)
+        self._update_tm_revisions(chunks)
+
+    def _collect_languages(self, docs, languages):
+        for doc in docs:
+            languages.add(doc['_type'])
+            yield doc
+
+    def _update_tm_revisions(self, languages):
+        # cached TM results of the languages are stale
+        for language in languages:
+            update_tm_revision(language)
+
+    def _index_tp(self, tp, revision, dry_run=False):
+        """Indexes the translations of `tp` changed after `revision`
+
+        Translations are indexed in chunks ordered by revision, and the TP
+        checkpoint is updated after each chunk, so an interrupted run
+        resumes from the last indexed chunk.
+        """
+        try:
+            units, total = self.parser.get_units(tp.pk, revision)
+            if not total or dry_run:
+                return tp, total
+            context = self.parser.get_tp_context(tp.pk)
+            chunk = []
+            for unit in units:
+                chunk.append(self.parser.get_unit_data(unit, context))
+                if len(chunk) >= BULK_CHUNK_SIZE:
+                    self._bulk_index(chunk)
+                    # units sharing the last revision may be in the next
+                    # chunk
+                    self._set_checkpoint(tp, chunk[-1]['revision'] - 1)
+                    chunk = []
+            if chunk:
+                self._bulk_index(chunk)
+                self._set_checkpoint(tp, chunk[-1]['revision'])
+            return tp, total
+        finally:
+            if self.jobs > 1:
+                # each thread has its own db connection
+                connection.close()
+
+    def _index_db(self, tp_qs, **options):
+        checkpoints = {}
+        if options['rebuild'] or options['refresh']:
+            if not options['dry_run']:
+                # reset the checkpoints, so that an interrupted run is
+                # resumed rather than restarted
+                for tp in tp_qs:
+                    self._set_checkpoint(tp, -1)
+        else:
+            stored = self._get_checkpoints()
+            # TPs start from the last revision in the backend at most, as
+            # its index may have been deleted since their checkpoints
+            checkpoints = {
+                tp.pk: min(
+                    stored.get(tp.pk, self.last_indexed_revision),
+                    self.last_indexed_revision)
+                for tp in tp_qs}
+            if not options['dry_run']:
+                # keep the start of each TP in case the run is interrupted
+                # before it is indexed
+                for tp in tp_qs:
+                    if stored.get(tp.pk) != checkpoints[tp.pk]:
+                        self._set_checkpoint(tp, checkpoints[tp.pk])
+        if not options['dry_run']:
+            # retrieve the users once, rather than in each thread
+            self.parser.users
+        jobs = [
+            (tp,
+             checkpoints.get(tp.pk, self.last_indexed_revision),
+             options['dry_run'])
+            for tp in tp_qs]
+        if self.jobs > 1:
+            pool = ThreadPool(self.jobs)
+            try:
+                results = pool.imap_unordered(
+                    lambda job: self._index_tp(*job), jobs)
+                self._report(results, **options)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            self._report(
+                (self._index_tp(*job) for job in jobs), **options)
+
+    def _report(self, results, **options):
+        indexed = 0
+        for tp, total in results:
+            indexed += total
+            if total:
+                self.stdout.write(
+                    "%s: %s translations %s"
+                    % (tp.pootle_path,
+                       total,
+                       options['dry_run'] and "to index" or "indexed"))
+        self.stdout.write(
+            "%s translations %s"
+            % (indexed, options['dry_run'] and "to index" or "indexed"))
+
     def handle(self, **options):
         self._initialize(**options)
+        self.jobs = max(options['jobs'] or 1, 1)
 
-        if (options['rebuild'] and
-            not options['dry_run'] and
-            self.es.indices.exists(self.INDEX_NAME)):
+        if self.backend is not None:
+            if options['rebuild'] and not options['dry_run']:
+                self.backend.clear()
+        elif (options['rebuild'] and
+              not options['dry_run'] and
+              self.es.indices.exists(self.INDEX_NAME)):
 
             self.es.indices.delete(index=self.INDEX_NAME)
 
-        if (not options['dry_run'] and
+        if (self.backend is None and
+            not options['dry_run'] and
             not self.es.indices.exists(self.INDEX_NAME)):
 
             self.es.indices.create(index=self.INDEX_NAME)
@@ -375,7 +555,7 @@ class Command(BaseCommand):
             self._set_latest_indexed_revision(**options)
 
         if isinstance(self.parser, FileParser):
-            helpers.bulk(self.es, self._parse_translations(**options))
+            self._bulk_index(self._parse_translations(**options))
             return
 
         # If we are parsing from DB.
@@ -384,6 +564,11 @@ class Command(BaseCommand):
         if options['disabled_projects']:
             tp_qs = tp_qs.exclude(project__disabled=True)
 
-        for tp in tp_qs:
-            self.parser.tp_pk = tp.pk
-            helpers.bulk(self.es, self._parse_translations(**options))
+        self._index_db(tp_qs, **options)
+
+        if (self.backend is not None and
+            options['refresh'] and
+            not options['dry_run']):
+
+            # drop the translations superseded by the refreshed ones
+            self.backend.compact()
@@ -6,15 +6,26 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import uuid
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
 
+from pootle.core.cache import get_cache
+from pootle.core.utils.db import on_commit_once, on_commit_pending
+
 from .directory import Directory
 
 
+PERMISSIONS_REVISION_KEY = "pootle.permissions.revision"
+
+# process-local permission maps, keyed by user and permissions revision
+_permission_maps = {}
+
+
 def get_permission_contenttype():
     content_type = ContentType.objects.get_for_model(Directory)
     return content_type
@@ -62,24 +73,133 @@ def get_permissions_by_user(user, directory):
         return None
 
 
-def get_matching_permissions(user, directory, check_default=True):
+def get_permissions_revision():
+    cache = get_cache("redis")
+    revision = cache.get(PERMISSIONS_REVISION_KEY)
+    if revision is None:
+        cache.add(PERMISSIONS_REVISION_KEY, uuid.uuid4().hex)
+        revision = cache.get(PERMISSIONS_REVISION_KEY)
+    return revision
+
+
+def update_permissions_revision():
+    get_cache("redis").set(PERMISSIONS_REVISION_KEY, uuid.uuid4().hex)
+
+
+def permissions_pending():
+    """Returns `True` if permissions were changed in the current
+    transaction, and it has not been committed yet.
+    """
+    return on_commit_pending(update_permissions_revision)
+
+
+def permissions_updated():
+    """Invalidates the permission maps once the current transaction is
+    committed.
+    """
+    on_commit_once(update_permissions_revision, update_permissions_revision)
+
+
+def build_permission_map(user):
+    """Returns the positive permissions of all of the permission sets of
+    `user` on live directories, keyed by directory `pootle_path`.
+    """
+    permission_sets = PermissionSet.objects.filter(
+        user=user,
+        directory__obsolete=False).prefetch_related("positive_permissions")
+    return {
+        permission_set.directory.pootle_path: dict(
+            (perm.codename, perm)
+            for perm
+            in permission_set.positive_permissions.all())
+        for permission_set
+        in permission_sets.select_related("directory")}
+
+
+def _get_permission_map(name, get_user):
+    if permissions_pending():
+        # uncommitted changes are not visible to other processes
+        return build_permission_map(get_user())
+    revision = get_permissions_revision()
+    key = (name, revision)
+    if key in _permission_maps:
+        return _permission_maps[key]
+    cache = get_cache("redis")
+    cache_key = "pootle.permissions.map.%s.%s" % key
+    permission_map = cache.get(cache_key)
+    if permission_map is None:
+        permission_map = build_permission_map(get_user())
+        cache.set(cache_key, permission_map, 86400)
+    if len(_permission_maps) >= 1000:
+        _permission_maps.clear()
+    _permission_maps[key] = permission_map
+    return permission_map
+
+
+def get_permission_map(user):
+    """Returns the permission map of `user`, using the cached map for the
+    current permissions revision if possible.
+    """
+    return _get_permission_map(user.pk, lambda: user)
+
+
+def get_role_permission_map(username):
+    """Returns the permission map of the `default` or `nobody` user, without
+    retrieving the user unless the map has to be built.
+    """
     User = get_user_model()
+    return _get_permission_map(
+        username,
+        lambda: User.objects.get_queryset().get(username=username))
+
+
+def get_permissions_from_map(permission_map, pootle_path):
+    """Returns the permissions from `permission_map` that apply to
+    `pootle_path`, matching the same permission sets as
+    `get_permissions_by_user`.
+    """
+    path_parts = [part for part in pootle_path.split('/') if part]
+    permissions = None
+    matched_parts = None
+    # longest matching path
+    for i in range(len(path_parts), -1, -1):
+        path = "/%s" % "".join("%s/" % part for part in path_parts[:i])
+        if path in permission_map:
+            permissions = permission_map[path]
+            matched_parts = i
+            break
 
+    check_project_permissions = (
+        len(path_parts) > 1
+        and path_parts[0] != 'projects'
+        and (permissions is None or matched_parts < 2))
+
+    if check_project_permissions:
+        project_path = '/projects/%s/' % path_parts[1]
+        if project_path in permission_map:
+            permissions = permission_map[project_path]
+    return permissions
+
+
+def get_matching_permissions(user, directory, check_default=True):
     if user.is_authenticated:
-        permissions = get_permissions_by_user(user, directory)
+        permissions = get_permissions_from_map(
+            get_permission_map(user), directory.pootle_path)
         if permissions is not None:
             return permissions
 
         if not check_default:
             return {}
 
-        permissions = get_permissions_by_user(
-            User.objects.get_default_user(), directory)
+        permissions = get_permissions_from_map(
+            get_role_permission_map('default'),
+            directory.pootle_path)
         if permissions is not None:
             return permissions
 
-    permissions = get_permissions_by_user(
-        User.objects.get_nobody_user(), directory)
+    permissions = get_permissions_from_map(
+        get_role_permission_map('nobody'),
+        directory.pootle_path)
 
     return permissions
 
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from pootle.core.utils.db import clear_commit_hooks
+
+from .models import Directory
+from .models.permissions import PermissionSet, permissions_updated
+
+
+@receiver(post_save, sender=PermissionSet)
+@receiver(post_delete, sender=PermissionSet)
+def permission_set_handler(**kwargs):
+    permissions_updated()
+
+
+@receiver(m2m_changed, sender=PermissionSet.positive_permissions.through)
+@receiver(m2m_changed, sender=PermissionSet.negative_permissions.through)
+def permissions_changed_handler(**kwargs):
+    if kwargs["action"].startswith("post_"):
+        permissions_updated()
+
+
+@receiver(post_save, sender=Directory)
+def directory_saved_handler(**kwargs):
+    # permission sets of obsolete directories are excluded from the maps
+    if kwargs["instance"].permission_sets.exists():
+        permissions_updated()
+
+
+@receiver(post_save, sender=get_user_model())
+def user_created_handler(**kwargs):
+    # the maps of any previous user with the same pk are stale
+    if kwargs.get("created"):
+        permissions_updated()
+
+
+@receiver(request_started)
+def request_started_handler(**kwargs):
+    # forget the commit hooks of rolled back requests
+    clear_commit_hooks()
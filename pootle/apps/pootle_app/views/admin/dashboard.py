@@ -8,6 +8,7 @@
 
 from redis.exceptions import ConnectionError
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.shortcuts import render
@@ -20,6 +21,7 @@ from pootle.i18n import formatter
 from pootle.i18n.gettext import ugettext as _, ungettext
 from pootle_statistics.models import Submission
 from pootle_store.models import Suggestion
+from pootle_store.tm import TMUpdateQueue
 
 
 def _format_numbers(numbers):
@@ -67,6 +69,13 @@ def rq_stats():
         'is_running': is_running,
         'status_msg': status_msg,
     }
+    if settings.POOTLE_TM_QUEUE:
+        tm_queue = TMUpdateQueue().stats()
+        result.update({
+            'tm_queue_count': tm_queue['size'],
+            'tm_queue_lag': int(tm_queue['lag']),
+            'tm_queue_dropped': tm_queue['dropped'],
+        })
 
     return result
 
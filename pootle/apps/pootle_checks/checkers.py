@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+
+from translate.filters import checks
+
+from .constants import EXCLUDED_FILTERS
+
+
+logger = logging.getLogger(__name__)
+
+
+def checker_error_handler(functionname, str1, str2, e):
+    logger.error(
+        u"Error in filter %s: %r, %r, %s",
+        functionname,
+        str1,
+        str2, e)
+    return False
+
+
+def get_checker(checkstyle, language_code,
+                errorhandler=checker_error_handler):
+    """Returns the checker of a project's `checkstyle` for translations to
+    `language_code`
+    """
+    return checks.TeeChecker(
+        checkerclasses=[
+            checks.projectcheckers.get(
+                checkstyle,
+                checks.StandardChecker)],
+        excludefilters=EXCLUDED_FILTERS,
+        errorhandler=errorhandler,
+        languagecode=language_code)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import hashlib
+from collections import OrderedDict
+
+from translate.__version__ import sver as ttk_version
+
+from django.conf import settings
+
+from pootle.core.cache import get_cache
+
+
+class CheckResultCache(object):
+    """Content-addressed cache of quality check failures
+
+    Check failures only depend on the checker configuration and the content of
+    a unit, so units with the same source, target and locations checked with
+    the same checker share results.
+
+    Results are kept in an in-process LRU, and optionally in the Redis `lru`
+    cache so that they are shared between processes.
+    """
+
+    ns = "pootle.checks"
+
+    def __init__(self, size=None, use_redis=None):
+        self._size = size
+        self._use_redis = use_redis
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self):
+        if self._size is not None:
+            return self._size
+        return settings.POOTLE_CHECKS_CACHE_SIZE
+
+    @property
+    def use_redis(self):
+        if self._use_redis is not None:
+            return self._use_redis
+        return settings.POOTLE_CHECKS_CACHE_REDIS
+
+    @property
+    def redis(self):
+        return get_cache("lru")
+
+    def _strings(self, value):
+        return getattr(value, "strings", [value or u""])
+
+    def get_checker_key(self, checker):
+        checkers = getattr(checker, "checkers", [checker])
+        return u"%s:%s:%s" % (
+            u",".join(c.__class__.__name__ for c in checkers),
+            checker.config.targetlanguage or u"",
+            u",".join(sorted(checker.combinedfilters)))
+
+    def get_key(self, checker, unit, check_names=None):
+        key = hashlib.sha1()
+        parts = (
+            [ttk_version,
+             self.get_checker_key(checker),
+             (u",".join(sorted(check_names))
+              if check_names is not None
+              else u"*")]
+            + [u"\0".join(self._strings(unit.source)),
+               u"\0".join(self._strings(unit.target)),
+               u"\0".join(unit.getlocations())])
+        for part in parts:
+            key.update(part.encode("utf-8"))
+            key.update(b"\1")
+        return "%s.%s" % (self.ns, key.hexdigest())
+
+    def get(self, key):
+        if key in self.results:
+            failures = self.results.pop(key)
+        elif self.use_redis:
+            failures = self.redis.get(key)
+            if failures is None:
+                return None
+        else:
+            return None
+        self.set(key, failures, redis=False)
+        return failures
+
+    def set(self, key, failures, redis=True):
+        self.results.pop(key, None)
+        self.results[key] = failures
+        while len(self.results) > self.size:
+            self.results.popitem(last=False)
+        if redis and self.use_redis:
+            self.redis.set(key, failures)
+
+    def clear(self):
+        self.results.clear()
+        self.hits = self.misses = 0
+
+    def get_failures(self, checker, unit, check_names, calculate):
+        """Returns cached failures for `unit`, or calls `calculate` to get
+        them and caches the result.
+
+        The returned dictionary should not be modified.
+        """
+        if not self.size and not self.use_redis:
+            return calculate()
+        key = self.get_key(checker, unit, check_names)
+        failures = self.get(key)
+        if failures is not None:
+            self.hits += 1
+            return failures
+        self.misses += 1
+        failures = calculate()
+        self.set(key, failures)
+        return failures
+
+
+check_results = CheckResultCache()
@@ -7,6 +7,9 @@
 # AUTHORS file for copyright and authorship information.
 
 import logging
+import multiprocessing
+import os
+import time
 
 from translate.filters import checks
 from translate.filters.decorators import Category
@@ -23,9 +26,11 @@ from pootle_store.models import QualityCheck, Unit
 from pootle_store.unit import UnitProxy
 from pootle_translationproject.models import TranslationProject
 
+from .checkers import get_checker
 from .constants import (
     CATEGORY_CODES, CATEGORY_IDS, CATEGORY_NAMES, CHECK_NAMES,
     EXCLUDED_FILTERS)
+from .results import check_results
 
 
 logger = logging.getLogger(__name__)
@@ -79,6 +84,13 @@ class UnitQualityCheck(object):
     def check_failures(self):
         """Current QualityCheck failure for the Unit
         """
+        return check_results.get_failures(
+            self.checker,
+            self.unit,
+            self.check_names,
+            self.run_checks)
+
+    def run_checks(self):
         if self.check_names is None:
             return self.checker.run_filters(
                 self.unit, categorised=True)
@@ -135,6 +147,17 @@ class UnitQualityCheck(object):
         return updated
 
 
+class CalculatedUnitQualityCheck(UnitQualityCheck):
+
+    def __init__(self, unit, check_failures, original_checks, check_names):
+        """Refreshes QualityChecks for a Unit from failures that have already
+        been calculated, eg by a worker process.
+        """
+        super(CalculatedUnitQualityCheck, self).__init__(
+            unit, None, original_checks, check_names)
+        self.check_failures = check_failures
+
+
 class QualityCheckUpdater(object):
 
     def __init__(self, check_names=None, translation_project=None,
@@ -334,6 +357,140 @@ class TPQCUpdater(QualityCheckUpdater):
             "all" if self._units is None else len(self._units))
 
 
+@lru_cache(maxsize=None)
+def _get_worker_checker(checkstyle, language_code):
+    return get_checker(checkstyle, language_code)
+
+
+def calculate_check_failures(job):
+    """Calculates the check failures for a batch of units
+
+    This runs in a worker process, and does not use the database.
+
+    :param job: tuple of `checkstyle`, `language_code`, `check_names` and a
+        list of unit values dicts.
+    :returns: tuple of worker pid, number of units checked, time taken, and a
+        list of `unit`, `failures` tuples.
+    """
+    checkstyle, language_code, check_names, units = job
+    start = time.time()
+    checker = _get_worker_checker(checkstyle, language_code)
+    failures = [
+        (unit,
+         UnitQualityCheck(
+             CheckableUnit(unit),
+             checker,
+             {},
+             check_names).check_failures)
+        for unit
+        in units]
+    return os.getpid(), len(units), time.time() - start, failures
+
+
+class ParallelQCUpdater(TPQCUpdater):
+    """Refreshes QualityChecks, running the checkers for translated units in a
+    pool of worker processes.
+
+    Units are sent to the workers in batches of units from a single TP, and
+    the resulting failures are compared with the existing checks and saved
+    in this process.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, *args, **kwargs):
+        self.jobs = kwargs.pop("jobs", None) or multiprocessing.cpu_count()
+        self.batch_size = kwargs.pop("batch_size", None) or self.batch_size
+        super(ParallelQCUpdater, self).__init__(*args, **kwargs)
+        self.worker_stats = {}
+
+    @cached_property
+    def tp_checkers(self):
+        tps = self.tp_qs
+        if self.translation_project is not None:
+            tps = tps.filter(pk=self.translation_project.pk)
+        return {
+            tp: (checkstyle, language_code)
+            for tp, checkstyle, language_code
+            in tps.values_list(
+                "id", "project__checkstyle", "language__code").iterator()}
+
+    def get_jobs(self):
+        unit_fields = [
+            "id", "source_f", "target_f", "locations", "store__id",
+            "store__translation_project__id",
+            "store__translation_project__language__code"]
+        translated = (
+            self.units.filter(state__gt=UNTRANSLATED)
+                      .order_by(
+                          "store__translation_project", "store", "index"))
+        batch = []
+        batch_tp = None
+        for unit in translated.values(*unit_fields).iterator():
+            tp = unit["store__translation_project__id"]
+            if tp not in self.tp_checkers:
+                logger.error(
+                    "Missing TP (pk '%s'). No checker retrieved.", tp)
+                continue
+            if batch and (tp != batch_tp or len(batch) >= self.batch_size):
+                yield self.tp_checkers[batch_tp] + (self.check_names, batch)
+                batch = []
+            batch_tp = tp
+            batch.append(unit)
+        if batch:
+            yield self.tp_checkers[batch_tp] + (self.check_names, batch)
+
+    def run_jobs(self, pool):
+        """Yields results from the pool, keeping a limited number of batches
+        in flight so that memory use is bounded.
+        """
+        pending = []
+        for job in self.get_jobs():
+            pending.append(pool.apply_async(calculate_check_failures, (job, )))
+            if len(pending) >= self.jobs * 2:
+                yield pending.pop(0).get()
+        for result in pending:
+            yield result.get()
+
+    def update_translated_results(self, results):
+        updated_count = 0
+        for pid, count, elapsed, failures in results:
+            stats = self.worker_stats.setdefault(pid, [0, 0])
+            stats[0] += count
+            stats[1] += elapsed
+            for unit, check_failures in failures:
+                checker = CalculatedUnitQualityCheck(
+                    CheckableUnit(unit),
+                    check_failures,
+                    self.checks.get(unit["id"], {}),
+                    self.check_names)
+                if checker.update():
+                    self.update_store(
+                        unit["store__translation_project__id"],
+                        unit["store__id"])
+                    updated_count += 1
+        return updated_count
+
+    def update_translated(self):
+        """Update checks for translated Units using a pool of workers
+        """
+        pool = multiprocessing.Pool(self.jobs)
+        try:
+            updated_count = self.update_translated_results(
+                self.run_jobs(pool))
+        finally:
+            pool.terminate()
+            pool.join()
+        self.log_worker_stats()
+        return updated_count
+
+    def log_worker_stats(self):
+        for pid, (count, elapsed) in sorted(self.worker_stats.items()):
+            logger.info(
+                "[checks] worker %s: %s units in %.2fs (%.1f units/s)",
+                pid, count, elapsed, (count / elapsed if elapsed else 0))
+
+
 class StoreQCUpdater(QualityCheckUpdater):
     stores = None
 
@@ -18,3 +18,4 @@ class PootleConfigConfig(AppConfig):
 
     def ready(self):
         importlib.import_module("pootle_config.getters")
+        importlib.import_module("pootle_config.receivers")
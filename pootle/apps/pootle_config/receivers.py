@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Config
+from .utils import config_updated
+
+
+@receiver(post_save, sender=Config)
+@receiver(post_delete, sender=Config)
+def config_changed_handler(**kwargs):
+    config_updated(kwargs["instance"].content_type_id)
@@ -6,11 +6,116 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import uuid
 from collections import OrderedDict
+from copy import deepcopy
+from functools import partial
 
+from django.contrib.contenttypes.models import ContentType
+from django.utils.encoding import force_text
 from django.utils.functional import cached_property
 
+from pootle.core.cache import get_cache
 from pootle.core.delegate import config
+from pootle.core.utils.db import on_commit_once, on_commit_pending
+
+
+CONFIG_REVISION_KEY = "pootle.config.revision"
+
+# process-local config snapshots, keyed by content type, with the config
+# revision they were loaded at
+_config_snapshots = {}
+
+
+def get_config_revision_key(content_type_id=None):
+    return "%s.%s" % (CONFIG_REVISION_KEY, content_type_id or "site")
+
+
+def get_config_revision(content_type_id=None):
+    """Returns the config revision of `content_type_id`, or of the site
+    config if it is `None`.
+    """
+    cache = get_cache("redis")
+    key = get_config_revision_key(content_type_id)
+    revision = cache.get(key)
+    if revision is None:
+        cache.add(key, uuid.uuid4().hex)
+        revision = cache.get(key)
+    return revision
+
+
+def update_config_revision(content_type_id=None):
+    get_cache("redis").set(
+        get_config_revision_key(content_type_id),
+        uuid.uuid4().hex)
+
+
+def config_pending(content_type_id=None):
+    """Returns `True` if config for `content_type_id` was changed in the
+    current transaction, and it has not been committed yet.
+    """
+    return on_commit_pending((update_config_revision, content_type_id))
+
+
+def config_updated(content_type_id=None):
+    """Invalidates the config snapshots of `content_type_id` once the
+    current transaction is committed.
+    """
+    on_commit_once(
+        (update_config_revision, content_type_id),
+        partial(update_config_revision, content_type_id))
+
+
+def build_config_snapshot(content_type_id):
+    """Returns the config for `content_type_id` as tuples of `(key, value)`
+    keyed by `object_pk`, `None` being model config.
+
+    Site config is returned for a `content_type_id` of `None`.
+    """
+    from .models import Config
+
+    snapshot = {}
+    conf = Config.objects.filter(content_type_id=content_type_id)
+    if content_type_id is None:
+        conf = conf.filter(object_pk__isnull=True)
+    for item in conf.order_by("key", "pk"):
+        snapshot.setdefault(item.object_pk, []).append((item.key, item.value))
+    return {
+        object_pk: tuple(conf_list)
+        for object_pk, conf_list
+        in snapshot.items()}
+
+
+def get_config_snapshot(content_type_id):
+    """Returns the config snapshot of `content_type_id` for its current
+    config revision, loading it if required.
+    """
+    if config_pending(content_type_id):
+        # uncommitted changes are not visible to other processes
+        return build_config_snapshot(content_type_id)
+    revision = get_config_revision(content_type_id)
+    snapshot = _config_snapshots.get(content_type_id)
+    if snapshot is None or snapshot[0] != revision:
+        snapshot = _config_snapshots[content_type_id] = (
+            revision,
+            build_config_snapshot(content_type_id))
+    return snapshot[1]
+
+
+def list_snapshot_config(model=None):
+    """Returns a list of `(key, value)` for the site, a model or an object
+    from the config snapshot, as `list_config` would.
+    """
+    content_type_id = None
+    object_pk = None
+    if model is not None:
+        content_type_id = ContentType.objects.get_for_model(model).id
+        if not isinstance(model, type):
+            object_pk = force_text(model._get_pk_val())
+    return [
+        (k, deepcopy(v))
+        for k, v
+        in get_config_snapshot(content_type_id).get(object_pk, ())]
 
 
 class ConfigDict(object):
@@ -25,9 +130,12 @@ class ConfigDict(object):
     def __config__(self):
         raise NotImplementedError
 
+    def list_config(self):
+        return self.__config__.list_config()
+
     @cached_property
     def conf(self):
-        return OrderedDict(self.__config__.list_config())
+        return OrderedDict(self.list_config())
 
     def reload(self):
         if "conf" in self.__dict__:
@@ -68,6 +176,9 @@ class SiteConfig(ConfigDict):
     def __config__(self):
         return config.get()
 
+    def list_config(self):
+        return list_snapshot_config()
+
 
 class ModelConfig(ConfigDict):
 
@@ -75,6 +186,9 @@ class ModelConfig(ConfigDict):
     def __config__(self):
         return config.get(self.context)
 
+    def list_config(self):
+        return list_snapshot_config(self.context)
+
 
 class ObjectConfig(ConfigDict):
 
@@ -83,3 +197,6 @@ class ObjectConfig(ConfigDict):
         return config.get(
             self.context.__class__,
             instance=self.context)
+
+    def list_config(self):
+        return list_snapshot_config(self.context)
@@ -8,6 +8,7 @@
 
 import logging
 
+from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
@@ -74,6 +75,9 @@ def handle_tp_checks_data_create(**kwargs):
 
 @receiver(post_save, sender=StoreData)
 def handle_storedata_save(**kwargs):
+    if settings.POOTLE_DATA_INCREMENTAL:
+        # changes have already been rolled up into the TP
+        return
     tp = kwargs["instance"].store.translation_project
     update_data.send(tp.__class__, instance=tp)
 
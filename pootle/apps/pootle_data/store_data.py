@@ -8,7 +8,8 @@
 
 from translate.filters.decorators import Category
 
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.db.models import Case, Count, Max, Q, When
 
 from pootle.core.bulk import BulkCRUD
@@ -18,6 +19,7 @@ from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED
 from pootle_store.models import QualityCheck
 
 from .models import StoreChecksData, StoreData
+from .tp_data import TPDataRollup
 from .utils import DataTool, DataUpdater
 
 
@@ -33,6 +35,9 @@ class StoreDataCRUD(BulkCRUD):
                 store.__class__,
                 instance=store,
                 keys=["stats", "checks"])
+        if settings.POOTLE_DATA_INCREMENTAL:
+            # changes have already been rolled up into the TPs
+            return
         for tp in tps.values():
             update_data.send(
                 tp.__class__,
@@ -82,6 +87,8 @@ class StoreDataUpdater(DataUpdater):
         "max_unit_revision",
         "max_unit_mtime")
 
+    rollup_class = TPDataRollup
+
     @property
     def store(self):
         return self.model
@@ -90,6 +97,23 @@ class StoreDataUpdater(DataUpdater):
     def store_data_qs(self):
         return self.store.unit_set
 
+    def get_rollup_data(self, checks=None):
+        rollup_data = {
+            k: getattr(self.data, k)
+            for k
+            in self.rollup_class.sum_fields + self.rollup_class.max_fields}
+        rollup_data["checks"] = checks
+        return rollup_data
+
+    def get_check_counts(self, checks=None):
+        if checks is None:
+            checks = self.store.check_data.values(
+                "category", "name", "count")
+        return {
+            (check["category"], check["name"]): check["count"]
+            for check
+            in checks}
+
     @property
     def units(self):
         """Non-obsolete units in this Store"""
@@ -179,3 +203,27 @@ class StoreDataUpdater(DataUpdater):
             data.update(self.aggregate_defaults)
 
         return data
+
+    def update(self, **kwargs):
+        if not settings.POOTLE_DATA_INCREMENTAL:
+            return super(StoreDataUpdater, self).update(**kwargs)
+        with transaction.atomic():
+            if self.data.pk:
+                # compute the delta from the locked row, so that concurrent
+                # updates of this store apply their deltas one at a time
+                self.data = StoreData.objects.select_for_update().get(
+                    pk=self.data.pk)
+            previous = self.get_rollup_data(
+                checks=(
+                    self.get_check_counts()
+                    if self.data.pk
+                    else {}))
+            store_data = super(StoreDataUpdater, self).update(**kwargs)
+            self.rollup_class(self.store.translation_project).apply(
+                previous,
+                self.get_rollup_data(
+                    checks=(
+                        self.get_check_counts(store_data["checks"])
+                        if "checks" in store_data
+                        else None)))
+        return store_data
@@ -6,7 +6,7 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from django.db.models import Max, Sum
+from django.db.models import F, Max, Q, Sum
 from django.db.models.functions import Coalesce
 
 from pootle.core.bulk import BulkCRUD
@@ -16,7 +16,7 @@ from pootle.core.signals import update_data
 from pootle_data.models import StoreChecksData, StoreData
 
 from .models import TPChecksData, TPData
-from .utils import DataUpdater, RelatedStoresDataTool
+from .utils import SUM_FIELDS, DataUpdater, RelatedStoresDataTool
 
 
 class TPDataCRUD(BulkCRUD):
@@ -173,3 +173,132 @@ class TPUpdater(object):
     def update(self):
         for store in self.object_list:
             update_data.send(store.__class__, instance=store)
+
+
+class TPDataRollup(object):
+    """Applies changes to a Store's data to its TP's data in place
+
+    Sums are applied as atomic increments, and max fields are only raised.
+    If the TP has no data yet it is calculated in full.
+    """
+
+    sum_fields = SUM_FIELDS
+    max_fields = (
+        "max_unit_revision",
+        "max_unit_mtime",
+        "last_submission_id",
+        "last_created_unit_id")
+
+    def __init__(self, tp):
+        self.tp = tp
+
+    @property
+    def tp_data_qs(self):
+        return TPData.objects.filter(tp_id=self.tp.id)
+
+    @property
+    def tp_checks_qs(self):
+        return TPChecksData.objects.filter(tp_id=self.tp.id)
+
+    def get_delta(self, previous, current):
+        return {
+            k: current[k] - previous[k]
+            for k
+            in self.sum_fields
+            if current[k] != previous[k]}
+
+    def get_checks_delta(self, previous, current):
+        delta = {}
+        for check in set(previous) | set(current):
+            count = current.get(check, 0) - previous.get(check, 0)
+            if count:
+                delta[check] = count
+        return delta
+
+    def apply(self, previous, current):
+        if not self.tp_data_qs.exists():
+            update_data.send(self.tp.__class__, instance=self.tp)
+            return
+        delta = self.get_delta(previous, current)
+        if delta:
+            self.tp_data_qs.update(
+                **{k: F(k) + v for k, v in delta.items()})
+        for k in self.max_fields:
+            if current[k] is None or current[k] == previous[k]:
+                continue
+            self.tp_data_qs.filter(
+                Q(**{"%s__lt" % k: current[k]})
+                | Q(**{"%s__isnull" % k: True})).update(**{k: current[k]})
+        if current.get("checks") is not None:
+            self.apply_checks(
+                self.get_checks_delta(
+                    previous["checks"], current["checks"]))
+
+    def apply_checks(self, delta):
+        to_add = []
+        for (category, name), count in delta.items():
+            updated = self.tp_checks_qs.filter(
+                category=category,
+                name=name).update(count=F("count") + count)
+            if not updated and count > 0:
+                to_add.append(
+                    TPChecksData(
+                        tp_id=self.tp.id,
+                        category=category,
+                        name=name,
+                        count=count))
+        if to_add:
+            TPChecksData.objects.bulk_create(to_add)
+        if delta:
+            self.tp_checks_qs.filter(count__lte=0).delete()
+
+
+class TPDataReconciler(object):
+    """Verifies a TP's data against its Stores' data, and repairs it if it
+    has drifted.
+    """
+
+    fields = (
+        "total_words",
+        "fuzzy_words",
+        "translated_words",
+        "critical_checks",
+        "pending_suggestions",
+        "max_unit_revision")
+
+    def __init__(self, tp):
+        self.tp = tp
+
+    @property
+    def updater(self):
+        return self.tp.data_tool.updater
+
+    def get_drift(self):
+        expected = self.updater.get_store_data(
+            fields=self.fields + ("checks", ))
+        drift = {}
+        try:
+            tp_data = TPData.objects.get(tp_id=self.tp.id)
+        except TPData.DoesNotExist:
+            return {k: (None, expected[k]) for k in self.fields}
+        for k in self.fields:
+            if getattr(tp_data, k) != expected[k]:
+                drift[k] = (getattr(tp_data, k), expected[k])
+        checks = {
+            (check["category"], check["name"]): check["count"]
+            for check
+            in expected["checks"]}
+        existing_checks = dict(
+            ((category, name), count)
+            for category, name, count
+            in self.tp.check_data.values_list(
+                "category", "name", "count"))
+        if checks != existing_checks:
+            drift["checks"] = (existing_checks, checks)
+        return drift
+
+    def reconcile(self):
+        drift = self.get_drift()
+        if drift:
+            self.updater.update()
+        return drift
@@ -262,6 +262,7 @@ class DataUpdater(object):
             self.model.data = self.data
         elif data_changed:
             self.save_data(fields=data_changed)
+        return store_data
 
     def save_data(self, fields=None):
         update.send(
@@ -9,6 +9,7 @@
 import logging
 import os
 
+from translate.misc.multistring import multistring
 from translate.storage.factory import getclass
 
 from django.contrib.auth import get_user_model
@@ -20,12 +21,115 @@ from pootle_statistics.models import SubmissionTypes
 from pootle_store.constants import POOTLE_WINS, SOURCE_WINS
 from pootle_store.models import Store
 
+from .index import file_digest
+
 
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
 
+def _compact_string(value):
+    if isinstance(value, multistring):
+        return list(value.strings)
+    return value
+
+
+def parse_fs_file(job):
+    """Parses a translation file into a list of unit values dicts
+
+    This runs in a worker process, and does not use the database.
+
+    :param job: tuple of the file path, the project's local FS path and the
+        file class to parse the file with.
+    :returns: list of unit values dicts, or ``None`` if the file is missing
+        or has no units.
+    """
+    file_path, location_root, file_class = job
+    if not os.path.exists(file_path):
+        return
+    with open(file_path) as f:
+        f = AttributeProxy(f)
+        f.location_root = location_root
+        store_file = (
+            file_class(f)
+            if file_class
+            else getclass(f)(f.read()))
+    units = [
+        dict(unitid=unit.getid(),
+             source=_compact_string(unit.source),
+             target=_compact_string(unit.target),
+             context=unit.getcontext(),
+             locations=unit.getlocations(),
+             developer_comment=unit.getnotes(origin="developer"),
+             translator_comment=unit.getnotes(origin="translator"),
+             hasplural=unit.hasplural(),
+             fuzzy=unit.isfuzzy(),
+             translated=unit.istranslated(),
+             obsolete=unit.isobsolete())
+        for unit
+        in store_file.units
+        if not unit.isheader()]
+    return units or None
+
+
+class ParsedUnit(object):
+    """Wraps unit values returned by ``parse_fs_file`` with the parts of the
+    ttk unit API used when updating a ``Store``
+    """
+
+    def __init__(self, unit):
+        self.unit = unit
+
+    @property
+    def source(self):
+        source = self.unit["source"]
+        return multistring(source) if isinstance(source, list) else source
+
+    @property
+    def target(self):
+        target = self.unit["target"]
+        return multistring(target) if isinstance(target, list) else target
+
+    def getcontext(self):
+        return self.unit["context"]
+
+    def getid(self):
+        return self.unit["unitid"]
+
+    def getlocations(self):
+        return self.unit["locations"]
+
+    def getnotes(self, origin=None):
+        return self.unit.get("%s_comment" % origin, "")
+
+    def hasplural(self):
+        return self.unit["hasplural"]
+
+    def isfuzzy(self):
+        return self.unit["fuzzy"]
+
+    def isheader(self):
+        return False
+
+    def isobsolete(self):
+        return self.unit["obsolete"]
+
+    def istranslated(self):
+        return self.unit["translated"]
+
+
+class ParsedStore(object):
+    """Wraps the units parsed from a file, for updating a ``Store`` with"""
+
+    def __init__(self, units):
+        self.units = [ParsedUnit(unit) for unit in units]
+        self.id_index = {unit.getid(): unit for unit in self.units}
+
+    def findid(self, uid):
+        return self.id_index.get(uid)
+
+
 class FSFile(object):
 
     def __init__(self, store_fs):
@@ -82,7 +186,7 @@ class FSFile(object):
     @property
     def latest_hash(self):
         if self.file_exists:
-            return str(os.stat(self.file_path).st_mtime)
+            return file_digest(self.file_path)
 
     @property
     def latest_author(self):
@@ -92,6 +196,14 @@ class FSFile(object):
     def plugin(self):
         return self.store_fs.plugin
 
+    @property
+    def parse_job(self):
+        """Arguments for parsing the file with ``parse_fs_file``"""
+        return (
+            self.file_path,
+            self.store_fs.project.local_fs_path,
+            self.store.syncer.file_class if self.store_exists else None)
+
     @property
     def pootle_changed(self):
         return bool(
@@ -154,19 +266,32 @@ class FSFile(object):
             except User.DoesNotExist:
                 return self.plugin.pootle_user
 
-    def pull(self, user=None, merge=False, pootle_wins=None):
+    @property
+    def should_pull(self):
+        return not self.store_exists or self.fs_changed
+
+    def prepare_store(self):
         """
-        Pull FS file into Pootle
+        Creates or resurrects the ``Store`` that the file is pulled into
         """
-        if self.store_exists and not self.fs_changed:
-            return
-        logger.debug("Pulling file: %s", self.path)
         if not self.store_exists:
             self.create_store()
         if self.store.obsolete:
             self.store.resurrect()
+
+    def pull(self, user=None, merge=False, pootle_wins=None, parsed=None):
+        """
+        Pull FS file into Pootle
+
+        :param parsed: optional ``ParsedStore`` of the file, if it has
+            already been parsed.
+        """
+        if not self.should_pull:
+            return
+        logger.debug("Pulling file: %s", self.path)
+        self.prepare_store()
         return self._sync_to_pootle(
-            merge=merge, pootle_wins=pootle_wins)
+            merge=merge, pootle_wins=pootle_wins, parsed=parsed)
 
     def push(self, user=None):
         """
@@ -226,11 +351,11 @@ class FSFile(object):
         logger.debug("Pushed file: %s", self.path)
         return self.store.data.max_unit_revision
 
-    def _sync_to_pootle(self, merge=False, pootle_wins=None):
+    def _sync_to_pootle(self, merge=False, pootle_wins=None, parsed=None):
         """
         Update Pootle ``Store`` with the parsed FS file.
         """
-        tmp_store = self.deserialize()
+        tmp_store = parsed or self.deserialize()
         if not tmp_store:
             logger.warn("File staged for sync has disappeared: %s", self.path)
             return
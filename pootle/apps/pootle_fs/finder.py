@@ -38,8 +38,10 @@ class TranslationFileFinder(object):
     path_mapping = PATH_MAPPING
 
     def __init__(self, translation_mapping, path_filters=None,
-                 extensions=None, exclude_languages=None, fs_hash=None):
+                 extensions=None, exclude_languages=None, fs_hash=None,
+                 file_index=None):
         self.fs_hash = fs_hash
+        self.file_index = file_index
         TranslationMappingFinderValidator(translation_mapping).validate()
         self.translation_mapping = translation_mapping
         if extensions:
@@ -78,11 +80,28 @@ class TranslationFileFinder(object):
         return file_path, matched
 
     def walk(self):
-        """Walk a filesystem"""
+        """Walk a filesystem
+
+        If a `file_index` is set it is updated and its paths are used rather
+        than walking the tree again.
+        """
+        if self.file_index is not None:
+            for file_path in self.walk_index():
+                yield file_path
+            return
         for root, dirs_, files in scandir.walk(self.file_root):
             for filename in files:
                 yield os.path.join(root, filename)
 
+    def walk_index(self):
+        file_root = "%s/" % self.file_root
+        paths = self.file_index.update()
+        self.file_index.save()
+        for path in paths:
+            file_path = self.file_index.file_path(path)
+            if file_path.startswith(file_root):
+                yield file_path
+
     def find(self):
         """Find matching files anywhere in file_root"""
         for filepath in self.walk():
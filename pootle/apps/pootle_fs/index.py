@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import scandir
+
+from django.utils.functional import cached_property
+
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(file_path, blocksize=65536):
+    """Returns the hex digest of a file's contents"""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FSFileIndex(object):
+    """Persistent index of the files found under a root directory
+
+    For each file the size, mtime and a digest of its contents are stored,
+    keyed by the path relative to the root. Digests are only recalculated
+    when the size or mtime of a file has changed, so updating the index
+    costs a stat per file rather than a read.
+    """
+
+    version = 1
+
+    def __init__(self, root, index_path):
+        self.root = root.rstrip("/")
+        self.index_path = index_path
+        self.modified = False
+
+    @cached_property
+    def entries(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (IOError, ValueError) as e:
+            logger.warning(
+                "Unable to read file index '%s': %s",
+                self.index_path, e)
+            return {}
+        if index.get("version") != self.version:
+            return {}
+        if index.get("root") != self.root:
+            return {}
+        return index["entries"]
+
+    @property
+    def fs_hash(self):
+        """Digest of the whole tree, changes only when files are added,
+        removed or have their contents changed.
+        """
+        digest = hashlib.sha1()
+        for path in sorted(self.entries):
+            digest.update(
+                ("%s:%s\n" % (path, self.entries[path][2])).encode("utf-8"))
+        return digest.hexdigest()
+
+    def file_path(self, path):
+        return os.path.join(self.root, path.lstrip("/"))
+
+    def relative_path(self, file_path):
+        return file_path[len(self.root):]
+
+    def scan(self, directory):
+        """Yields `file_path`, `stat` for all files under `directory`"""
+        try:
+            dir_entries = scandir.scandir(directory)
+        except OSError:
+            return
+        for entry in dir_entries:
+            if entry.is_dir(follow_symlinks=False):
+                for found in self.scan(entry.path):
+                    yield found
+            elif entry.is_file():
+                yield entry.path, entry.stat()
+
+    def update_entry(self, path, stat):
+        entry = self.entries.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+            return entry[2]
+        digest = file_digest(self.file_path(path))
+        self.entries[path] = [stat.st_size, stat.st_mtime, digest]
+        self.modified = True
+        return digest
+
+    def get_hash(self, path):
+        """Returns the digest for `path`, updating the index if the file has
+        changed or been removed.
+        """
+        try:
+            stat = os.stat(self.file_path(path))
+        except OSError:
+            if self.entries.pop(path, None):
+                self.modified = True
+            return None
+        return self.update_entry(path, stat)
+
+    def update(self):
+        """Updates the index from the filesystem and returns a sorted list of
+        the paths of all files found.
+        """
+        found = set()
+        for file_path, stat in self.scan(self.root):
+            path = self.relative_path(file_path)
+            found.add(path)
+            self.update_entry(path, stat)
+        for path in set(self.entries) - found:
+            del self.entries[path]
+            self.modified = True
+        return sorted(found)
+
+    def save(self):
+        if not self.modified:
+            return
+        index_dir = os.path.dirname(self.index_path)
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        # write to a file unique to this process, so that concurrent saves
+        # dont clobber each other before the rename
+        with tempfile.NamedTemporaryFile(
+                mode="w",
+                dir=index_dir,
+                prefix="%s." % os.path.basename(self.index_path),
+                suffix=".tmp",
+                delete=False) as f:
+            tmp_path = f.name
+            try:
+                json.dump(
+                    dict(version=self.version,
+                         root=self.root,
+                         entries=self.entries),
+                    f)
+            except Exception:
+                f.close()
+                os.remove(tmp_path)
+                raise
+        os.rename(tmp_path, self.index_path)
+        self.modified = False
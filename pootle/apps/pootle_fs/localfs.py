@@ -7,7 +7,6 @@
 # AUTHORS file for copyright and authorship information.
 
 import logging
-import uuid
 
 from django import forms
 
@@ -50,8 +49,12 @@ class LocalFSPlugin(Plugin):
         except ValueError as e:
             raise FSFetchError(e)
         if synced:
-            revision.get(Project)(self.project).set(
-                keys=["pootle.fs.fs_hash"], value=uuid.uuid4().hex)
+            self.file_index.update()
+            self.file_index.save()
+            fs_hash = self.file_index.fs_hash
+            if fs_hash != self.latest_hash:
+                revision.get(Project)(self.project).set(
+                    keys=["pootle.fs.fs_hash"], value=fs_hash)
 
 
 class LocalFSUrlValidator(object):
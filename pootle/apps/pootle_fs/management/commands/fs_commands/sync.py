@@ -12,3 +12,19 @@ from pootle_fs.management.commands import FSAPISubCommand
 class SyncCommand(FSAPISubCommand):
     help = "Sync translations from FS into Pootle."
     api_method = "sync"
+
+    def add_arguments(self, parser):
+        super(SyncCommand, self).add_arguments(parser)
+        parser.add_argument(
+            "--jobs",
+            action="store",
+            dest="jobs",
+            type=int,
+            default=None,
+            help="Number of processes to parse pulled files in")
+
+    def handle_api_options(self, options):
+        api_options = super(SyncCommand, self).handle_api_options(options)
+        if options.get("jobs"):
+            api_options["jobs"] = options["jobs"]
+        return api_options
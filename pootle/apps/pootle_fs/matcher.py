@@ -50,7 +50,8 @@ class FSPathMatcher(object):
             extensions=self.project.filetype_tool.valid_extensions,
             path_filters=path_filters,
             exclude_languages=self.excluded_languages,
-            fs_hash=self.context.latest_hash)
+            fs_hash=self.context.latest_hash,
+            file_index=self.context.file_index)
 
     @property
     def project(self):
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+
+def file_digest(file_path, blocksize=65536):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def convert_mtime_hashes(apps, schema_editor):
+    """Replace mtime sync hashes with content digests for files that have not
+    changed since they were last synced.
+    """
+    StoreFS = apps.get_model("pootle_fs.StoreFS")
+    synced = StoreFS.objects.exclude(
+        last_sync_hash__isnull=True).select_related("project")
+    for store_fs in synced.iterator():
+        file_path = os.path.join(
+            settings.POOTLE_FS_WORKING_PATH,
+            store_fs.project.code,
+            store_fs.path.strip("/"))
+        if not os.path.exists(file_path):
+            continue
+        if store_fs.last_sync_hash != str(os.stat(file_path).st_mtime):
+            continue
+        StoreFS.objects.filter(pk=store_fs.pk).update(
+            last_sync_hash=file_digest(file_path))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_fs', '0003_path_uses_placeholder'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_mtime_hashes),
+    ]
@@ -7,9 +7,11 @@
 # AUTHORS file for copyright and authorship information.
 
 import logging
+import multiprocessing
 import os
 import shutil
 import uuid
+from itertools import groupby
 
 from bulk_update.helper import bulk_update
 
@@ -19,17 +21,23 @@ from django.db import transaction
 from django.utils.functional import cached_property
 from django.utils.lru_cache import lru_cache
 
+from pootle.core.contextmanagers import coalesce_signals
 from pootle.core.delegate import (
-    config, response as pootle_response, revision, state as pootle_state)
+    response as pootle_response, revision, state as pootle_state)
+from pootle.core.url_helpers import split_pootle_path
 from pootle_app.models import Directory
 from pootle_project.models import Project
 from pootle_store.constants import POOTLE_WINS, SOURCE_WINS
 from pootle_store.models import Store
+from pootle_translationproject.contextmanagers import update_tp_after
+from pootle_translationproject.models import TranslationProject
 
 from .apps import PootleFSConfig
 from .decorators import emits_state, responds_to_state
 from .delegate import fs_finder, fs_matcher, fs_resources
 from .exceptions import FSStateError
+from .files import ParsedStore, parse_fs_file
+from .index import FSFileIndex
 from .models import StoreFS
 from .signals import fs_post_pull, fs_post_push, fs_pre_pull, fs_pre_push
 
@@ -81,6 +89,19 @@ class Plugin(object):
     def finder_class(self):
         return fs_finder.get(self.__class__)
 
+    @property
+    def file_index_path(self):
+        return os.path.join(
+            settings.POOTLE_FS_WORKING_PATH,
+            ".index",
+            "%s.json" % self.project.code)
+
+    @cached_property
+    def file_index(self):
+        return FSFileIndex(
+            self.project.local_fs_path,
+            self.file_index_path)
+
     @property
     def fs_url(self):
         fs_type = self.project.config["pootle_fs.fs_type"]
@@ -129,10 +150,7 @@ class Plugin(object):
     @cached_property
     def pootle_user(self):
         User = get_user_model()
-        username = config.get(
-            self.project.__class__,
-            instance=self.project,
-            key="pootle_fs.pootle_user")
+        username = self.project.config.get("pootle_fs.pootle_user")
         if username:
             try:
                 return User.objects.get(username=username)
@@ -410,12 +428,13 @@ class Plugin(object):
 
     @responds_to_state
     def sync_merge(self, state, response, fs_path=None,
-                   pootle_path=None, update="all"):
+                   pootle_path=None, update="all", jobs=None):
         """
         Perform merge between Pootle and working directory
 
         :param fs_path: FS path glob to filter translations
         :param pootle_path: Pootle path glob to filter translations
+        :param jobs: number of worker processes to parse files in
         :returns response: Where ``response`` is an instance of self.respose_class
         """
         sfs = {}
@@ -423,21 +442,21 @@ class Plugin(object):
             sfs[fs_state.kwargs["store_fs"]] = fs_state
         _sfs = StoreFS.objects.filter(
             id__in=sfs.keys()).select_related("store", "store__data")
-        for store_fs in _sfs:
+        for store_fs, parsed in self.parse_files(_sfs, jobs=jobs):
             fs_state = sfs[store_fs.id]
             fs_state.store_fs = store_fs
             pootle_wins = (fs_state.state_type == "merge_pootle_wins")
-            store_fs = fs_state.store_fs
             update_revision = store_fs.file.pull(
                 merge=True,
                 pootle_wins=pootle_wins,
-                user=self.pootle_user)
+                user=self.pootle_user,
+                parsed=parsed)
             if update == "all":
                 update_revision = store_fs.file.push()
             state.resources.pootle_revisions[
                 store_fs.store_id] = update_revision
             state.resources.file_hashes[
-                store_fs.pootle_path] = store_fs.file.latest_hash
+                store_fs.pootle_path] = self.file_index.get_hash(store_fs.path)
             if pootle_wins:
                 response.add("merged_from_pootle", fs_state=fs_state)
             else:
@@ -446,14 +465,56 @@ class Plugin(object):
             self.expire_sync_cache()
         return response
 
+    def parse_files(self, stores_fs, jobs=None):
+        """Yields ``(store_fs, parsed)`` tuples, parsing the files in a pool
+        of ``jobs`` worker processes.
+
+        ``parsed`` is a ``ParsedStore``, or ``None`` if the file is to be
+        parsed when it is pulled - ie when running without ``jobs``, or if
+        the file is missing or has no units.
+
+        Files whose Stores are pulled are parsed ahead in order, with a
+        limited number in flight so that memory use is bounded.
+        """
+        if not jobs or jobs < 2:
+            for store_fs in stores_fs:
+                yield store_fs, None
+            return
+        pool = multiprocessing.Pool(jobs)
+        try:
+            pending = []
+            for store_fs in stores_fs:
+                result = None
+                if store_fs.file.should_pull:
+                    store_fs.file.prepare_store()
+                    result = pool.apply_async(
+                        parse_fs_file, (store_fs.file.parse_job, ))
+                pending.append((store_fs, result))
+                if len(pending) >= jobs * 2:
+                    yield self._get_parsed(*pending.pop(0))
+            for store_fs, result in pending:
+                yield self._get_parsed(store_fs, result)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _get_parsed(self, store_fs, result):
+        units = result.get() if result is not None else None
+        return store_fs, (ParsedStore(units) if units else None)
+
     @responds_to_state
     @emits_state(pre=fs_pre_pull, post=fs_post_pull)
-    def sync_pull(self, state, response, fs_path=None, pootle_path=None):
+    def sync_pull(self, state, response, fs_path=None, pootle_path=None,
+                  jobs=None):
         """
         Pull translations from working directory to Pootle
 
+        With ``jobs`` the files are parsed in worker processes, and the Stores
+        of each TP are updated together.
+
         :param fs_path: FS path glob to filter translations
         :param pootle_path: Pootle path glob to filter translations
+        :param jobs: number of worker processes to parse files in
         :returns response: Where ``response`` is an instance of self.respose_class
         """
         sfs = {}
@@ -461,18 +522,50 @@ class Plugin(object):
             sfs[fs_state.kwargs["store_fs"]] = fs_state
         _sfs = StoreFS.objects.filter(
             id__in=sfs.keys()).select_related("store", "store__data")
+        if jobs and jobs > 1:
+            _sfs = list(_sfs.order_by("pootle_path"))
+            revisions = self.pull_tps(_sfs, jobs)
+        else:
+            revisions = {}
+            for store_fs in _sfs:
+                store_fs.file.pull(user=self.pootle_user)
+                if store_fs.store and store_fs.store.data:
+                    revisions[store_fs.store_id] = (
+                        store_fs.store.data.max_unit_revision)
         for store_fs in _sfs:
-            store_fs.file.pull(user=self.pootle_user)
-            if store_fs.store and store_fs.store.data:
+            if store_fs.store_id in revisions:
                 state.resources.pootle_revisions[
-                    store_fs.store_id] = store_fs.store.data.max_unit_revision
+                    store_fs.store_id] = revisions[store_fs.store_id]
             state.resources.file_hashes[
-                store_fs.pootle_path] = store_fs.file.latest_hash
+                store_fs.pootle_path] = self.file_index.get_hash(store_fs.path)
             fs_state = sfs[store_fs.id]
             fs_state.store_fs = store_fs
             response.add("pulled_to_pootle", fs_state=fs_state)
         return response
 
+    def pull_tps(self, stores_fs, jobs):
+        """Pulls files parsed in worker processes. The data of the Stores in
+        each TP is updated once all of them have been pulled.
+
+        :param stores_fs: ``StoreFS`` objects, ordered by ``pootle_path``.
+        :returns: dict of ``store_id``: ``max_unit_revision`` of the pulled
+            Stores.
+        """
+        tp_pulled = groupby(
+            self.parse_files(stores_fs, jobs=jobs),
+            key=lambda pulled: split_pootle_path(pulled[0].pootle_path)[0])
+        for language_code, pulled in tp_pulled:
+            tp = self.project.translationproject_set.get(
+                language__code=language_code)
+            with update_tp_after(tp):
+                for store_fs, parsed in pulled:
+                    store_fs.file.pull(user=self.pootle_user, parsed=parsed)
+        return dict(
+            Store.objects.filter(
+                id__in=[store_fs.store_id for store_fs in stores_fs],
+                data__isnull=False).values_list(
+                    "id", "data__max_unit_revision"))
+
     @responds_to_state
     @emits_state(pre=fs_pre_push, post=fs_post_push)
     def sync_push(self, state, response, fs_path=None, pootle_path=None):
@@ -497,7 +590,7 @@ class Plugin(object):
             state.resources.pootle_revisions[
                 store_fs.store_id] = store_fs.store.data.max_unit_revision
             state.resources.file_hashes[
-                store_fs.pootle_path] = store_fs.file.latest_hash
+                store_fs.pootle_path] = self.file_index.get_hash(store_fs.path)
             response.add('pushed_to_fs', fs_state=fs_state)
         return response
 
@@ -525,29 +618,39 @@ class Plugin(object):
 
     @responds_to_state
     @transaction.atomic
-    def sync(self, state, response, fs_path=None, pootle_path=None, update="all"):
+    def sync(self, state, response, fs_path=None, pootle_path=None,
+             update="all", jobs=None):
         """
         Synchronize all staged and non-conflicting files and Stores, and push
         changes upstream if required.
 
         :param fs_path: FS path glob to filter translations
         :param pootle_path: Pootle path glob to filter translations
+        :param jobs: number of worker processes to parse pulled files in
         :returns response: Where ``response`` is an instance of self.respose_class
         """
-        self.sync_rm(
-            state, response, fs_path=fs_path, pootle_path=pootle_path)
-        if update in ["all", "pootle"]:
-            self.sync_merge(
-                state, response,
-                fs_path=fs_path,
-                pootle_path=pootle_path,
-                update=update)
-            self.sync_pull(
-                state, response, fs_path=fs_path, pootle_path=pootle_path)
-        if update in ["all", "fs"]:
-            self.sync_push(
+        # TP data/revisions are updated once per TP after all stores synced
+        with coalesce_signals(senders=(TranslationProject, Directory)):
+            self.sync_rm(
                 state, response, fs_path=fs_path, pootle_path=pootle_path)
-            self.push(response)
+            if update in ["all", "pootle"]:
+                self.sync_merge(
+                    state, response,
+                    fs_path=fs_path,
+                    pootle_path=pootle_path,
+                    update=update,
+                    jobs=jobs)
+                self.sync_pull(
+                    state, response,
+                    fs_path=fs_path,
+                    pootle_path=pootle_path,
+                    jobs=jobs)
+            if update in ["all", "fs"]:
+                self.sync_push(
+                    state, response,
+                    fs_path=fs_path,
+                    pootle_path=pootle_path)
+                self.push(response)
         sync_types = [
             "pushed_to_fs", "pulled_to_pootle",
             "merged_from_pootle", "merged_from_fs"]
@@ -568,6 +671,7 @@ class Plugin(object):
                         last_sync_revision,
                         save=False)
                     fs_to_update[store_fs.id] = store_fs
+        self.file_index.save()
         if fs_to_update:
             bulk_update(
                 fs_to_update.values(),
@@ -6,7 +6,6 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-import os
 from fnmatch import fnmatch
 
 from django.db.models import F, Max
@@ -195,16 +194,14 @@ class FSProjectStateResources(object):
 
     @cached_property
     def file_hashes(self):
+        """Content digests of found files, read from the plugin's file index
+        which only rehashes files whose size or mtime has changed.
+        """
+        file_index = self.context.file_index
         hashes = {}
-
-        def _get_file_hash(path):
-            file_path = os.path.join(
-                self.context.project.local_fs_path,
-                path.strip("/"))
-            if os.path.exists(file_path):
-                return str(os.stat(file_path).st_mtime)
         for pootle_path, path in self.found_file_matches:
-            hashes[pootle_path] = _get_file_hash(path)
+            hashes[pootle_path] = file_index.get_hash(path)
+        file_index.save()
         return hashes
 
     @cached_property
@@ -6,7 +6,11 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import heapq
+from itertools import groupby
+
 from django.contrib.auth import get_user_model
+from django.db.models import F
 from django.utils.functional import cached_property
 
 from pootle.core.delegate import comparable_event
@@ -224,36 +228,82 @@ class Log(object):
             field="unit__creation_time")
         return created_units
 
+    def filtered_added_suggestions(self, **kwargs):
+        suggestions = self.filter_timestamps(
+            self.filtered_suggestions(**kwargs),
+            start=kwargs.get("start"),
+            end=kwargs.get("end"))
+        if kwargs.get("users"):
+            suggestions = suggestions.filter(user_id__in=kwargs["users"])
+        return suggestions
+
+    def filtered_reviewed_suggestions(self, **kwargs):
+        suggestions = self.filter_timestamps(
+            self.filtered_suggestions(**kwargs).exclude(
+                state__name="pending"),
+            start=kwargs.get("start"),
+            end=kwargs.get("end"),
+            field="review_time")
+        if kwargs.get("users"):
+            suggestions = suggestions.filter(reviewer_id__in=kwargs["users"])
+        return suggestions
+
+    def created_unit_event(self, created_unit):
+        return self.event(
+            created_unit.unit,
+            created_unit.created_by,
+            created_unit.unit.creation_time,
+            "unit_created",
+            created_unit)
+
+    def submission_event(self, submission):
+        event_name = "state_changed"
+        if submission.field == SubmissionFields.CHECK:
+            event_name = (
+                "check_muted"
+                if submission.new_value == "0"
+                else "check_unmuted")
+        elif submission.field == SubmissionFields.TARGET:
+            event_name = "target_updated"
+        elif submission.field == SubmissionFields.SOURCE:
+            event_name = "source_updated"
+        elif submission.field == SubmissionFields.COMMENT:
+            event_name = "comment_updated"
+        return self.event(
+            submission.unit,
+            submission.submitter,
+            submission.creation_time,
+            event_name,
+            submission,
+            revision=submission.revision)
+
+    def suggestion_added_event(self, suggestion):
+        return self.event(
+            suggestion.unit,
+            suggestion.user,
+            suggestion.creation_time,
+            "suggestion_created",
+            suggestion)
+
+    def suggestion_reviewed_event(self, suggestion):
+        event_name = (
+            "suggestion_accepted"
+            if suggestion.is_accepted
+            else "suggestion_rejected")
+        return self.event(
+            suggestion.unit,
+            suggestion.reviewer,
+            suggestion.review_time,
+            event_name,
+            suggestion)
+
     def get_created_unit_events(self, **kwargs):
         for created_unit in self.filtered_created_units(**kwargs):
-            yield self.event(
-                created_unit.unit,
-                created_unit.created_by,
-                created_unit.unit.creation_time,
-                "unit_created",
-                created_unit)
+            yield self.created_unit_event(created_unit)
 
     def get_submission_events(self, **kwargs):
         for submission in self.filtered_submissions(**kwargs):
-            event_name = "state_changed"
-            if submission.field == SubmissionFields.CHECK:
-                event_name = (
-                    "check_muted"
-                    if submission.new_value == "0"
-                    else "check_unmuted")
-            elif submission.field == SubmissionFields.TARGET:
-                event_name = "target_updated"
-            elif submission.field == SubmissionFields.SOURCE:
-                event_name = "source_updated"
-            elif submission.field == SubmissionFields.COMMENT:
-                event_name = "comment_updated"
-            yield self.event(
-                submission.unit,
-                submission.submitter,
-                submission.creation_time,
-                event_name,
-                submission,
-                revision=submission.revision)
+            yield self.submission_event(submission)
 
     def get_suggestion_events(self, **kwargs):
         users = kwargs.get("users")
@@ -278,23 +328,9 @@ class Log(object):
                      and (not users
                           or (suggestion.reviewer_id in users))))
             if add_event:
-                yield self.event(
-                    suggestion.unit,
-                    suggestion.user,
-                    suggestion.creation_time,
-                    "suggestion_created",
-                    suggestion)
+                yield self.suggestion_added_event(suggestion)
             if review_event:
-                event_name = (
-                    "suggestion_accepted"
-                    if suggestion.is_accepted
-                    else "suggestion_rejected")
-                yield self.event(
-                    suggestion.unit,
-                    suggestion.reviewer,
-                    suggestion.review_time,
-                    event_name,
-                    suggestion)
+                yield self.suggestion_reviewed_event(suggestion)
 
     def get_events(self, **kwargs):
         event_sources = kwargs.pop("event_sources",
@@ -309,6 +345,47 @@ class Log(object):
             for event in self.get_submission_events(**kwargs):
                 yield event
 
+    def order_by_time(self, qs, field, reverse=False):
+        ordering = (
+            F(field).desc(nulls_last=True)
+            if reverse
+            else F(field).asc(nulls_first=True))
+        return qs.order_by(ordering, "%spk" % ("-" if reverse else ""))
+
+    def get_ordered_event_sources(self, reverse=False, limit=None, **kwargs):
+        """Returns iterators of events, each ordered by timestamp, with
+        events without a timestamp first.
+
+        If `limit` is set each source is limited to that many events.
+        """
+        event_sources = kwargs.pop("event_sources",
+                                   ("submission", "suggestion", "unit_source"))
+        sources = []
+        if "unit_source" in event_sources:
+            sources.append(
+                (self.filtered_created_units(**kwargs),
+                 "unit__creation_time",
+                 self.created_unit_event))
+        if "suggestion" in event_sources:
+            sources.append(
+                (self.filtered_added_suggestions(**kwargs),
+                 "creation_time",
+                 self.suggestion_added_event))
+            sources.append(
+                (self.filtered_reviewed_suggestions(**kwargs),
+                 "review_time",
+                 self.suggestion_reviewed_event))
+        if "submission" in event_sources:
+            sources.append(
+                (self.filtered_submissions(**kwargs),
+                 "creation_time",
+                 self.submission_event))
+        for qs, field, make_event in sources:
+            qs = self.order_by_time(qs, field, reverse=reverse)
+            if limit is not None:
+                qs = qs[:limit]
+            yield (make_event(obj) for obj in qs.iterator())
+
 
 class StoreLog(Log):
     include_meta = True
@@ -360,19 +437,81 @@ class UnitLog(Log):
         return qs
 
 
+class EventTime(object):
+    """Heap key ordering events by timestamp, with events without a
+    timestamp first
+    """
+    __slots__ = ("timestamp", "reverse")
+
+    def __init__(self, timestamp, reverse=False):
+        self.timestamp = timestamp
+        self.reverse = reverse
+
+    @property
+    def key(self):
+        return (self.timestamp is not None, self.timestamp)
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __lt__(self, other):
+        if self.reverse:
+            return other.key < self.key
+        return self.key < other.key
+
+
 class GroupedEvents(object):
     def __init__(self, log):
         self.log = log
 
-    def sorted_events(self, start=None, end=None, users=None, reverse=False):
-        comparable_event_class = comparable_event.get(self.log.__class__)
-        events = sorted(
-            (comparable_event_class(x)
-             for x in self.log.get_events(start=start,
-                                          end=end,
-                                          users=users)), reverse=reverse)
-        for event in events:
+    def merge_events(self, sources, reverse=False):
+        """Lazily merges time-ordered iterators of events"""
+        heap = []
+        for i, source in enumerate(sources):
+            for event in source:
+                heap.append((EventTime(event.timestamp, reverse), i, event, source))
+                break
+        heapq.heapify(heap)
+        while heap:
+            __, i, event, source = heap[0]
             yield event
+            for event in source:
+                heapq.heapreplace(
+                    heap,
+                    (EventTime(event.timestamp, reverse), i, event, source))
+                break
+            else:
+                heapq.heappop(heap)
+
+    def sorted_events(self, start=None, end=None, users=None, reverse=False,
+                      limit=None):
+        """Yields the events of the log in order
+
+        Sources are merged as they are read from the db, and only events
+        sharing a timestamp are compared with the `comparable_event` for the
+        log, so a page of `limit` events costs O(limit).
+        """
+        comparable_event_class = comparable_event.get(self.log.__class__)
+        events = self.merge_events(
+            self.log.get_ordered_event_sources(
+                start=start,
+                end=end,
+                users=users,
+                reverse=reverse,
+                limit=limit),
+            reverse=reverse)
+        count = 0
+        for __, group in groupby(events, lambda event: event.timestamp):
+            for event in sorted(
+                    (comparable_event_class(x) for x in group),
+                    reverse=reverse):
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield event
 
 
 class UserLog(Log):
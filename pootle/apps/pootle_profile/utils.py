@@ -12,7 +12,7 @@ from django.utils import timezone
 from django.utils.functional import cached_property
 
 from pootle.core.delegate import (
-    comparable_event, log, membership, scores, site_languages)
+    grouped_events, log, membership, scores, site_languages)
 from pootle.core.utils.templates import render_as_template
 from pootle.i18n.gettext import ugettext_lazy as _
 
@@ -50,15 +50,11 @@ class UserProfile(object):
             else _("Anonymous User"))
 
     def get_events(self, start=None, n=None):
-        sortable = comparable_event.get(self.log.__class__)
         start = start or (timezone.now() - timedelta(days=30))
-        events = sorted(
-            sortable(ev)
-            for ev
-            in self.log.get_events(start=start))
-        if n is not None:
-            events = events[-n:]
-        return reversed(events)
+        return grouped_events.get(self.log.__class__)(self.log).sorted_events(
+            start=start,
+            reverse=True,
+            limit=n)
 
 
 class UserMembership(object):
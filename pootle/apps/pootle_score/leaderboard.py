@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from datetime import timedelta
+
+from django_redis import get_redis_connection
+
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+
+from pootle.core.utils.timezone import localdate
+from pootle_translationproject.models import TranslationProject
+
+from .models import UserTPScore
+
+
+# Sets the score of a member of a TP day bucket, and adds the difference to
+# the matching language, project, site and user language buckets.
+#
+# KEYS: tp, language, project, site and user language buckets
+# ARGV: user id, new score, language id, bucket timeout
+UPDATE_SCRIPT = """
+local old = tonumber(redis.call("ZSCORE", KEYS[1], ARGV[1]) or "0")
+local delta = tonumber(ARGV[2]) - old
+if delta == 0 then
+    return 0
+end
+redis.call("ZADD", KEYS[1], ARGV[2], ARGV[1])
+for i = 2, 4 do
+    redis.call("ZINCRBY", KEYS[i], delta, ARGV[1])
+end
+redis.call("ZINCRBY", KEYS[5], delta, ARGV[3])
+for i = 1, 5 do
+    redis.call("EXPIRE", KEYS[i], ARGV[4])
+end
+return 1
+"""
+
+
+class Leaderboard(object):
+    """Top scorers of a context, kept in Redis sorted sets
+
+    Each context has a sorted set of user scores for every day and score
+    field. Windows of days are merged with ZUNIONSTORE and kept until
+    the scores of the context change.
+    """
+
+    ns = "pootle.score.leaderboard"
+    fields = ("score", "translated", "reviewed", "suggested")
+    max_days = 31
+    window_timeout = 3600
+
+    def __init__(self, context):
+        self.context = context
+
+    @cached_property
+    def redis(self):
+        return get_redis_connection("redis")
+
+    @property
+    def registry_key(self):
+        return "%s.%s.windows" % (self.ns, self.context)
+
+    def get_bucket_key(self, field, date):
+        return "%s.%s.%s.%s" % (self.ns, self.context, field, date.isoformat())
+
+    def get_window_key(self, field, days):
+        return (
+            "%s.%s.%s.window.%s.%s"
+            % (self.ns, self.context, field, days, localdate().isoformat()))
+
+    def get_window(self, field="score", days=30):
+        """Returns the key of the sorted set of scores for the last `days`,
+        merging the daily buckets if required
+        """
+        window_key = self.get_window_key(field, days)
+        if not self.redis.exists(window_key):
+            today = localdate()
+            pipeline = self.redis.pipeline()
+            pipeline.zunionstore(
+                window_key,
+                [self.get_bucket_key(field, today - timedelta(days=i))
+                 for i in range(days + 1)])
+            pipeline.expire(window_key, self.window_timeout)
+            pipeline.sadd(self.registry_key, window_key)
+            pipeline.expire(self.registry_key, self.window_timeout)
+            pipeline.execute()
+        return window_key
+
+    def count(self, days=30):
+        return self.redis.zcount(self.get_window(days=days), "(0", "+inf")
+
+    def rank(self, member, days=30):
+        """Returns the 1-based position of `member`, or `None`"""
+        window = self.get_window(days=days)
+        score = self.redis.zscore(window, member)
+        if not score or score < 0:
+            return None
+        return self.redis.zrevrank(window, member) + 1
+
+    def get_top_members(self, days=30, offset=0, limit=None):
+        return [
+            (int(member), score)
+            for member, score
+            in self.redis.zrevrangebyscore(
+                self.get_window(days=days),
+                "+inf",
+                "(0",
+                start=offset,
+                num=limit if limit is not None else -1,
+                withscores=True)]
+
+    def get_top(self, days=30, offset=0, limit=None):
+        """Returns the top scorers in the same form as
+        `Scores.get_top_scorers`
+        """
+        top = self.get_top_members(days=days, offset=offset, limit=limit)
+        if not top:
+            return []
+        users = {
+            user["id"]: user
+            for user
+            in get_user_model().objects.filter(
+                id__in=[member for member, score in top]).values(
+                    "id", "username", "email", "full_name")}
+        pipeline = self.redis.pipeline()
+        for field in self.fields[1:]:
+            window = self.get_window(field, days)
+            for member, score in top:
+                pipeline.zscore(window, member)
+        field_scores = iter(pipeline.execute())
+        sums = [{} for member, score in top]
+        for field in self.fields[1:]:
+            for user_sums in sums:
+                user_sums["%s__sum" % field] = next(field_scores) or 0
+        scorers = []
+        for (member, score), user_sums in zip(top, sums):
+            if member not in users:
+                continue
+            user_sums.update(
+                {"user__username": users[member]["username"],
+                 "user__email": users[member]["email"],
+                 "user__full_name": users[member]["full_name"],
+                 "score__sum": score})
+            scorers.append(user_sums)
+        return scorers
+
+
+class LeaderboardUpdater(object):
+    """Feeds daily UserTPScore values into the leaderboards"""
+
+    leaderboard_class = Leaderboard
+
+    @cached_property
+    def redis(self):
+        return get_redis_connection("redis")
+
+    @cached_property
+    def update_script(self):
+        return self.redis.register_script(UPDATE_SCRIPT)
+
+    @cached_property
+    def meta_users(self):
+        return set(
+            get_user_model().objects.filter(
+                username__in=get_user_model().objects.META_USERS).values_list(
+                    "id", flat=True))
+
+    @property
+    def timeout(self):
+        return (Leaderboard.max_days + 1) * 24 * 60 * 60
+
+    def get_tps(self, tp_ids):
+        return {
+            tp: (language, project)
+            for tp, language, project
+            in TranslationProject.objects.filter(
+                id__in=tp_ids).values_list(
+                    "id", "language_id", "project_id")}
+
+    def get_leaderboards(self, tp, language, project, user):
+        return [
+            self.leaderboard_class(context)
+            for context
+            in ["tp.%s" % tp,
+                "language.%s" % language,
+                "project.%s" % project,
+                "projects",
+                "user.%s" % user]]
+
+    def update(self, scores):
+        """Sets the leaderboard scores from `scores`, an iterable of
+        `UserTPScore` objects
+        """
+        scores = [
+            score
+            for score
+            in scores
+            if score.user_id not in self.meta_users]
+        if not scores:
+            return
+        tps = self.get_tps(set(score.tp_id for score in scores))
+        oldest = localdate() - timedelta(days=Leaderboard.max_days)
+        pipeline = self.redis.pipeline()
+        registries = set()
+        for score in scores:
+            if score.date < oldest or score.tp_id not in tps:
+                continue
+            language, project = tps[score.tp_id]
+            leaderboards = self.get_leaderboards(
+                score.tp_id, language, project, score.user_id)
+            registries.update(lb.registry_key for lb in leaderboards)
+            for field in Leaderboard.fields:
+                self.update_script(
+                    keys=[
+                        lb.get_bucket_key(field, score.date)
+                        for lb in leaderboards],
+                    args=[
+                        score.user_id,
+                        round(getattr(score, field), 2),
+                        language,
+                        self.timeout],
+                    client=pipeline)
+        pipeline.execute()
+        self.clear_windows(registries)
+
+    def clear_windows(self, registries):
+        """Removes the merged windows of the contexts of `registries`, so
+        that they are merged again from the updated buckets
+        """
+        if not registries:
+            return
+        pipeline = self.redis.pipeline()
+        for registry in registries:
+            pipeline.smembers(registry)
+        windows = set()
+        for members in pipeline.execute():
+            windows.update(members)
+        self.redis.delete(*(windows | set(registries)))
+
+    def clear(self):
+        keys = list(
+            self.redis.scan_iter(match="%s.*" % Leaderboard.ns, count=1000))
+        if keys:
+            self.redis.delete(*keys)
+
+    def rebuild(self):
+        """Clears the leaderboards and refeeds them from the db"""
+        self.clear()
+        scores = UserTPScore.objects.filter(
+            date__gte=localdate() - timedelta(days=Leaderboard.max_days))
+        batch = []
+        for score in scores.order_by("pk").iterator():
+            batch.append(score)
+            if len(batch) >= 1000:
+                self.update(batch)
+                batch = []
+        self.update(batch)
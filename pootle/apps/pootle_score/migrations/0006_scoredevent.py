@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_score', '0005_remove_extra_indeces'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoredEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=32)),
+                ('object_id', models.PositiveIntegerField()),
+                ('timestamp', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'pootle_scored_event',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='scoredevent',
+            unique_together=set([('event_type', 'object_id')]),
+        ),
+    ]
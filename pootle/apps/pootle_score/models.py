@@ -51,3 +51,25 @@ class UserTPScore(AbstractUserScore):
     @property
     def context(self):
         return self.tp
+
+
+class ScoredEvent(models.Model):
+    """A submission or suggestion event that has been added to the scores
+    by the incremental score updater.
+    """
+
+    class Meta(object):
+        db_table = "pootle_scored_event"
+        unique_together = ["event_type", "object_id"]
+
+    event_type = models.CharField(
+        max_length=32,
+        null=False,
+        blank=False)
+    object_id = models.PositiveIntegerField(
+        null=False,
+        blank=False)
+    timestamp = models.DateTimeField(
+        null=False,
+        blank=False,
+        db_index=True)
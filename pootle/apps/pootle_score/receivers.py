@@ -6,18 +6,21 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from pootle.core.delegate import crud, score_updater
 from pootle.core.signals import create, update, update_scores
+from pootle.core.utils.db import on_commit_once
 from pootle.core.utils.timezone import localdate
 from pootle_statistics.models import Submission
 from pootle_store.models import Store, Suggestion
 from pootle_translationproject.models import TranslationProject
 
 from .models import UserStoreScore, UserTPScore
+from .updater import queue_incremental_scores, rebuild_leaderboards
 
 
 @receiver(update, sender=UserStoreScore)
@@ -40,6 +43,13 @@ def handle_user_tp_score_create(**kwargs):
     crud.get(UserTPScore).create(**kwargs)
 
 
+@receiver(post_delete, sender=UserTPScore)
+def handle_user_tp_score_deleted(**kwargs):
+    # scores of deleted users and TPs are dropped from the leaderboards
+    if settings.POOTLE_SCORE_LEADERBOARDS:
+        on_commit_once(rebuild_leaderboards, rebuild_leaderboards)
+
+
 @receiver(update_scores, sender=get_user_model())
 def update_user_scores_handler(**kwargs):
     score_updater.get(get_user_model())().update(
@@ -57,6 +67,9 @@ def update_tp_scores_handler(**kwargs):
 
 @receiver(update_scores, sender=Store)
 def update_store_scores_handler(**kwargs):
+    if settings.POOTLE_SCORE_INCREMENTAL:
+        queue_incremental_scores()
+        return
     store = kwargs["instance"]
     score_updater.get(store.__class__)(store).update(
         users=kwargs.get("users"),
@@ -6,24 +6,59 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from contextlib import contextmanager
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
 from django.utils.functional import cached_property
 
 from pootle.core.bulk import BulkCRUD
 from pootle.core.contextmanagers import bulk_operations, keep_data
 from pootle.core.delegate import event_score, log, score_updater
 from pootle.core.signals import create, update, update_scores
+from pootle.core.utils.db import on_commit_once, on_commit_pending
 from pootle.core.utils.timezone import localdate
-from pootle_log.utils import LogEvent
-from pootle_score.models import UserStoreScore, UserTPScore
+from pootle_log.utils import Log, LogEvent
+from pootle_score.models import ScoredEvent, UserStoreScore, UserTPScore
+from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
 
+from .leaderboard import LeaderboardUpdater
 from .utils import to_datetime
 
 
+def update_leaderboards(tp_scores):
+    if settings.POOTLE_SCORE_LEADERBOARDS:
+        LeaderboardUpdater().update(tp_scores)
+
+
+def rebuild_leaderboards():
+    if settings.POOTLE_SCORE_LEADERBOARDS:
+        LeaderboardUpdater().rebuild()
+
+
+def update_incremental_scores():
+    IncrementalScoreUpdater().update()
+
+
+def incremental_scores_pending():
+    """Returns `True` if an incremental score update is already queued for
+    when the current transaction is committed.
+    """
+    return on_commit_pending(update_incremental_scores)
+
+
+def queue_incremental_scores():
+    """Adds the scores of new events once the current transaction is
+    committed, once for each transaction.
+    """
+    on_commit_once(update_incremental_scores, update_incremental_scores)
+
+
 class UserRelatedScoreCRUD(BulkCRUD):
 
     def post_create(self, **kwargs):
@@ -68,6 +103,7 @@ class UserTPScoreCRUD(UserRelatedScoreCRUD):
         return qs.select_related("tp")
 
     def update_scores(self, objects):
+        update_leaderboards(objects)
         users = (
             set(user
                 for user
@@ -94,6 +130,15 @@ class ScoreUpdater(object):
     def scoring(self):
         return event_score.gather(self.event_class)
 
+    def get_event_scores(self, event):
+        """Returns the scores for `event` or `None` if it doesnt score"""
+        if event.action not in self.scoring:
+            return
+        scores = self.scoring[event.action](event).get_score()
+        if not scores or not any(x > 0 for x in scores.values()):
+            return
+        return scores
+
     def set_scores(self, calculated_scores, existing=None):
         calculated_scores = list(self.iterate_scores(calculated_scores))
         score_dict = {
@@ -179,12 +224,14 @@ class ScoreUpdater(object):
             objects=created)
         return created
 
-    def update(self, users=None, existing=None, date=None):
+    def update(self, users=None, existing=None, date=None, end=None):
+        """Updates the scores of `users`, from the events of `date`, or from
+        all events before `end`.
+        """
+        start = None
         if date is not None:
             start = date
             end = date + timedelta(days=1)
-        else:
-            start = end = None
         return self.set_scores(
             self.calculate(users=users, start=start, end=end),
             existing=existing)
@@ -239,10 +286,8 @@ class StoreScoreUpdater(ScoreUpdater):
         return self.context
 
     def score_event(self, event, calculated_scores):
-        if event.action not in self.scoring:
-            return
-        scores = self.scoring[event.action](event).get_score()
-        if not scores or not any(x > 0 for x in scores.values()):
+        scores = self.get_event_scores(event)
+        if not scores:
             return
         event_date = localdate(event.timestamp)
         calculated_scores[event_date] = (
@@ -345,7 +390,8 @@ class TPScoreUpdater(ScoreUpdater):
         user_score_updater = score_updater.get(get_user_model())(users=users)
         user_score_updater.update(users=users)
 
-    def refresh_scores(self, users=None, existing=None, existing_tps=None):
+    def refresh_scores(self, users=None, existing=None, existing_tps=None,
+                       end=None):
         suppress_tp_scores = keep_data(
             signals=(update_scores, ),
             suppress=(TranslationProject, ))
@@ -356,7 +402,8 @@ class TPScoreUpdater(ScoreUpdater):
                     for store in self.tp.stores.iterator():
                         score_updater.get(store.__class__)(store).update(
                             users=users,
-                            existing=existing.get(store.id))
+                            existing=existing.get(store.id),
+                            end=end)
             self.update(users=users, existing=existing_tps)
 
 
@@ -396,7 +443,7 @@ class UserScoreUpdater(ScoreUpdater):
         store_scores.delete()
         scores.update(score=0)
 
-    def refresh_scores(self, users=None, **kwargs):
+    def refresh_scores(self, users=None, end=None, **kwargs):
         suppress_user_scores = keep_data(
             signals=(update_scores, ),
             suppress=(get_user_model(), ))
@@ -407,5 +454,261 @@ class UserScoreUpdater(ScoreUpdater):
                 for tp in TranslationProject.objects.all():
                     score_updater.get(tp.__class__)(tp).refresh_scores(
                         users=users,
-                        existing_tps=tp_scores.get(tp.id))
+                        existing_tps=tp_scores.get(tp.id),
+                        end=end)
                 self.update(users=users)
+        rebuild_leaderboards()
+
+
+class IncrementalScoreUpdater(ScoreUpdater):
+    """Adds the scores of new events to the existing daily store and TP
+    scores, rather than replaying the log.
+
+    Scored events are recorded as ``ScoredEvent``s in the same transaction
+    as the scores they add to. Each update re-scans the events from
+    ``safety_window`` before the last scored event, so that events committed
+    out of timestamp order are still scored, and each event is only scored
+    once.
+    """
+    refresh_event = "refresh"
+    refreshing_event = "refreshing"
+    scored_event_model = ScoredEvent
+    store_score_model = UserStoreScore
+    tp_score_model = UserTPScore
+    score_fields = ("score", "reviewed", "suggested", "translated")
+    safety_window = timedelta(hours=1)
+
+    def __init__(self, *args, **kwargs):
+        super(IncrementalScoreUpdater, self).__init__(None)
+
+    @cached_property
+    def logs(self):
+        return Log()
+
+    @property
+    def scored_events(self):
+        return self.scored_event_model.objects.exclude(
+            event_type__in=(self.refresh_event, self.refreshing_event))
+
+    def get_refreshed(self):
+        """Returns the time of the last full refresh, events before which
+        are already scored.
+        """
+        return self.scored_event_model.objects.filter(
+            event_type=self.refresh_event).values_list(
+                "timestamp", flat=True).first()
+
+    def set_refreshed(self, timestamp=None):
+        """Marks all events before `timestamp` as scored"""
+        with transaction.atomic():
+            self.scored_event_model.objects.all().delete()
+            self.scored_event_model.objects.create(
+                event_type=self.refresh_event,
+                object_id=0,
+                timestamp=timestamp or timezone.now())
+
+    def is_refreshing(self):
+        return self.scored_event_model.objects.filter(
+            event_type=self.refreshing_event).exists()
+
+    @contextmanager
+    def refreshing(self, timestamp=None):
+        """Marks the events before `timestamp` as scored by a full refresh,
+        and stops incremental updates until the refresh is done.
+
+        Yields `timestamp`, the refresh should only score events before it.
+        """
+        timestamp = timestamp or timezone.now()
+        with transaction.atomic():
+            self.set_refreshed(timestamp)
+            self.scored_event_model.objects.create(
+                event_type=self.refreshing_event,
+                object_id=0,
+                timestamp=timestamp)
+        try:
+            yield timestamp
+        finally:
+            self.scored_event_model.objects.filter(
+                event_type=self.refreshing_event).delete()
+
+    def get_start(self, refreshed):
+        last_scored = self.scored_events.aggregate(
+            last_scored=Max("timestamp"))["last_scored"]
+        if last_scored is None:
+            return refreshed
+        return max(refreshed, last_scored - self.safety_window)
+
+    def filter_unscored(self, qs, event_type, start):
+        return qs.exclude(
+            id__in=self.scored_events.filter(
+                event_type=event_type,
+                timestamp__gte=start).values("object_id"))
+
+    def get_events(self, start):
+        """Yields tuples of `(event_type, event)` for the events from
+        `start` that have not been scored yet.
+        """
+        logs = self.logs
+        submissions = self.filter_unscored(
+            logs.filter_timestamps(
+                logs.filter_users(logs.submissions, include_meta=False),
+                start=start),
+            "submission",
+            start)
+        for submission in submissions.order_by("id").iterator():
+            yield "submission", logs.submission_event(submission)
+        added_suggestions = self.filter_unscored(
+            logs.filter_timestamps(
+                logs.filter_users(
+                    logs.suggestions, field="user_id", include_meta=False),
+                start=start),
+            "suggestion_added",
+            start)
+        for suggestion in added_suggestions.order_by("id").iterator():
+            yield "suggestion_added", logs.suggestion_added_event(suggestion)
+        reviewed_suggestions = self.filter_unscored(
+            logs.filter_timestamps(
+                logs.filter_users(
+                    logs.suggestions.exclude(state__name="pending"),
+                    field="reviewer_id",
+                    include_meta=False),
+                start=start,
+                field="review_time"),
+            "suggestion_reviewed",
+            start)
+        for suggestion in reviewed_suggestions.order_by("id").iterator():
+            yield (
+                "suggestion_reviewed",
+                logs.suggestion_reviewed_event(suggestion))
+
+    def claim(self, events):
+        """Records `events` as scored, and returns those that had not already
+        been scored by a concurrent update.
+        """
+        def scored_event(event_type, event):
+            return self.scored_event_model(
+                event_type=event_type,
+                object_id=event.value.id,
+                timestamp=event.timestamp)
+
+        try:
+            with transaction.atomic():
+                self.scored_event_model.objects.bulk_create(
+                    scored_event(*event) for event in events)
+            return events
+        except IntegrityError:
+            pass
+        claimed = []
+        for event in events:
+            try:
+                with transaction.atomic():
+                    scored_event(*event).save()
+            except IntegrityError:
+                # scored concurrently
+                continue
+            claimed.append(event)
+        return claimed
+
+    def calculate(self, events):
+        """Returns the scores of `events` keyed by store, date and user"""
+        calculated_scores = {}
+        for event in events:
+            scores = self.get_event_scores(event)
+            if not scores:
+                continue
+            key = (
+                event.unit.store_id,
+                localdate(event.timestamp),
+                event.user.id)
+            calculated_scores[key] = calculated_scores.get(key, {})
+            for k, score in scores.items():
+                if not score:
+                    continue
+                calculated_scores[key][k] = (
+                    calculated_scores[key].get(k, 0)
+                    + score)
+        return calculated_scores
+
+    def get_tp_scores(self, store_scores):
+        tps = dict(
+            Store.objects.filter(
+                id__in=set(k[0] for k in store_scores)).values_list(
+                    "id", "translation_project_id"))
+        tp_scores = {}
+        for (store, date, user), scores in store_scores.items():
+            key = (tps[store], date, user)
+            tp_scores[key] = tp_scores.get(key, {})
+            for k, score in scores.items():
+                tp_scores[key][k] = tp_scores[key].get(k, 0) + score
+        return tp_scores
+
+    def add_scores(self, model, related_field, calculated_scores):
+        """Atomically adds `calculated_scores` to the daily scores"""
+        for (related, date, user), scores in calculated_scores.items():
+            scores = {
+                k: round(score, 2)
+                for k, score
+                in scores.items()
+                if k in self.score_fields}
+            existing = model.objects.filter(
+                **{related_field: related,
+                   "date": date,
+                   "user_id": user})
+            added = dict(
+                (k, F(k) + score)
+                for k, score
+                in scores.items())
+            if existing.update(**added):
+                continue
+            try:
+                with transaction.atomic():
+                    model.objects.create(
+                        date=date,
+                        user_id=user,
+                        **dict({related_field: related}, **scores))
+            except IntegrityError:
+                # created concurrently
+                existing.update(**added)
+
+    def update(self, **kwargs):
+        """Scores unscored events, and returns the calculated store scores.
+
+        If scores have never been refreshed, the current time is marked and
+        nothing is scored - run a full refresh first. Nothing is scored while
+        a full refresh is running.
+        """
+        suppress_scores = keep_data(
+            signals=(update_scores, ),
+            suppress=(TranslationProject, get_user_model()))
+        with transaction.atomic():
+            refreshed = self.get_refreshed()
+            if refreshed is None:
+                self.scored_event_model.objects.get_or_create(
+                    event_type=self.refresh_event,
+                    object_id=0,
+                    defaults=dict(timestamp=timezone.now()))
+                return {}
+            if self.is_refreshing():
+                # events from the start of the refresh are scored once it
+                # is done
+                return {}
+            start = self.get_start(refreshed)
+            events = self.claim(list(self.get_events(start)))
+            store_scores = self.calculate(event for __, event in events)
+            tp_scores = self.get_tp_scores(store_scores)
+            with suppress_scores:
+                self.add_scores(
+                    self.store_score_model, "store_id", store_scores)
+                self.add_scores(self.tp_score_model, "tp_id", tp_scores)
+            # later updates start after this
+            self.scored_events.filter(timestamp__lt=start).delete()
+        if tp_scores:
+            update_leaderboards(
+                self.tp_score_model.objects.filter(
+                    tp_id__in=set(k[0] for k in tp_scores),
+                    date__in=set(k[1] for k in tp_scores),
+                    user_id__in=set(k[2] for k in tp_scores)))
+        users = set(k[2] for k in store_scores)
+        if users:
+            score_updater.get(get_user_model())().update(users=users)
+        return store_scores
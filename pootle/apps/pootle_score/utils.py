@@ -10,6 +10,7 @@ from datetime import date, datetime, timedelta
 
 import pytz
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import Sum
 from django.utils.functional import cached_property
@@ -21,6 +22,7 @@ from pootle_app.models import Directory
 from pootle_language.models import Language
 
 from .apps import PootleScoreConfig
+from .leaderboard import Leaderboard
 from .models import UserTPScore
 
 
@@ -43,10 +45,16 @@ def to_datetime(possible_dt):
 class Scores(object):
     ns = "pootle.score"
     sw_version = PootleScoreConfig.version
+    leaderboard_context = None
 
     def __init__(self, context):
         self.context = context
 
+    @cached_property
+    def leaderboard(self):
+        if settings.POOTLE_SCORE_LEADERBOARDS and self.leaderboard_context:
+            return Leaderboard(self.leaderboard_context)
+
     @property
     def revision(self):
         return revision.get(Directory)(
@@ -73,6 +81,8 @@ class Scores(object):
 
         :param days: period of days to account for scores.
         """
+        if self.leaderboard is not None and days <= Leaderboard.max_days:
+            return self.leaderboard.get_top(days=days)
         return self.get_scores(days).order_by("user__username").values(
             "user__username", "user__email", "user__full_name").annotate(
                 Sum("score"),
@@ -85,17 +95,33 @@ class Scores(object):
         return qs
 
     @persistent_property
-    def top_scorers(self):
+    def cached_top_scorers(self):
         return tuple(self.get_top_scorers())
 
+    @property
+    def top_scorers(self):
+        if self.leaderboard is not None:
+            return tuple(self.get_top_scorers())
+        return self.cached_top_scorers
+
+    def count_top_scorers(self):
+        if self.leaderboard is not None:
+            return self.leaderboard.count()
+        return len(self.top_scorers)
+
     def display(self, offset=0, limit=5, language=None, formatter=None):
-        scorers = self.top_scorers
-        if offset or limit:
-            scorers = list(scorers)
-        if offset:
-            scorers = scorers[offset:]
-        if limit:
-            scorers = scorers[:limit]
+        if self.leaderboard is not None:
+            scorers = self.leaderboard.get_top(
+                offset=offset,
+                limit=limit or None)
+        else:
+            scorers = self.top_scorers
+            if offset or limit:
+                scorers = list(scorers)
+            if offset:
+                scorers = scorers[offset:]
+            if limit:
+                scorers = scorers[:limit]
         return display.get(Scores)(
             top_scores=scorers,
             formatter=formatter,
@@ -113,6 +139,10 @@ class LanguageScores(Scores):
                localdate(),
                self.revision))
 
+    @property
+    def leaderboard_context(self):
+        return "language.%s" % self.context.id
+
     def filter_scores(self, qs):
         return qs.filter(tp__language_id=self.context.id)
 
@@ -128,12 +158,17 @@ class ProjectScores(Scores):
                localdate(),
                self.revision))
 
+    @property
+    def leaderboard_context(self):
+        return "project.%s" % self.context.id
+
     def filter_scores(self, qs):
         return qs.filter(tp__project_id=self.context.id)
 
 
 class ProjectSetScores(Scores):
     ns = "pootle.score.projects"
+    leaderboard_context = "projects"
 
     @cached_property
     def cache_key(self):
@@ -155,6 +190,10 @@ class TPScores(Scores):
                localdate(),
                self.revision))
 
+    @property
+    def leaderboard_context(self):
+        return "tp.%s" % self.context.id
+
     def filter_scores(self, qs):
         return qs.filter(tp_id=self.context.id)
 
@@ -183,10 +222,21 @@ class UserScores(Scores):
     def public_score(self):
         return self.context.public_score
 
+    @cached_property
+    def language_leaderboard(self):
+        if settings.POOTLE_SCORE_LEADERBOARDS:
+            return Leaderboard("user.%s" % self.context.id)
+
     @persistent_property
-    def top_language(self):
+    def cached_top_language(self):
         return self.get_top_language()
 
+    @property
+    def top_language(self):
+        if self.language_leaderboard is not None:
+            return self.get_top_language()
+        return self.cached_top_language
+
     def get_top_language_within(self, days):
         top_lang = self.get_scores_by_language(
             days).order_by("score__sum").first()
@@ -215,6 +265,9 @@ class UserScores(Scores):
             the score for the given period for any of the languages,
             `(-1, None)` is returned.
         """
+        if (self.language_leaderboard is not None
+                and days <= Leaderboard.max_days):
+            return self.get_leaderboard_top_language(days)
         language = self.get_top_language_within(days)
         if language:
             # this only gets scores for the last 30 days as that is cached
@@ -223,3 +276,13 @@ class UserScores(Scores):
                 if user_score['user__username'] == self.context.username:
                     return index + 1, language
         return -1, language
+
+    def get_leaderboard_top_language(self, days=30):
+        top = self.language_leaderboard.get_top_members(days=days, limit=1)
+        if not top:
+            return -1, None
+        language = Language.objects.get(id=top[0][0])
+        position = scores.get(Language)(language).leaderboard.rank(
+            self.context.id,
+            days=days)
+        return position or -1, language
@@ -6,6 +6,7 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import bisect
 import difflib
 import logging
 from collections import OrderedDict
@@ -80,6 +81,104 @@ class FileUnit(UnitDiffProxy):
         return self.unit["hasplural"]
 
 
+class DifflibSequenceMatcher(object):
+    """Diffs 2 sequences using `difflib.SequenceMatcher`"""
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+
+    def get_opcodes(self):
+        return difflib.SequenceMatcher(None, self.a, self.b).get_opcodes()
+
+
+class KeyedSequenceMatcher(DifflibSequenceMatcher):
+    """Diffs 2 sequences of unique keys, such as unitids
+
+    The matching keys are the longest increasing subsequence of the
+    common keys' positions, which for unique keys is also their longest
+    common subsequence. This runs in O(n log n) and returns
+    `difflib`-compatible opcodes.
+
+    If either sequence contains duplicate keys it falls back to
+    `difflib.SequenceMatcher`.
+    """
+
+    @property
+    def keyed(self):
+        return (
+            len(set(self.a)) == len(self.a)
+            and len(set(self.b)) == len(self.b))
+
+    def get_matching_pairs(self):
+        """Returns a list of ``(i, j)`` tuples where ``a[i] == b[j]``,
+        increasing in both ``i`` and ``j``
+        """
+        a_positions = {k: i for i, k in enumerate(self.a)}
+        common = [
+            (a_positions[k], j)
+            for j, k
+            in enumerate(self.b)
+            if k in a_positions]
+        # patience sort - `tails[n]` is the smallest `a` position that ends
+        # an increasing run of length `n + 1`
+        tails = []
+        tail_idx = []
+        previous = [None] * len(common)
+        for idx, (i, j_) in enumerate(common):
+            pile = bisect.bisect_left(tails, i)
+            if pile:
+                previous[idx] = tail_idx[pile - 1]
+            if pile == len(tails):
+                tails.append(i)
+                tail_idx.append(idx)
+            else:
+                tails[pile] = i
+                tail_idx[pile] = idx
+        pairs = []
+        idx = tail_idx[-1] if tail_idx else None
+        while idx is not None:
+            pairs.append(common[idx])
+            idx = previous[idx]
+        pairs.reverse()
+        return pairs
+
+    def get_matching_blocks(self):
+        """Returns a list of ``(i, j, n)`` blocks as
+        `difflib.SequenceMatcher.get_matching_blocks`
+        """
+        blocks = []
+        for i, j in self.get_matching_pairs():
+            if blocks:
+                last_i, last_j, n = blocks[-1]
+                if last_i + n == i and last_j + n == j:
+                    blocks[-1] = (last_i, last_j, n + 1)
+                    continue
+            blocks.append((i, j, 1))
+        blocks.append((len(self.a), len(self.b), 0))
+        return blocks
+
+    def get_opcodes(self):
+        if not self.keyed:
+            return super(KeyedSequenceMatcher, self).get_opcodes()
+        i = j = 0
+        opcodes = []
+        for ai, bj, size in self.get_matching_blocks():
+            tag = ''
+            if i < ai and j < bj:
+                tag = 'replace'
+            elif i < ai:
+                tag = 'delete'
+            elif j < bj:
+                tag = 'insert'
+            if tag:
+                opcodes.append((tag, i, ai, j, bj))
+            i, j = ai + size, bj + size
+            if size:
+                opcodes.append(('equal', ai, i, bj, j))
+        return opcodes
+
+
 class DiffableStore(object):
     """Default Store representation for diffing
 
@@ -88,6 +187,7 @@ class DiffableStore(object):
 
     file_unit_class = FileUnit
     db_unit_class = DBUnit
+    sequence_matcher_class = KeyedSequenceMatcher
 
     unit_fields = (
         "unitid", "state", "id", "index", "revision",
@@ -140,6 +240,10 @@ class DiffableStore(object):
             diff_units[unit.getid()] = self.get_file_unit(unit)
         return diff_units
 
+    def get_opcodes(self, target_unitids, source_unitids):
+        return self.sequence_matcher_class(
+            target_unitids, source_unitids).get_opcodes()
+
     @cached_property
     def target_units(self):
         return self.get_db_units(self.target_store.unit_set)
@@ -272,10 +376,9 @@ class StoreDiff(object):
 
     @cached_property
     def opcodes(self):
-        sm = difflib.SequenceMatcher(None,
-                                     self.active_target_units,
-                                     self.new_unit_list)
-        return sm.get_opcodes()
+        return self.diffable.get_opcodes(
+            self.active_target_units,
+            self.new_unit_list)
 
     @cached_property
     def updated_target_units(self):
@@ -14,7 +14,7 @@ from translate.filters.decorators import Category
 
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import F
+from django.db.models import Case, F, IntegerField, Value, When
 from django.template.defaultfilters import truncatechars
 from django.urls import reverse
 from django.utils.encoding import force_bytes
@@ -35,6 +35,7 @@ from pootle.core.utils.aggregate import max_column
 from pootle.core.utils.multistring import PLURAL_PLACEHOLDER
 from pootle.core.utils.timezone import datetime_min
 from pootle_checks.constants import CHECK_NAMES
+from pootle_checks.results import check_results
 from pootle_statistics.models import SubmissionFields, SubmissionTypes
 
 from .abstracts import (
@@ -538,7 +539,11 @@ class Unit(AbstractUnit):
             return False
 
         checker = self.store.translation_project.checker
-        qc_failures = checker.run_filters(self, categorised=True)
+        qc_failures = check_results.get_failures(
+            checker,
+            self,
+            None,
+            lambda: checker.run_filters(self, categorised=True))
         checks_to_add = []
         for name in qc_failures.iterkeys():
             if name in existing:
@@ -602,7 +607,8 @@ class Unit(AbstractUnit):
 
 # # # # # # # # # # # TranslationUnit # # # # # # # # # # # # # #
 
-    def update_tmserver(self):
+    def get_tm_document(self):
+        """Returns the document indexed for this unit in the TM servers"""
         obj = {
             'id': self.id,
             # 'revision' must be an integer for statistical queries to work
@@ -628,9 +634,11 @@ class Unit(AbstractUnit):
                 'email_md5': md5(
                     force_bytes(self.change.submitted_by.email)).hexdigest(),
             })
+        return obj
 
+    def update_tmserver(self):
         get_tm_broker().update(self.store.translation_project.language.code,
-                               obj)
+                               self.get_tm_document())
 
     def get_tm_suggestions(self):
         return get_tm_broker().search(self)
@@ -922,6 +930,45 @@ class Store(AbstractStore):
         Unit.objects.filter(store_id=self.id, index__gte=start).update(
             index=operator.add(F('index'), delta))
 
+    def update_indexes(self, index_updates, batch_size=400):
+        """Applies `(start, delta)` index updates, with the same result as
+        calling `update_index` with each of them in turn.
+
+        Rather than updating the tail of the store for each of the updates,
+        the shift of each range of the current indexes is calculated and
+        the units are updated with a CASE over the ranges, so each unit is
+        updated once.
+        """
+        ranges = []
+        offset = 0
+        for start, delta in index_updates:
+            # start of the range in the current indexes
+            start = start - offset
+            if delta <= 0 or (ranges and start < ranges[-1][0]):
+                # not in the order of the diff, apply them as given
+                for start, delta in index_updates:
+                    self.update_index(start=start, delta=delta)
+                return
+            offset += delta
+            ranges.append((start, offset))
+        # update the highest ranges first, so that units are moved out of
+        # the lower ranges before they are updated
+        for i in reversed(range(0, len(ranges), batch_size)):
+            batch = ranges[i:i + batch_size]
+            units = Unit.objects.filter(
+                store_id=self.id, index__gte=batch[0][0])
+            if i + batch_size < len(ranges):
+                units = units.filter(index__lt=ranges[i + batch_size][0])
+            units.update(
+                index=operator.add(
+                    F("index"),
+                    Case(
+                        *[When(index__gte=start, then=Value(shift))
+                          for start, shift
+                          in reversed(batch)],
+                        default=Value(0),
+                        output_field=IntegerField())))
+
     @cached_property
     def data_tool(self):
         return data_tool.get(self.__class__)(self)
@@ -967,6 +1014,10 @@ class Store(AbstractStore):
         return StoreSerialization(self).serialize(
             include_obsolete=include_obsolete, raw=raw)
 
+    def stream(self, include_obsolete=False, raw=False):
+        return StoreSerialization(self).stream(
+            include_obsolete=include_obsolete, raw=raw)
+
 # # # # # # # # # # # #  TranslationStore # # # # # # # # # # # # #
 
     suggestions_in_format = True
@@ -8,6 +8,7 @@
 
 from hashlib import md5
 
+from django.conf import settings
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.utils.encoding import force_bytes
@@ -18,6 +19,7 @@ from pootle.core.signals import update_checks, update_data
 
 from .constants import FUZZY, TRANSLATED, UNTRANSLATED
 from .models import Suggestion, Unit, UnitChange, UnitSource
+from .tm import queue_tm_update
 
 
 @receiver(post_save, sender=Suggestion)
@@ -112,5 +114,9 @@ def handle_unit_change(**kwargs):
     new_untranslated = (created and unit.state == UNTRANSLATED)
     if not new_untranslated:
         update_checks.send(unit.__class__, instance=unit)
-    if unit.istranslated():
+    if not unit.istranslated():
+        return
+    if settings.POOTLE_TM_QUEUE:
+        queue_tm_update([unit.id])
+    else:
         unit.update_tmserver()
@@ -6,6 +6,10 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import itertools
+
+from translate.storage import pypo
+
 from django.utils.functional import cached_property
 
 from pootle.core.delegate import config, serializers
@@ -46,17 +50,53 @@ class StoreSerialization(object):
             found_serializers.append(available_serializers[serializer])
         return found_serializers
 
-    def tostring(self, include_obsolete=False, raw=False):
-        store = self.store.syncer.convert(
-            include_obsolete=include_obsolete, raw=raw)
+    @property
+    def streamable(self):
+        """Output can be streamed unit by unit if the format is PO and there
+        are no serializers that need the whole output.
+        """
+        return (
+            not self.serializers
+            and issubclass(self.store.syncer.file_class, pypo.pofile))
+
+    def update_header(self, store):
         if hasattr(store, "updateheader"):
             # FIXME We need those headers on import
             # However some formats just don't support setting metadata
             max_unit_revision = self.max_unit_revision or 0
             store.updateheader(add=True, X_Pootle_Path=self.pootle_path)
             store.updateheader(add=True, X_Pootle_Revision=max_unit_revision)
+
+    def tostring(self, include_obsolete=False, raw=False):
+        store = self.store.syncer.convert(
+            include_obsolete=include_obsolete, raw=raw)
+        self.update_header(store)
         return str(store)
 
+    def stream(self, include_obsolete=False, raw=False):
+        """Yields the serialized Store in chunks.
+
+        PO Stores are serialized one unit at a time, matching the output of
+        `pypo.pofile.serialize`. Other formats, or Stores with serializers
+        configured, are serialized in a single chunk.
+        """
+        if not self.streamable:
+            yield self.serialize(include_obsolete=include_obsolete, raw=raw)
+            return
+        syncer = self.store.syncer
+        output = syncer.create_output()
+        self.update_header(output)
+        units = itertools.chain(
+            output.units,
+            syncer.iter_units(
+                unitclass=output.UnitClass,
+                include_obsolete=include_obsolete,
+                raw=raw))
+        for i, unit in enumerate(units):
+            yield (
+                (b"\n" if i else b"")
+                + unit._getoutput().encode(output.encoding))
+
     def pipeline(self, data):
         if not self.serializers:
             return data
@@ -16,12 +16,33 @@ from django.utils.functional import cached_property
 
 from pootle.core.delegate import format_classes
 
+from .constants import FUZZY, OBSOLETE
 from .models import Unit
+from .unit.proxy import UnitProxy
 
 
 logger = logging.getLogger(__name__)
 
 
+class SyncUnitProxy(UnitProxy):
+    """Wraps a values Unit dictionary for syncing/serializing"""
+
+    def getcontext(self):
+        return self.unit["context"]
+
+    def getid(self):
+        return self.unit["unitid"]
+
+    def getnotes(self, origin=None):
+        return self.unit.get("%s_comment" % origin) or ""
+
+    def isfuzzy(self):
+        return self.unit["state"] == FUZZY
+
+    def isobsolete(self):
+        return self.unit["state"] == OBSOLETE
+
+
 class UnitSyncer(object):
 
     def __init__(self, unit, raw=False):
@@ -118,6 +139,10 @@ class UnitSyncer(object):
 
 class StoreSyncer(object):
     unit_sync_class = UnitSyncer
+    unit_proxy_class = SyncUnitProxy
+    unit_fields = (
+        "unitid", "state", "source_f", "target_f", "context",
+        "developer_comment", "translator_comment", "locations")
 
     def __init__(self, store):
         self.store = store
@@ -158,6 +183,13 @@ class StoreSyncer(object):
                          str(self.store.filetype.extension)])))
         return self._getclass(self.store)
 
+    def create_output(self, fileclass=None):
+        """create an empty store of fileclass"""
+        output = (fileclass or self.file_class)()
+        output.settargetlanguage(self.language.code)
+        # FIXME: we should add some headers
+        return output
+
     def convert(self, fileclass=None, include_obsolete=False, raw=False):
         """export to fileclass"""
         fileclass = fileclass or self.file_class
@@ -165,9 +197,7 @@ class StoreSyncer(object):
             u"[sync] Converting: %s to %s",
             self.store.pootle_path,
             fileclass)
-        output = fileclass()
-        output.settargetlanguage(self.language.code)
-        # FIXME: we should add some headers
+        output = self.create_output(fileclass)
         units = (
             self.store.unit_set
             if include_obsolete
@@ -177,6 +207,18 @@ class StoreSyncer(object):
                 self.unit_sync_class(unit, raw=raw).convert(output.UnitClass))
         return output
 
+    def iter_units(self, unitclass=None, include_obsolete=False, raw=False):
+        """yield converted units one at a time from a `values` iterator"""
+        units = (
+            self.store.unit_set
+            if include_obsolete
+            else self.store.units)
+        unitclass = unitclass or self.unit_class
+        for unit in units.values(*self.unit_fields).iterator():
+            yield self.unit_sync_class(
+                self.unit_proxy_class(unit),
+                raw=raw).convert(unitclass)
+
     def _getclass(self, obj):
         try:
             return getclass(obj)
@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import time
+import uuid
+from hashlib import md5
+
+from django_redis import get_redis_connection
+from django_rq.queues import get_queue
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+
+from pootle.core.cache import get_cache
+from pootle.core.search.broker import get_tm_revision
+
+from .models import Unit, get_tm_broker
+
+
+logger = logging.getLogger(__name__)
+
+
+# Adds unit ids to the queue, unless the queue is full. Ids that are already
+# queued keep their original time, so that the lag is measured from the
+# first pending update.
+#
+# KEYS: queue
+# ARGV: max size, time, unit ids...
+ENQUEUE_SCRIPT = """
+if redis.call("ZCARD", KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+for i = 3, #ARGV do
+    if not redis.call("ZSCORE", KEYS[1], ARGV[i]) then
+        redis.call("ZADD", KEYS[1], ARGV[2], ARGV[i])
+    end
+end
+return 1
+"""
+
+# Moves up to ARGV[1] of the oldest queued ids to the processing set
+#
+# KEYS: queue, processing
+# ARGV: batch size
+CLAIM_SCRIPT = """
+local items = redis.call(
+    "ZRANGE", KEYS[1], 0, tonumber(ARGV[1]) - 1, "WITHSCORES")
+for i = 1, #items, 2 do
+    redis.call("ZADD", KEYS[2], items[i + 1], items[i])
+    redis.call("ZREM", KEYS[1], items[i])
+end
+return items
+"""
+
+# Moves all ids in the processing set back to the queue
+#
+# KEYS: processing, queue
+RECOVER_SCRIPT = """
+local items = redis.call("ZRANGE", KEYS[1], 0, -1, "WITHSCORES")
+for i = 1, #items, 2 do
+    if not redis.call("ZSCORE", KEYS[2], items[i]) then
+        redis.call("ZADD", KEYS[2], items[i + 1], items[i])
+    end
+end
+redis.call("DEL", KEYS[1])
+return #items / 2
+"""
+
+# Extends the lock if it is still held with the token, or deletes it if the
+# timeout is 0
+#
+# KEYS: lock
+# ARGV: token, timeout
+RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[2]) == 0 then
+    return redis.call("DEL", KEYS[1])
+end
+return redis.call("EXPIRE", KEYS[1], ARGV[2])
+"""
+
+
+def flush_tm_queue():
+    TMUpdateQueue().flush()
+
+
+def queue_tm_update(unit_ids):
+    """Queues TM updates for `unit_ids` once the current transaction is
+    committed - failing to queue them never fails the save
+    """
+
+    def _queue():
+        try:
+            TMUpdateQueue().add(unit_ids)
+        except RedisError as e:
+            logger.error("Unable to queue TM updates: %s", e)
+
+    transaction.on_commit(_queue)
+
+
+def prefetch_tm_results(unit_ids):
+    TMSuggestions().prefetch(
+        Unit.objects.filter(id__in=unit_ids).select_related(
+            "store__translation_project__language"))
+
+
+def queue_tm_prefetch(unit_ids):
+    """Caches the TM results of `unit_ids` in the background, so that TM
+    searches never hold up the request - failing to queue them is ignored
+    """
+    try:
+        get_queue("default").enqueue(prefetch_tm_results, list(unit_ids))
+    except RedisError as e:
+        logger.error("Unable to queue TM prefetch: %s", e)
+
+
+class TMUpdateQueue(object):
+    """Queue of units to update in the auto-updated TM servers
+
+    Unit ids are kept in a Redis sorted set scored by the time they were
+    first queued, so repeated saves of a unit are coalesced. A background
+    job indexes the queued units in batches with the bulk API of the TM
+    servers.
+
+    Only one flusher runs at a time, renewing its lock after each batch. Ids
+    are moved to a processing set while they are indexed, and are returned
+    to the queue if a flusher dies.
+    """
+
+    ns = "pootle.store.tm"
+    lock_timeout = 600
+
+    @cached_property
+    def redis(self):
+        return get_redis_connection("redis")
+
+    @property
+    def queue_key(self):
+        return "%s.queue" % self.ns
+
+    @property
+    def processing_key(self):
+        return "%s.processing" % self.ns
+
+    @property
+    def lock_key(self):
+        return "%s.lock" % self.ns
+
+    @property
+    def scheduled_key(self):
+        return "%s.scheduled" % self.ns
+
+    @property
+    def dropped_key(self):
+        return "%s.dropped" % self.ns
+
+    @property
+    def batch_size(self):
+        return settings.POOTLE_TM_QUEUE_BATCH_SIZE
+
+    @property
+    def max_size(self):
+        return settings.POOTLE_TM_QUEUE_MAX_SIZE
+
+    @property
+    def retries(self):
+        return settings.POOTLE_TM_QUEUE_RETRIES
+
+    @property
+    def retry_delay(self):
+        return 1
+
+    @cached_property
+    def enqueue_script(self):
+        return self.redis.register_script(ENQUEUE_SCRIPT)
+
+    @cached_property
+    def claim_script(self):
+        return self.redis.register_script(CLAIM_SCRIPT)
+
+    @cached_property
+    def recover_script(self):
+        return self.redis.register_script(RECOVER_SCRIPT)
+
+    @cached_property
+    def renew_script(self):
+        return self.redis.register_script(RENEW_SCRIPT)
+
+    @property
+    def size(self):
+        return (
+            self.redis.zcard(self.queue_key)
+            + self.redis.zcard(self.processing_key))
+
+    @property
+    def lag(self):
+        """Seconds since the oldest pending update was queued"""
+        oldest = [
+            items[0][1]
+            for items
+            in [self.redis.zrange(key, 0, 0, withscores=True)
+                for key
+                in (self.queue_key, self.processing_key)]
+            if items]
+        if not oldest:
+            return 0
+        return max(time.time() - min(oldest), 0)
+
+    @property
+    def dropped(self):
+        return int(self.redis.get(self.dropped_key) or 0)
+
+    def stats(self):
+        return dict(size=self.size, lag=self.lag, dropped=self.dropped)
+
+    def add(self, unit_ids):
+        """Queues `unit_ids` for update and schedules a flush
+
+        If the queue is full the updates are dropped rather than waiting for
+        the queue to drain, they can be recovered with
+        `update_tmserver --refresh`.
+        """
+        unit_ids = list(unit_ids)
+        if not unit_ids:
+            return
+        added = self.enqueue_script(
+            keys=[self.queue_key],
+            args=[self.max_size, time.time()] + unit_ids)
+        if not added:
+            self.redis.incrby(self.dropped_key, len(unit_ids))
+            logger.warning(
+                "TM update queue is full, dropped updates for %s units",
+                len(unit_ids))
+        self.schedule()
+
+    def schedule(self):
+        if self.redis.set(self.scheduled_key, 1, nx=True,
+                          ex=self.lock_timeout):
+            get_queue("default").enqueue(flush_tm_queue)
+
+    def claim(self):
+        items = self.claim_script(
+            keys=[self.queue_key, self.processing_key],
+            args=[self.batch_size])
+        return [int(unit_id) for unit_id in items[::2]]
+
+    def recover(self):
+        return self.recover_script(
+            keys=[self.processing_key, self.queue_key])
+
+    def renew_lock(self, token):
+        """Extends the flush lock, returning `False` if it is no longer held
+        with `token`
+        """
+        return bool(
+            self.renew_script(
+                keys=[self.lock_key],
+                args=[token, self.lock_timeout]))
+
+    def release_lock(self, token):
+        self.renew_script(keys=[self.lock_key], args=[token, 0])
+
+    def get_documents(self, unit_ids):
+        units = Unit.objects.filter(id__in=unit_ids).select_related(
+            "change__submitted_by",
+            "store__translation_project__project",
+            "store__translation_project__language")
+        documents = {}
+        for unit in units.iterator():
+            if not unit.istranslated():
+                continue
+            documents.setdefault(
+                unit.store.translation_project.language.code,
+                []).append(unit.get_tm_document())
+        return documents
+
+    def index(self, unit_ids):
+        """Updates the TM servers with the documents of `unit_ids`, retrying
+        with a backoff if they fail
+        """
+        documents = self.get_documents(unit_ids)
+        for attempt in range(self.retries + 1):
+            try:
+                for language, objs in documents.items():
+                    get_tm_broker().bulk_update(language, objs)
+                return True
+            except Exception as e:
+                logger.warning(
+                    "TM update failed (attempt %s): %s", attempt + 1, e)
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        self.redis.incrby(self.dropped_key, len(unit_ids))
+        logger.error(
+            "TM update failed, dropped updates for %s units", len(unit_ids))
+        return False
+
+    def flush(self):
+        """Indexes queued units in batches until the queue is empty
+
+        Returns the number of units that were processed, or `None` if
+        another flusher is running.
+        """
+        # updates queued from now on need a new flush - if another flusher
+        # is running it will see them, or reschedule when it finishes
+        self.redis.delete(self.scheduled_key)
+        token = uuid.uuid4().hex
+        if not self.redis.set(self.lock_key, token, nx=True,
+                              ex=self.lock_timeout):
+            return None
+        processed = 0
+        try:
+            self.recover()
+            while True:
+                unit_ids = self.claim()
+                if not unit_ids:
+                    break
+                self.index(unit_ids)
+                if not self.renew_lock(token):
+                    # the lock expired, and another flusher may have
+                    # recovered the batch
+                    logger.warning(
+                        "TM update queue lock expired, stopping flush")
+                    break
+                self.redis.zrem(self.processing_key, *unit_ids)
+                processed += len(unit_ids)
+        finally:
+            self.release_lock(token)
+        if self.redis.zcard(self.queue_key):
+            self.schedule()
+        return processed
+
+
+class TMSuggestions(object):
+    """Cached TM results of units
+
+    Results are cached by the language and source of a unit, and by the
+    TM revision of the language, which changes whenever the TM of the
+    language is updated. As the results of a unit exclude the unit itself,
+    its id is part of the key too.
+
+    Failed searches are not cached.
+    """
+
+    ns = "pootle.store.tm.suggestions"
+    cache_timeout = 3600
+
+    @cached_property
+    def cache(self):
+        return get_cache()
+
+    @cached_property
+    def revisions(self):
+        return {}
+
+    def get_revision(self, language):
+        if language not in self.revisions:
+            self.revisions[language] = get_tm_revision(language)
+        return self.revisions[language]
+
+    def get_cache_key(self, unit):
+        language = unit.store.translation_project.language.code
+        return (
+            "%s.%s.%s.%s.%s"
+            % (self.ns,
+               language,
+               md5(force_bytes(unit.source)).hexdigest(),
+               unit.id,
+               self.get_revision(language)))
+
+    def get(self, unit):
+        """Returns the TM results of `unit`"""
+        key = self.get_cache_key(unit)
+        results = self.cache.get(key)
+        if results is None:
+            results = get_tm_broker().search_many([unit]).get(unit.id)
+            if results is None:
+                # the search failed
+                return []
+            self.cache.set(key, results, self.cache_timeout)
+        return results
+
+    def prefetch(self, units):
+        """Caches the TM results of any of `units` that are not cached yet,
+        searching for them together
+        """
+        keys = {unit.id: self.get_cache_key(unit) for unit in units}
+        cached = self.cache.get_many(keys.values())
+        missing = [unit for unit in units if keys[unit.id] not in cached]
+        if not missing:
+            return
+        results = get_tm_broker().search_many(missing)
+        self.cache.set_many(
+            {keys[unit_id]: unit_results
+             for unit_id, unit_results
+             in results.items()},
+            self.cache_timeout)
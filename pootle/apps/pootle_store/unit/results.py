@@ -132,7 +132,8 @@ class GroupedResults(object):
             for unit
             in Unit.objects.filter(
                 pk__in=self.units).values(*self.select_fields)}
-        units = [units[pk] for pk in self.units]
+        # units may have been deleted since a cached search snapshot was made
+        units = [units[pk] for pk in self.units if pk in units]
         units_by_path = groupby(
             units,
             lambda x: x["store__pootle_path"])
@@ -6,9 +6,17 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from django.db.models import Max
+from array import array
+from hashlib import md5
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils.encoding import force_bytes
 from django.utils.functional import cached_property
 
+from pootle.core.cache import get_cache
+from pootle.core.delegate import revision
+from pootle_app.models import Directory
 from pootle_store.constants import SIMPLY_SORTED
 from pootle_store.models import Unit
 from pootle_store.unit.filters import UnitSearchFilter, UnitTextSearch
@@ -17,7 +25,9 @@ from pootle_store.unit.filters import UnitSearchFilter, UnitTextSearch
 class DBSearchBackend(object):
 
     default_chunk_size = None
-    default_order = "store__pootle_path", "index"
+    default_order = "store__pootle_path", "index", "pk"
+    paging_kwargs = "count", "offset", "previous_uids", "uids"
+    total_cache_timeout = 60
     select_related = (
         'store__translation_project__project',
         'store__translation_project__language')
@@ -144,22 +154,199 @@ class DBSearchBackend(object):
     def results(self):
         return self.sort_qs(self.filter_qs(self.units_qs))
 
-    def search(self):
-        total = self.results.count()
-        start = self.offset
+    @property
+    def keyset_paginated(self):
+        """Results in the default order can be paged by seeking from a
+        unit's (store path, index, pk) rather than with offsets.
+        """
+        return not (self.unit_filter and self.sort_by is not None)
 
-        if start > (total + len(self.previous_uids)):
-            return total, total, total, self.results.none()
+    @property
+    def revision_path(self):
+        """Path of the Directory whose revisions change whenever units in
+        the searched path change
+        """
+        if self.language_code and self.project_code:
+            return (
+                "/%s/%s/%s"
+                % (self.language_code,
+                   self.project_code,
+                   self.dir_path or ""))
+        elif self.language_code:
+            return "/%s/" % self.language_code
+        elif self.project_code:
+            return "/projects/%s/" % self.project_code
+        return "/projects/"
+
+    @cached_property
+    def path_revision(self):
+        directory = Directory.objects.filter(
+            pootle_path=self.revision_path).first()
+        if directory is None:
+            return ""
+        return revision.get(Directory)(directory).get(key="stats")
+
+    @property
+    def search_cache_key(self):
+        search_kwargs = sorted(
+            (k, getattr(v, "pk", v))
+            for k, v
+            in self.kwargs.items()
+            if k not in self.paging_kwargs)
+        return md5(
+            force_bytes(
+                repr(
+                    [self.__class__.__name__,
+                     getattr(self.request_user, "pk", None),
+                     self.path_revision,
+                     search_kwargs]))).hexdigest()
+
+    @property
+    def total_cache_key(self):
+        return "pootle.search.total.%s" % self.search_cache_key
+
+    @property
+    def snapshot_cache_key(self):
+        return "pootle.search.snapshot.%s" % self.search_cache_key
+
+    @property
+    def snapshot_timeout(self):
+        return settings.POOTLE_SEARCH_SNAPSHOT_TIMEOUT
+
+    def get_total(self):
+        """Count of the results, cached until units change"""
+        cache = get_cache()
+        cache_key = self.total_cache_key
+        total = cache.get(cache_key)
+        if total is None:
+            total = self.results.count()
+            cache.set(cache_key, total, self.total_cache_timeout)
+        return total
+
+    def pack_uids(self, uids):
+        packed = array("I", uids)
+        if hasattr(packed, "tobytes"):
+            return packed.tobytes()
+        return packed.tostring()
+
+    def unpack_uids(self, packed):
+        uids = array("I")
+        if hasattr(uids, "frombytes"):
+            uids.frombytes(packed)
+        else:
+            uids.fromstring(packed)
+        return uids.tolist()
+
+    @cached_property
+    def snapshot(self):
+        """Ordered uids of the results, cached until units in the searched
+        path change, or `None` if snapshots are disabled or the results can
+        be keyset paginated
+        """
+        if self.keyset_paginated or not self.snapshot_timeout:
+            return None
+        cache = get_cache()
+        cache_key = self.snapshot_cache_key
+        packed = cache.get(cache_key)
+        if packed is not None:
+            return self.unpack_uids(packed)
+        uids = list(self.results.values_list("pk", flat=True))
+        cache.set(cache_key, self.pack_uids(uids), self.snapshot_timeout)
+        return uids
+
+    def get_unit_key(self, uids):
+        """Returns the (store path, index, pk) of the last unit of `uids`
+        that is in the results
+
+        `index` is not unique within a store, so `pk` breaks ties.
+        """
+        return self.results.filter(pk__in=uids).order_by(
+            *["-%s" % field for field in self.default_order]).values_list(
+                *self.default_order).first()
+
+    def get_position(self, key):
+        """Returns the position of the unit with `key` in the results,
+        counting preceding units rather than loading them.
+        """
+        pootle_path, index, pk = key
+        return self.results.filter(
+            Q(store__pootle_path__lt=pootle_path)
+            | Q(store__pootle_path=pootle_path, index__lt=index)
+            | Q(store__pootle_path=pootle_path, index=index, pk__lt=pk)).count()
 
-        find_unit = (
+    def seek(self, key, limit):
+        """Returns uids of up to `limit` results following the unit with
+        `key`
+        """
+        pootle_path, index, pk = key
+        return list(
+            self.results.filter(
+                Q(store__pootle_path__gt=pootle_path)
+                | Q(store__pootle_path=pootle_path, index__gt=index)
+                | Q(store__pootle_path=pootle_path, index=index, pk__gt=pk))
+            [:limit].values_list("pk", flat=True))
+
+    @property
+    def find_unit(self):
+        return (
             self.language_code
             and self.project_code
             and self.filename
             and self.uids)
+
+    def search_snapshot(self, uid_list):
+        total = len(uid_list)
+        start = self.offset
+
+        if start > (total + len(self.previous_uids)):
+            return total, total, total, []
+        if self.chunk_size is None:
+            return total, 0, total, uid_list
+        size = 2 * self.chunk_size
+        if self.find_unit:
+            if self.uids[0] in uid_list:
+                start = int(uid_list.index(self.uids[0]) / size) * size
+        elif self.previous_uids and self.offset:
+            # start from the last of the previous units still in the results
+            _start = start = max(self.offset - len(self.previous_uids), 0)
+            previous_uids = set(self.previous_uids)
+            window = uid_list[_start:self.offset + size]
+            for i, uid in enumerate(window):
+                if uid in previous_uids:
+                    start = _start + i + 1
+        start = start or 0
+        end = min(start + size, total)
+        return total, start, end, uid_list[start:end]
+
+    def search(self):
+        if self.snapshot is not None:
+            return self.search_snapshot(self.snapshot)
+        total = self.get_total()
+        start = self.offset
+
+        if start > (total + len(self.previous_uids)):
+            return total, total, total, self.results.none()
+
+        find_unit = self.find_unit
         find_next_slice = (
             self.previous_uids
             and self.offset)
 
+        previous_key = (
+            not find_unit
+            and find_next_slice
+            and self.keyset_paginated
+            and self.get_unit_key(self.previous_uids))
+        if previous_key:
+            # continue from the last of the previous units still in the
+            # results
+            start = self.get_position(previous_key) + 1
+            end = min(start + (2 * self.chunk_size), total)
+            return (
+                total,
+                start,
+                end,
+                self.seek(previous_key, 2 * self.chunk_size))
         if not find_unit and find_next_slice:
             # if both previous_uids and offset are set then try to ensure
             # that the results we are returning start from the end of previous
@@ -179,7 +366,13 @@ class DBSearchBackend(object):
                 start,
                 end,
                 uid_list[offset:offset + (2 * self.chunk_size)])
-        if find_unit:
+        if find_unit and self.chunk_size and self.keyset_paginated:
+            unit_key = self.get_unit_key(self.uids[:1])
+            if unit_key:
+                start = (
+                    int(self.get_position(unit_key) / (2 * self.chunk_size))
+                    * (2 * self.chunk_size))
+        elif find_unit:
             # find the uid in the Store
             uid_list = list(self.results.values_list("pk", flat=True))
             if self.chunk_size and self.uids[0] in uid_list:
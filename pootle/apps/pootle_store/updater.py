@@ -9,6 +9,7 @@
 import logging
 
 from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save
 from django.utils.functional import cached_property
 
 from pootle.core.delegate import frozen, review, versioned
@@ -19,6 +20,7 @@ from .constants import OBSOLETE, PARSED, POOTLE_WINS
 from .diff import StoreDiff
 from .models import Suggestion
 from .util import get_change_str
+from .utils import BulkUnitCreator, BulkUnitSaver
 
 
 logger = logging.getLogger(__name__)
@@ -90,9 +92,10 @@ class StoreUpdate(object):
 class UnitUpdater(object):
     """Updates a unit from a source with configuration"""
 
-    def __init__(self, db_unit, update):
+    def __init__(self, db_unit, update, saver=None):
         self.db_unit = db_unit
         self.update = update
+        self.saver = saver
         self.original = frozen.get(db_unit.__class__)(db_unit)
         self.original_submitter = (
             db_unit.changed and db_unit.change.submitted_by)
@@ -261,6 +264,9 @@ class UnitUpdater(object):
 
     def save_unit(self):
         self.db_unit.revision = self.update.update_revision
+        if self.saver is not None:
+            self.saver.add(self.db_unit)
+            return
         self.db_unit.save(
             user=self.update.user,
             changed_with=self.update.submission_type)
@@ -282,7 +288,10 @@ class UnitUpdater(object):
             self.db_unit.index = self.update.get_index(self.uid)
             reordered = True
             if not updated:
-                self.db_unit.save(user=self.update.user)
+                if self.saver is not None:
+                    self.saver.add(self.db_unit)
+                else:
+                    self.db_unit.save(user=self.update.user)
         if self.should_create_suggestion:
             suggested = self.create_suggestion()
         if updated:
@@ -293,6 +302,8 @@ class UnitUpdater(object):
 class StoreUpdater(object):
 
     unit_updater_class = UnitUpdater
+    unit_creator_class = BulkUnitCreator
+    unit_saver_class = BulkUnitSaver
 
     def __init__(self, target_store):
         self.target_store = target_store
@@ -331,14 +342,18 @@ class StoreUpdater(object):
         try:
             diff = StoreDiff(self.target_store, store, store_revision).diff()
             if diff is not None:
-                update_revision = Revision.incr()
-                changes = self.update_from_diff(
-                    store,
-                    store_revision,
-                    diff, update_revision,
-                    user, submission_type,
-                    resolve_conflict,
-                    allow_add_and_obsolete)
+                # reserve revisions for the update and each changed unit
+                reserved = Revision.reserved(
+                    1 + len(diff["add"]) + len(diff["update"][0]))
+                with reserved:
+                    update_revision = Revision.incr()
+                    changes = self.update_from_diff(
+                        store,
+                        store_revision,
+                        diff, update_revision,
+                        user, submission_type,
+                        resolve_conflict,
+                        allow_add_and_obsolete)
         finally:
             if old_state < PARSED:
                 self.target_store.state = PARSED
@@ -352,6 +367,31 @@ class StoreUpdater(object):
                     (self.target_store.data.max_unit_revision or 0))
         return update_revision, changes
 
+    def add_units(self, units, update_revision, user=None,
+                  changed_with=None):
+        """Adds new units to the store in bulk.
+
+        :param units: list of `(unit, index)` tuples of units to add.
+        :return: The number of units added.
+        """
+        new_units = []
+        for unit, index in units:
+            new_unit = self.target_store.UnitClass(
+                store=self.target_store,
+                index=index)
+            new_unit.update(unit, user=user)
+            new_unit.revision = update_revision
+            # set the fields that are updated when the unit is saved
+            pre_save.send(
+                new_unit.__class__, instance=new_unit, raw=False,
+                using=None, update_fields=None)
+            new_units.append(new_unit)
+        return self.unit_creator_class(
+            self.target_store,
+            update_revision,
+            user=user,
+            changed_with=changed_with).create(new_units)
+
     def mark_units_obsolete(self, uids_to_obsolete, update):
         """Marks a bulk of units as obsolete.
 
@@ -404,18 +444,14 @@ class StoreUpdater(object):
 
         if allow_add_and_obsolete:
             # Update indexes
-            for start, delta in to_change["index"]:
-                self.target_store.update_index(start=start, delta=delta)
+            self.target_store.update_indexes(to_change["index"])
 
             # Add new units
-            for unit, new_unit_index in to_change["add"]:
-                self.target_store.addunit(
-                    unit,
-                    new_unit_index,
-                    user=user,
-                    changed_with=submission_type,
-                    update_revision=update_revision)
-            changes["added"] = len(to_change["add"])
+            changes["added"] = self.add_units(
+                to_change["add"],
+                update_revision,
+                user=user,
+                changed_with=submission_type)
 
             # Obsolete units
             changes["obsoleted"] = self.mark_units_obsolete(
@@ -432,12 +468,19 @@ class StoreUpdater(object):
         suggestion_count = 0
         if not update.uids:
             return update_count, suggestion_count
+        # updated units are saved together once they have all been updated
+        saver = self.unit_saver_class(
+            self.target_store,
+            user=update.user,
+            changed_with=update.submission_type)
         for unit in self.units(update.uids):
             updated, suggested = self.unit_updater_class(
                 unit,
-                update).update_unit()
+                update,
+                saver=saver).update_unit()
             if updated:
                 update_count += 1
             if suggested:
                 suggestion_count += 1
+        saver.save()
         return update_count, suggestion_count
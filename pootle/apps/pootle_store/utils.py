@@ -10,20 +10,25 @@ from collections import OrderedDict
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save
 from django.template import loader
 from django.utils import timezone
 from django.utils.functional import cached_property
 
-from pootle.core.delegate import site, states, unitid
+from bulk_update.helper import bulk_update
+from pootle.core.delegate import (
+    frozen, lifecycle, site, states, terminology, unitid)
 from pootle.core.mail import send_mail
-from pootle.core.signals import update_data, update_scores
+from pootle.core.models import Revision
+from pootle.core.signals import update_checks, update_data, update_scores
 from pootle.core.utils.timezone import datetime_min, localdate, make_aware
 from pootle.i18n.gettext import ugettext as _
 from pootle_statistics.models import (
     MUTED, UNMUTED, SubmissionFields, SubmissionTypes)
 
-from .constants import TRANSLATED
-from .models import Suggestion
+from .constants import OBSOLETE, TRANSLATED, UNTRANSLATED
+from .models import Suggestion, Unit, UnitChange, UnitSource
+from .tm import queue_tm_update
 
 
 User = get_user_model()
@@ -438,3 +443,302 @@ class UnitLifecycle(object):
 
     def change(self, **kwargs):
         self.update(self.calculate_change(**kwargs))
+
+
+def update_changed_units(store, units):
+    """Updates checks, TM and terminology for `units` of `store` that were
+    created with a target or had their source or target changed, as saving
+    them would
+    """
+    for unit in units:
+        update_checks.send(unit.__class__, instance=unit)
+    is_terminology = (
+        store.name.startswith("pootle-terminology")
+        or (store.translation_project.project.code
+            == "terminology"))
+    if is_terminology:
+        for unit in units:
+            if unit.state == TRANSLATED:
+                terminology.get(Unit)(unit).stem()
+    translated = [unit for unit in units if unit.istranslated()]
+    if not translated:
+        return
+    if settings.POOTLE_TM_QUEUE:
+        queue_tm_update([unit.id for unit in translated])
+        return
+    for unit in translated:
+        unit.update_tmserver()
+
+
+class BulkUnitCreator(object):
+    """Creates new units of a Store in bulk
+
+    Units, which must be prepared with their index and revision, are
+    inserted in batches along with their UnitSource and, if they have a
+    target, their UnitChange - as `Unit.save` would create them. Checks, TM
+    and terminology are then updated for the units, and data once for the
+    store.
+
+    As `Unit.save` is not called, the unit pre-save receivers must be run
+    for the units beforehand, if their fields are not set already.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, store, revision, user=None, changed_with=None):
+        self.store = store
+        self.revision = revision
+        self.user = user or User.objects.get_system_user()
+        self.changed_with = changed_with or SubmissionTypes.SYSTEM
+
+    def has_target(self, unit):
+        return any(unit.target_f.strings)
+
+    def create_units(self, units):
+        Unit.objects.bulk_create(units, batch_size=self.batch_size)
+        if all(unit.pk for unit in units):
+            return
+        # the db does not return the ids of created rows, look them up by
+        # unitid_hash which is unique in the store
+        unitid_hashes = [unit.unitid_hash for unit in units]
+        unit_ids = dict(
+            self.store.unit_set.filter(
+                unitid_hash__in=unitid_hashes).values_list(
+                    "unitid_hash", "id"))
+        for unit in units:
+            unit.id = unit_ids[unit.unitid_hash]
+
+    def create_unit_sources(self, units):
+        unit_sources = []
+        for unit in units:
+            unit_source = UnitSource(
+                unit=unit,
+                created_by=self.user,
+                created_with=self.changed_with)
+            # sets the hash and wordcount of the source
+            pre_save.send(
+                UnitSource, instance=unit_source, raw=False,
+                using=None, update_fields=None)
+            unit_sources.append(unit_source)
+        UnitSource.objects.bulk_create(
+            unit_sources, batch_size=self.batch_size)
+
+    def create_unit_changes(self, units):
+        unit_changes = []
+        for unit in units:
+            unit_change = UnitChange(
+                unit=unit,
+                changed_with=self.changed_with,
+                submitted_by=self.user,
+                submitted_on=unit.creation_time)
+            if unit.translator_comment:
+                unit_change.commented_by = self.user
+                unit_change.commented_on = unit.creation_time
+            unit.change = unit_change
+            unit_changes.append(unit_change)
+        UnitChange.objects.bulk_create(
+            unit_changes, batch_size=self.batch_size)
+
+    def create(self, units):
+        """Creates `units`, returning the number of units created"""
+        if not units:
+            return 0
+        self.create_units(units)
+        self.create_unit_sources(units)
+        changed = [unit for unit in units if self.has_target(unit)]
+        self.create_unit_changes(changed)
+        update_changed_units(self.store, changed)
+        update_data.send(self.store.__class__, instance=self.store)
+        return len(units)
+
+
+class BulkUnitSaver(object):
+    """Saves updated units of a Store in bulk
+
+    Units are collected with `add` and written with `save`, which does what
+    `Unit.save` would do for each of them, but writes the units, their
+    sources and changes with bulk updates and creates the submissions of
+    all of the units at once. Checks, scores and data updates are sent for
+    the whole batch.
+    """
+
+    batch_size = 1000
+    unit_fields = (
+        "index", "unitid", "unitid_hash", "source_f", "target_f",
+        "target_wordcount", "target_length", "developer_comment",
+        "translator_comment", "locations", "context", "state", "revision",
+        "mtime")
+    change_fields = (
+        "changed_with", "submitted_by", "submitted_on", "commented_by",
+        "commented_on", "reviewed_by", "reviewed_on")
+
+    def __init__(self, store, user=None, changed_with=None):
+        self.store = store
+        self.user = user or User.objects.get_system_user()
+        self.changed_with = changed_with or SubmissionTypes.SYSTEM
+        self.units = []
+
+    def add(self, unit):
+        self.units.append(unit)
+
+    def save_units(self, units):
+        mtime = timezone.now()
+        for unit in units:
+            unit.mtime = mtime
+            pre_save.send(
+                unit.__class__, instance=unit, raw=False,
+                using=None, update_fields=None)
+        bulk_update(
+            units,
+            update_fields=list(self.unit_fields),
+            batch_size=self.batch_size)
+
+    def save_unit_sources(self, units):
+        unit_sources = []
+        for unit in units:
+            if not unit.source_updated:
+                continue
+            pre_save.send(
+                UnitSource, instance=unit.unit_source, raw=False,
+                using=None, update_fields=None)
+            unit_sources.append(unit.unit_source)
+        if unit_sources:
+            bulk_update(
+                unit_sources,
+                update_fields=[
+                    "source_hash", "source_length", "source_wordcount"],
+                batch_size=self.batch_size)
+
+    def update_change(self, unit):
+        timestamp = unit.mtime
+        unit.change.changed_with = self.changed_with
+        if unit.comment_updated:
+            unit.change.commented_by = self.user
+            unit.change.commented_on = timestamp
+        update_submit = (
+            (unit.target_updated or unit.source_updated)
+            or not unit.change.submitted_on)
+        if update_submit:
+            unit.change.submitted_by = self.user
+            unit.change.submitted_on = timestamp
+        is_review = (
+            (unit.state_updated and not unit.target_updated)
+            or (unit.state_updated
+                and unit.state == UNTRANSLATED))
+        if is_review:
+            unit.change.reviewed_by = self.user
+            unit.change.reviewed_on = timestamp
+
+    def save_unit_changes(self, units):
+        to_create = []
+        to_update = []
+        for unit in units:
+            if unit.changed:
+                to_update.append(unit.change)
+            else:
+                unit.change = UnitChange(unit=unit)
+                to_create.append(unit.change)
+            self.update_change(unit)
+        UnitChange.objects.bulk_create(to_create, batch_size=self.batch_size)
+        if to_update:
+            bulk_update(
+                to_update,
+                update_fields=list(self.change_fields),
+                batch_size=self.batch_size)
+
+    def save_submissions(self, units):
+        subs = []
+        for unit in units:
+            unit_lifecycle = lifecycle.get(unit.__class__)(unit)
+            subs += list(
+                unit_lifecycle.create_subs(
+                    unit_lifecycle.calculate_change()))
+        if not subs:
+            return
+        subs[0].__class__.objects.bulk_create(
+            subs, batch_size=self.batch_size)
+        update_scores.send(
+            self.store.__class__,
+            instance=self.store,
+            users=list(set(sub.submitter_id for sub in subs)),
+            date=localdate(units[0].mtime))
+
+    def save(self):
+        """Saves the collected units, returning the number of units saved"""
+        units = self.units
+        self.units = []
+        if not units:
+            return 0
+        self.save_units(units)
+        self.save_unit_sources(units)
+        updated = [unit for unit in units if unit.updated]
+        self.save_unit_changes(updated)
+        self.save_submissions(updated)
+        update_changed_units(
+            self.store,
+            [unit
+             for unit
+             in updated
+             if unit.source_updated or unit.target_updated])
+        for unit in units:
+            unit._frozen = frozen.get(unit.__class__)(unit)
+        update_data.send(self.store.__class__, instance=self.store)
+        return len(units)
+
+
+class UnitCloner(object):
+    """Copies the units of a Store to a new, empty Store
+
+    Units are copied from the database rather than serializing the source
+    store and updating the target from it. The result is the same as the
+    update, the units are created by the system user at a single revision.
+    """
+
+    creator_class = BulkUnitCreator
+    unit_fields = (
+        "unitid", "unitid_hash", "source_f", "target_f",
+        "target_wordcount", "target_length", "developer_comment",
+        "translator_comment", "locations", "context", "state")
+
+    def __init__(self, source_store, target_store, user=None,
+                 changed_with=None):
+        self.source_store = source_store
+        self.target_store = target_store
+        self.user = user
+        self.changed_with = changed_with
+
+    @cached_property
+    def revision(self):
+        return Revision.incr()
+
+    @property
+    def source_units(self):
+        return self.source_store.unit_set.filter(
+            state__gt=OBSOLETE).order_by("index")
+
+    def clone_unit(self, index, unit):
+        kwargs = {
+            field: getattr(unit, field)
+            for field
+            in self.unit_fields}
+        return Unit(
+            store=self.target_store,
+            index=index,
+            revision=self.revision,
+            **kwargs)
+
+    def clone(self):
+        """Creates the units, and their sources and changes, returning the
+        number of units created
+        """
+        units = [
+            self.clone_unit(index, unit)
+            for index, unit
+            in enumerate(self.source_units.iterator(), 1)]
+        if not units:
+            return 0
+        return self.creator_class(
+            self.target_store,
+            self.revision,
+            user=self.user,
+            changed_with=self.changed_with).create(units)
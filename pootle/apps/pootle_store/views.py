@@ -44,6 +44,7 @@ from .forms import (
     UnitSearchForm, unit_comment_form_factory, unit_form_factory)
 from .models import Suggestion, Unit
 from .templatetags.store_tags import pluralize_source, pluralize_target
+from .tm import TMSuggestions, queue_tm_prefetch
 from .unit.results import GroupedResults
 from .unit.timeline import Timeline
 from .util import find_altsrcs
@@ -184,6 +185,10 @@ def get_units(request, **kwargs_):
 
     total, start, end, units_qs = search_backend.get(Unit)(
         request.user, **search_form.cleaned_data).search()
+    if settings.POOTLE_TM_SERVER:
+        # resolve TM results of the page with a single search, so that
+        # they are cached when units are edited
+        queue_tm_prefetch(units_qs)
     return JsonResponse(
         {'start': start,
          'end': end,
@@ -536,7 +541,7 @@ class UnitEditJSON(PootleUnitJSON):
     def get_response_data(self, context):
         return {
             'editor': self.render_edit_template(context),
-            'tm_suggestions': self.object.get_tm_suggestions(),
+            'tm_suggestions': TMSuggestions().get(self.object),
             'is_obsolete': self.object.isobsolete(),
             'sources': self.get_sources()}
 
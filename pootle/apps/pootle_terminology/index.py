@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pickle
+import zlib
+
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+from pootle.core.cache import get_cache
+from pootle.core.delegate import revision
+from pootle_store.constants import TRANSLATED
+from pootle_store.models import Unit
+from pootle_translationproject.models import TranslationProject
+from pootle_word.utils import TextStemmer
+
+from .apps import PootleTerminologyConfig
+
+
+# process-local indexes, keyed by language id
+_indexes = {}
+
+
+class IndexedTerm(object):
+    __slots__ = ("id", "text", "tokens", "stems", "pair")
+
+    def __init__(self, id, text, tokens, stems, pair):
+        self.id = id
+        self.text = text
+        self.tokens = tokens
+        self.stems = stems
+        self.pair = pair
+
+
+class TermStemmer(TextStemmer):
+
+    @property
+    def text(self):
+        return self.context
+
+
+class TerminologyIndex(object):
+    """In-memory inverted index of the terminology of a language
+
+    Maps the stems of terminology sources to the ids of the terms that
+    contain them, and keeps the tokens and stems of each term so that
+    candidates can be scored without querying the db.
+
+    The index is stored in the `lru` cache keyed by the revision of the
+    terminology TP, and is brought up to date from the revisions of changed
+    units rather than being rebuilt.
+
+    Process indexes may be in use by other threads, so they are never
+    changed - an updated copy replaces them instead.
+    """
+
+    ns = "pootle.terminology.index"
+    sw_version = PootleTerminologyConfig.version
+    cache_timeout = None
+
+    def __init__(self, language_id):
+        self.language_id = language_id
+        self.stats_key = None
+        self.revision = 0
+        self.terms = {}
+        self.postings = {}
+
+    @classmethod
+    def get(cls, language_id):
+        """Returns an up to date index for `language_id`, reusing process
+        and cached indexes if possible
+        """
+        index = _indexes.get(language_id)
+        if index is None:
+            index = cls(language_id)
+        stats_revision = index.stats_revision
+        if index.stats_key != stats_revision:
+            index = index.copy()
+            index.load(stats_revision)
+            _indexes[language_id] = index
+        return index
+
+    def copy(self):
+        index = self.__class__(self.language_id)
+        index.revision = self.revision
+        index.terms = dict(self.terms)
+        index.postings = {
+            stem: set(term_ids)
+            for stem, term_ids
+            in self.postings.items()}
+        return index
+
+    @cached_property
+    def cache(self):
+        return get_cache("lru")
+
+    @cached_property
+    def terminology_tp(self):
+        return TranslationProject.objects.select_related("directory").filter(
+            language_id=self.language_id,
+            project__code="terminology").first()
+
+    @property
+    def stats_revision(self):
+        if not self.terminology_tp:
+            return ""
+        directory = self.terminology_tp.directory
+        return revision.get(directory.__class__)(directory).get(key="stats")
+
+    @property
+    def terminology_units(self):
+        return Unit.objects.filter(
+            state=TRANSLATED,
+            store__translation_project__project__code="terminology",
+            store__translation_project__language_id=self.language_id)
+
+    @property
+    def all_units(self):
+        return Unit.objects.filter(
+            store__translation_project__project__code="terminology",
+            store__translation_project__language_id=self.language_id)
+
+    def get_cache_key(self, stats_revision=None):
+        return (
+            "%s.%s.%s.%s"
+            % (self.ns,
+               self.sw_version,
+               self.language_id,
+               stats_revision if stats_revision is not None else "latest"))
+
+    def dumps(self):
+        return zlib.compress(
+            pickle.dumps(
+                (self.revision,
+                 [(term.id, term.text, term.tokens, term.stems, term.pair)
+                  for term in self.terms.values()]),
+                pickle.HIGHEST_PROTOCOL))
+
+    def loads(self, data):
+        unit_revision, terms = pickle.loads(zlib.decompress(data))
+        self.revision = unit_revision
+        self.terms = {}
+        self.postings = {}
+        for term in terms:
+            self.add_term(IndexedTerm(*term))
+
+    def load(self, stats_revision):
+        data = self.cache.get(self.get_cache_key(stats_revision))
+        if data is not None:
+            self.loads(data)
+        else:
+            if not self.terms:
+                data = self.cache.get(self.get_cache_key())
+                if data is not None:
+                    self.loads(data)
+            self.update()
+            data = self.dumps()
+            self.cache.set(
+                self.get_cache_key(stats_revision), data, self.cache_timeout)
+            self.cache.set(self.get_cache_key(), data, self.cache_timeout)
+        self.stats_key = stats_revision
+
+    def make_term(self, unit_id, source, target):
+        stemmer = TermStemmer(source)
+        tokens = tuple(stemmer.tokens)
+        return IndexedTerm(
+            unit_id,
+            source,
+            tokens,
+            frozenset(stemmer.get_stems(tokens)),
+            (source.lower().strip(), target.lower().strip()))
+
+    def add_term(self, term):
+        if not term.tokens:
+            return
+        self.terms[term.id] = term
+        for stem in term.stems:
+            self.postings.setdefault(stem, set()).add(term.id)
+
+    def remove_term(self, term_id):
+        term = self.terms.pop(term_id, None)
+        if term is None:
+            return
+        for stem in term.stems:
+            postings = self.postings.get(stem)
+            if postings is None:
+                continue
+            postings.discard(term_id)
+            if not postings:
+                del self.postings[stem]
+
+    def update(self):
+        """Adds, updates and removes terms changed since the index was last
+        updated
+        """
+        changed = self.all_units.filter(revision__gt=self.revision)
+        unit_revision = changed.aggregate(
+            max_revision=Max("revision"))["max_revision"]
+        if unit_revision is None and not self.terms:
+            return
+        changed = changed.values_list("id", "source_f", "target_f", "state")
+        for unit_id, source, target, state in changed.iterator():
+            self.remove_term(unit_id)
+            if state == TRANSLATED:
+                self.add_term(self.make_term(unit_id, source, target))
+        # deleted units leave no revision behind
+        for unit_id in set(self.terms) - set(
+                self.terminology_units.values_list("id", flat=True)):
+            self.remove_term(unit_id)
+        self.revision = max(self.revision, unit_revision or 0)
+
+    def get_candidates(self, stems):
+        candidates = set()
+        for stem in stems:
+            candidates |= self.postings.get(stem, set())
+        return [self.terms[term_id] for term_id in candidates]
+
+    def match(self, comparison, threshold, limit):
+        """Returns up to `limit` tuples of `(similarity, term)` for terms
+        matching the text of `comparison`
+        """
+        scored = sorted(
+            ((comparison.compare(term), term)
+             for term
+             in self.get_candidates(comparison.stems)),
+            key=lambda x: (-x[0], x[1].id))
+        matches = []
+        matched = set()
+        for similarity, term in scored:
+            if similarity <= threshold:
+                break
+            if term.pair in matched:
+                continue
+            matched.add(term.pair)
+            matches.append((similarity, term))
+            if len(matches) == limit:
+                break
+        return matches
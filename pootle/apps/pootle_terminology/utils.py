@@ -16,6 +16,7 @@ from pootle_translationproject.models import TranslationProject
 from pootle_word.utils import TextStemmer
 
 from .apps import PootleTerminologyConfig
+from .index import TerminologyIndex
 
 
 class UnitTerminology(TextStemmer):
@@ -148,8 +149,22 @@ class UnitTerminologyMatcher(TextStemmer):
                 matched.append(target_pair)
         return sorted(matches, key=lambda x: -x[0])[:self.max_matches]
 
+    @cached_property
+    def index(self):
+        return TerminologyIndex.get(self.language_id)
+
+    def indexed_matches(self):
+        matches = self.index.match(
+            self.comparison,
+            self.similarity_threshold,
+            self.max_matches)
+        units = Unit.objects.in_bulk([term.id for __, term in matches])
+        return [
+            (similarity, units[term.id])
+            for similarity, term
+            in matches
+            if term.id in units]
+
     @persistent_property
     def matches(self):
-        return self.similar(
-            self.terminology_units.filter(
-                stems__root__in=self.stems).distinct())
+        return self.indexed_matches()
@@ -19,7 +19,7 @@ from pootle.core.delegate import data_tool
 from pootle.core.mixins import CachedTreeItem
 from pootle.core.url_helpers import get_editor_filter, split_pootle_path
 from pootle_app.models.directory import Directory
-from pootle_checks.constants import EXCLUDED_FILTERS
+from pootle_checks.checkers import get_checker
 from pootle_language.models import Language
 from pootle_project.models import Project
 from pootle_revision.models import Revision
@@ -136,15 +136,10 @@ class TranslationProject(models.Model, CachedTreeItem):
 
     @property
     def checker(self):
-        from translate.filters import checks
-        checkerclasses = [
-            checks.projectcheckers.get(
-                self.project.checkstyle,
-                checks.StandardChecker)]
-        return checks.TeeChecker(checkerclasses=checkerclasses,
-                                 excludefilters=EXCLUDED_FILTERS,
-                                 errorhandler=self.filtererrorhandler,
-                                 languagecode=self.language.code)
+        return get_checker(
+            self.project.checkstyle,
+            self.language.code,
+            errorhandler=self.filtererrorhandler)
 
     @property
     def disabled(self):
@@ -242,8 +237,9 @@ class TranslationProject(models.Model, CachedTreeItem):
                 name=posixpath.basename(path.rstrip("/")))
         return parent
 
-    def init_store_from_template(self, template_store):
-        """Initialize a new file for `self` using `template_store`.
+    def get_store_path_from_template(self, template_store):
+        """Returns the `pootle_path` and name of the store to create for
+        `template_store`.
         """
         pootle_path = posixpath.join(
             self.pootle_path.rstrip("/"),
@@ -260,24 +256,87 @@ class TranslationProject(models.Model, CachedTreeItem):
                  template_store.filetype.extension.name])
             dirname = posixpath.dirname(pootle_path)
             pootle_path = posixpath.join(dirname, name)
+        return pootle_path, name
+
+    def init_store_from_template(self, template_store):
+        """Initialize a new file for `self` using `template_store`.
+        """
+        pootle_path, name = self.get_store_path_from_template(template_store)
         if not self.stores.filter(pootle_path=pootle_path).exists():
             return self.stores.create(
                 parent=self.create_parent_dirs(pootle_path),
                 pootle_path=pootle_path,
                 name=name)
 
+    def create_dirs(self, pootle_paths):
+        """Creates any missing parent directories of `pootle_paths`, returning
+        the directories of the TP keyed by `pootle_path`.
+        """
+        dirs = {
+            directory.pootle_path: directory
+            for directory
+            in Directory.objects.filter(
+                pootle_path__startswith=self.pootle_path)}
+        dirs[self.pootle_path] = self.directory
+        to_create = set()
+        for pootle_path in pootle_paths:
+            for path in PurePosixPath(pootle_path).parents:
+                path = posixpath.join(str(path), "")
+                if path in dirs or path in to_create:
+                    break
+                to_create.add(path)
+        # parents sort before their children
+        for path in sorted(to_create):
+            parent_path = posixpath.join(
+                posixpath.dirname(path.rstrip("/")), "")
+            dirs[path] = Directory.objects.create(
+                pootle_path=path,
+                parent=dirs[parent_path],
+                tp=self,
+                name=posixpath.basename(path.rstrip("/")))
+        return dirs
+
     def init_from_templates(self):
         """Initializes the current translation project files using
         the templates TP ones.
+
+        Units are cloned from the templates in the database, and data and
+        checks are updated once for each store at the end.
         """
+        from pootle_store.constants import PARSED
+        from pootle_store.utils import UnitCloner
+
+        from .contextmanagers import update_tp_after
+
         template_stores = self.templates_tp.stores.live().select_related(
             "filetype__template_extension",
             "filetype__extension").order_by("creation_time")
+        existing = set(self.stores.values_list("pootle_path", flat=True))
+        to_init = []
         for template_store in template_stores.iterator():
-            new_store = self.init_store_from_template(template_store)
-            if new_store:
-                new_store.update(
-                    new_store.deserialize(template_store.serialize()))
+            pootle_path, name = self.get_store_path_from_template(
+                template_store)
+            if pootle_path in existing:
+                continue
+            existing.add(pootle_path)
+            to_init.append((template_store, pootle_path, name))
+        if not to_init:
+            return
+        dirs = self.create_dirs(
+            [pootle_path for template_store_, pootle_path, name_ in to_init])
+        new_stores = []
+        with update_tp_after(self):
+            for template_store, pootle_path, name in to_init:
+                new_store = self.stores.create(
+                    parent=dirs[posixpath.join(
+                        posixpath.dirname(pootle_path), "")],
+                    pootle_path=pootle_path,
+                    name=name)
+                UnitCloner(template_store, new_store).clone()
+                new_stores.append(new_store.id)
+            self.stores.filter(
+                id__in=new_stores,
+                state__lt=PARSED).update(state=PARSED)
 
     # # # TreeItem
     def get_children(self):
@@ -79,6 +79,14 @@ class TextComparison(TextStemmer):
     def text(self):
         return self.context
 
+    @cached_property
+    def tokens(self):
+        return super(TextComparison, self).tokens
+
+    @cached_property
+    def stems(self):
+        return super(TextComparison, self).stems
+
     def jaccard_similarity(self, other):
         return (
             len(other.stems.intersection(self.stems))
@@ -100,7 +108,12 @@ class TextComparison(TextStemmer):
             / float(len(other.stems)))
 
     def similarity(self, other):
-        other = self.__class__(other)
+        return self.compare(self.__class__(other))
+
+    def compare(self, other):
+        """Similarity to `other`, which can be any object with `text`,
+        `tokens` and `stems`, eg precomputed terms
+        """
         return (
             (self.jaccard_similarity(other)
              + self.levenshtein_distance(other)
@@ -19,3 +19,9 @@ class VFolderDBSearchBackend(DBSearchBackend):
     def filter_qs(self, qs):
         filtered = super(VFolderDBSearchBackend, self).filter_qs(qs)
         return filtered.filter(store__vfolders=self.vfolder)
+
+    @property
+    def search_cache_key(self):
+        return "%s.%s" % (
+            super(VFolderDBSearchBackend, self).search_cache_key,
+            self.vfolder.pk)
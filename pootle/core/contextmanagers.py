@@ -6,8 +6,10 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import logging
 import threading
 import types
+from collections import Counter, OrderedDict
 from contextlib import contextmanager, nested
 
 from django.dispatch import Signal, receiver
@@ -17,6 +19,9 @@ from pootle.core.signals import (
     update_scores)
 
 
+logger = logging.getLogger(__name__)
+
+
 class BulkUpdated(object):
     create = None
     delete_qs = None
@@ -203,3 +208,144 @@ def bulk_operations(model=None, models=None, **kwargs):
         models = [model]
     with nested(*(bulk_context(m, **kwargs) for m in models)):
         yield
+
+
+class SignalCoalescer(object):
+    """Collects sends of the data signals and dispatches each distinct
+    (signal, sender, instance) once.
+
+    Sends made by receivers while dispatching are collected and coalesced
+    in turn, so eg many Stores updating the same TP only cause the TP to be
+    updated once.
+    """
+
+    signals = OrderedDict(
+        (("update_checks", update_checks),
+         ("update_data", update_data),
+         ("update_scores", update_scores),
+         ("update_revisions", update_revisions)))
+    collection_types = (list, set, frozenset, tuple)
+
+    def __init__(self, signals=None, senders=None):
+        if signals is not None:
+            self.signals = OrderedDict(
+                (name, signal)
+                for name, signal
+                in self.signals.items()
+                if signal in signals)
+        self.senders = senders
+        self.thread = threading.current_thread().ident
+        self.pending = OrderedDict()
+        self.received = Counter()
+        self.dispatched = Counter()
+        self._orig_send = {}
+
+    @property
+    def coalesced(self):
+        return self.received - self.dispatched
+
+    def get_instance_key(self, instance):
+        if instance is None:
+            return None
+        if getattr(instance, "pk", None) is not None:
+            return instance.__class__, instance.pk
+        return id(instance)
+
+    def merge_kwargs(self, kwargs, other):
+        """Returns the merged kwargs of 2 sends, or ``None`` if they cannot
+        be merged.
+
+        Collections are combined, and a missing collection (eg ``units``) is
+        taken to mean "all". Any other kwargs must be equal.
+        """
+        merged = {}
+        for k in set(kwargs) | set(other):
+            value = kwargs.get(k)
+            other_value = other.get(k)
+            is_collection = (
+                isinstance(value, self.collection_types)
+                or isinstance(other_value, self.collection_types))
+            if is_collection:
+                if value is None or other_value is None:
+                    merged[k] = None
+                    continue
+                try:
+                    seen = set(value)
+                except TypeError:
+                    return None
+                merged[k] = list(value) + [
+                    v for v in other_value if v not in seen]
+            elif value == other_value:
+                merged[k] = value
+            else:
+                return None
+        return merged
+
+    def should_collect(self, sender):
+        return (
+            threading.current_thread().ident == self.thread
+            and (not self.senders
+                 or sender in self.senders))
+
+    def collect(self, name, sender, **kwargs):
+        self.received[name] += 1
+        key = (name, sender, self.get_instance_key(kwargs.get("instance")))
+        sends = self.pending.setdefault(key, [])
+        for i, pending_kwargs in enumerate(sends):
+            merged = self.merge_kwargs(pending_kwargs, kwargs)
+            if merged is not None:
+                sends[i] = merged
+                return
+        sends.append(kwargs)
+
+    def patch(self, name, signal):
+        _orig_send = signal.send
+        self._orig_send[name] = _orig_send
+
+        def coalesced_send(_signal, sender, **kwargs):
+            if not self.should_collect(sender):
+                return _orig_send(sender, **kwargs)
+            self.collect(name, sender, **kwargs)
+            return []
+        signal.send = types.MethodType(coalesced_send, signal)
+
+    @contextmanager
+    def patched(self):
+        for name, signal in self.signals.items():
+            self.patch(name, signal)
+        try:
+            yield
+        finally:
+            for name, signal in self.signals.items():
+                signal.send = self._orig_send.pop(name)
+
+    def dispatch(self):
+        pending, self.pending = self.pending, OrderedDict()
+        for (name, sender, __), sends in pending.items():
+            for kwargs in sends:
+                self.dispatched[name] += 1
+                self._orig_send[name](sender, **kwargs)
+
+    def flush(self):
+        with self.patched():
+            while self.pending:
+                self.dispatch()
+        logger.debug(
+            "[signals] dispatched %s of %s signals: %s",
+            sum(self.dispatched.values()),
+            sum(self.received.values()),
+            ", ".join(
+                "%s: %s/%s" % (name, self.dispatched[name], count)
+                for name, count
+                in self.received.items()))
+
+
+@contextmanager
+def coalesce_signals(signals=None, senders=None):
+    """Collects data signals sent inside the context, and dispatches them,
+    coalesced, when it exits.
+    """
+    coalescer = SignalCoalescer(signals=signals, senders=senders)
+    with coalescer.patched():
+        yield coalescer
+    coalescer.flush()
@@ -6,16 +6,45 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import threading
+from contextlib import contextmanager
+
 from ..cache import get_cache
 
 
 cache = get_cache('redis')
+_reserved = threading.local()
 
 
 class NoRevision(Exception):
     pass
 
 
+class RevisionBlock(object):
+    """A contiguous block of reserved revision numbers, handed out in
+    ascending order.
+    """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.next_revision = start
+
+    def __len__(self):
+        return self.end - self.next_revision + 1
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.next_revision > self.end:
+            raise StopIteration
+        self.next_revision += 1
+        return self.next_revision - 1
+
+    next = __next__
+
+
 class Revision(object):
     """Wrapper around the revision counter stored in Redis."""
 
@@ -66,10 +95,51 @@ class Revision(object):
     def incr(cls):
         """Increments the revision number.
 
+        If called inside :meth:`reserved` the next revision is taken from the
+        reserved block until it is exhausted.
+
         :return: the new revision number after incrementing it, or the
             initial number if there's no revision stored yet.
         """
+        block = getattr(_reserved, "block", None)
+        if block:
+            return next(block)
         try:
             return cache.incr(cls.CACHE_KEY)
         except ValueError:
             raise NoRevision()
+
+    @classmethod
+    def reserve(cls, n):
+        """Reserves a contiguous block of `n` revision numbers with a single
+        increment.
+
+        :return: a :class:`RevisionBlock` of the reserved revisions.
+        """
+        try:
+            end = cache.incr(cls.CACHE_KEY, n)
+        except ValueError:
+            raise NoRevision()
+        return RevisionBlock(end - n + 1, end)
+
+    @classmethod
+    @contextmanager
+    def reserved(cls, n):
+        """Reserves `n` revisions, and makes :meth:`incr` hand them out in
+        the current thread for the duration of the context.
+
+        Keep the context as short as possible - revisions are reserved when
+        it is entered, so changes saved by other processes meanwhile will have
+        higher revisions.
+        """
+        previous = getattr(_reserved, "block", None)
+        if previous:
+            # any revisions left in an outer block are now lower than those
+            # being reserved, so they are abandoned to keep revisions
+            # ascending
+            previous.next_revision = previous.end + 1
+        _reserved.block = cls.reserve(n) if n > 0 else None
+        try:
+            yield _reserved.block
+        finally:
+            _reserved.block = previous
@@ -13,7 +13,7 @@ import logging
 import Levenshtein
 
 try:
-    from elasticsearch import Elasticsearch
+    from elasticsearch import Elasticsearch, helpers
     from elasticsearch.exceptions import ElasticsearchException
 except ImportError:
     Elasticsearch = None
@@ -98,36 +98,41 @@ class ElasticSearchBackend(SearchBackend):
         logger.error("Elasticsearch error for server(%s:%s): %s",
                      self._settings.get("HOST"), self._settings.get("PORT"), e)
 
-    def search(self, unit):
-        counter = {}
-        res = []
-        language = unit.store.translation_project.language.code
-        es_res = self._es_call(
-            "search",
-            index=self._settings['INDEX_NAME'],
-            doc_type=language,
-            body={
-                "query": {
-                    "match": {
-                        "source": {
-                            "query": unit.source,
-                            "fuzziness": 'AUTO',
-                        }
+    def _get_query(self, unit):
+        return {
+            "query": {
+                "match": {
+                    "source": {
+                        "query": unit.source,
+                        "fuzziness": 'AUTO',
                     }
                 }
             }
-        )
+        }
+
+    def _get_results(self, unit, es_res):
+        """Returns the results of `unit` from `es_res`, or `None` if the
+        search failed.
+        """
+        counter = {}
+        res = []
 
         if es_res is None:
             # ElasticsearchException - eg ConnectionError.
-            return []
+            return None
         elif es_res == "":
             # There seems to be an issue with urllib where an empty string is
             # returned
             logger.error("Elasticsearch search (%s:%s) returned an empty "
                          "string: %s", self._settings["HOST"],
                          self._settings["PORT"], unit)
-            return []
+            return None
+        elif "error" in es_res:
+            # failed search of a multi-search
+            logger.error("Elasticsearch search (%s:%s) failed: %s",
+                         self._settings["HOST"], self._settings["PORT"],
+                         es_res["error"])
+            return None
 
         hits = filter_hits_by_distance(
             es_res['hits']['hits'],
@@ -163,6 +168,44 @@ class ElasticSearchBackend(SearchBackend):
 
         return res
 
+    def search(self, unit):
+        language = unit.store.translation_project.language.code
+        es_res = self._es_call(
+            "search",
+            index=self._settings['INDEX_NAME'],
+            doc_type=language,
+            body=self._get_query(unit)
+        )
+        results = self._get_results(unit, es_res)
+        return [] if results is None else results
+
+    def search_many(self, units):
+        """Searches for the TM results of `units` with a single multi-search
+        request
+        """
+        units = list(units)
+        if not units:
+            return {}
+        body = []
+        for unit in units:
+            body.append(
+                {'index': self._settings['INDEX_NAME'],
+                 'type': unit.store.translation_project.language.code})
+            body.append(self._get_query(unit))
+        es_res = self._es_call("msearch", body=body)
+        if not es_res or "responses" not in es_res:
+            if es_res is not None:
+                logger.error("Elasticsearch multi-search (%s:%s) returned an "
+                             "invalid response: %s", self._settings["HOST"],
+                             self._settings["PORT"], es_res)
+            return {}
+        results = {}
+        for unit, unit_res in zip(units, es_res["responses"]):
+            unit_results = self._get_results(unit, unit_res)
+            if unit_results is not None:
+                results[unit.id] = unit_results
+        return results
+
     def update(self, language, obj):
         self._es_call(
             "index",
@@ -171,3 +214,12 @@ class ElasticSearchBackend(SearchBackend):
             body=obj,
             id=obj['id']
         )
+
+    def bulk_update(self, language, objs):
+        helpers.bulk(
+            self._es,
+            (dict(obj,
+                  _index=self._settings['INDEX_NAME'],
+                  _type=language,
+                  _id=obj['id'])
+             for obj in objs))
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from __future__ import absolute_import
+
+import fcntl
+import heapq
+import json
+import logging
+import mmap
+import os
+import shutil
+from array import array
+
+import Levenshtein
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..base import SearchBackend
+
+
+__all__ = ('LocalTMBackend',)
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MIN_SIMILARITY = 0.7
+DEFAULT_MAX_CANDIDATES = 200
+
+
+def get_trigrams(text):
+    text = u"  %s  " % text.lower()
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def get_similarity(text, other):
+    if not text and not other:
+        return 1.0
+    return (
+        1 - Levenshtein.distance(text, other)
+        / float(max(len(text), len(other))))
+
+
+class LocalTMIndex(object):
+    """Character trigram index of the TM documents of a language
+
+    Documents are appended to a log file as lines of JSON, and the log is
+    memory mapped for reading. Postings of trigrams to record numbers are
+    kept in memory, and are brought up to date by reading the records
+    appended since the log was last read, so that several processes can
+    share a log.
+
+    Documents for an existing id supersede the previous record, which is
+    skipped when searching until the log is compacted.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reset()
+
+    def reset(self):
+        self.inode = None
+        self.size = 0
+        self.map = None
+        self.ids = []
+        self.offsets = array("L")
+        self.lengths = array("I")
+        self.latest = {}
+        self.postings = {}
+        self.revision = -1
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.reset()
+
+    def refresh(self):
+        """Indexes any records appended to the log"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            stat = None
+        inode, size = (stat.st_ino, stat.st_size) if stat else (None, 0)
+        if inode != self.inode or size < self.size:
+            # the log was cleared or rebuilt
+            self.close()
+            self.inode = inode
+        if size == self.size:
+            return
+        if self.map is not None:
+            self.map.close()
+        with open(self.path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        self.map.seek(self.size)
+        while True:
+            offset = self.map.tell()
+            line = self.map.readline()
+            if not line.endswith(b"\n"):
+                # partially written record
+                break
+            self.add_record(offset, json.loads(line.decode("utf-8")))
+            self.size = self.map.tell()
+
+    def add_record(self, offset, doc):
+        recno = len(self.offsets)
+        source = doc.get("source") or u""
+        self.ids.append(doc["id"])
+        self.offsets.append(offset)
+        self.lengths.append(len(source))
+        self.latest[doc["id"]] = recno
+        self.revision = max(self.revision, doc.get("revision") or 0)
+        if not doc.get("target"):
+            return
+        for trigram in get_trigrams(source):
+            self.postings.setdefault(trigram, array("I")).append(recno)
+
+    def get_document(self, recno):
+        offset = self.offsets[recno]
+        end = self.map.find(b"\n", offset)
+        return json.loads(self.map[offset:end].decode("utf-8"))
+
+    def append(self, docs):
+        lines = b"".join(
+            json.dumps(doc, cls=DjangoJSONEncoder).encode("utf-8") + b"\n"
+            for doc
+            in docs)
+        if not lines:
+            return
+        parent = os.path.dirname(self.path)
+        if not os.path.exists(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                if not os.path.isdir(parent):
+                    raise
+        while True:
+            with open(self.path, "ab") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    if not self.is_current(f):
+                        # the log was replaced while waiting for the lock
+                        continue
+                    f.write(lines)
+                    f.flush()
+                    return
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def is_current(self, f):
+        try:
+            return os.fstat(f.fileno()).st_ino == os.stat(self.path).st_ino
+        except OSError:
+            return False
+
+    def compact(self):
+        """Rewrites the log with only the latest record of each document
+
+        The compacted log replaces the log atomically while holding its
+        lock, and readers rebuild their postings from it on their next
+        refresh.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if not self.is_current(f):
+                    return
+                latest = {}
+                records = 0
+                while True:
+                    offset = f.tell()
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        # partially written record
+                        break
+                    latest[json.loads(line.decode("utf-8"))["id"]] = offset
+                    records += 1
+                if len(latest) == records:
+                    return
+                compacted = "%s.compact" % self.path
+                with open(compacted, "wb") as out:
+                    for offset in sorted(latest.values()):
+                        f.seek(offset)
+                        out.write(f.readline())
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.rename(compacted, self.path)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self.refresh()
+
+    def get_candidates(self, text, min_similarity, max_candidates):
+        """Returns the record numbers of up to `max_candidates` records
+        that could be similar to `text`
+
+        Records are only considered if their length allows them to reach
+        `min_similarity`, and if they share enough trigrams with `text`
+        for the edit distance to do so - each edit removes at most 3 of the
+        trigrams.
+        """
+        length = len(text)
+        min_length = length * min_similarity
+        max_length = length / min_similarity
+        trigrams = get_trigrams(text)
+        min_shared = len(trigrams) - 3 * int((1 - min_similarity) * max_length)
+        shared = {}
+        for trigram in trigrams:
+            for recno in self.postings.get(trigram, ()):
+                shared[recno] = shared.get(recno, 0) + 1
+        return [
+            recno
+            for count, recno
+            in heapq.nlargest(
+                max_candidates,
+                ((count, recno)
+                 for recno, count
+                 in shared.items()
+                 if (count >= min_shared
+                     and min_length <= self.lengths[recno] <= max_length
+                     and self.latest[self.ids[recno]] == recno)))]
+
+    def search(self, text, min_similarity=DEFAULT_MIN_SIMILARITY,
+               max_candidates=DEFAULT_MAX_CANDIDATES):
+        """Returns tuples of `(similarity, document)` for documents with a
+        source similar to `text`, most similar first
+        """
+        self.refresh()
+        if not text:
+            return []
+        results = []
+        for recno in self.get_candidates(text, min_similarity, max_candidates):
+            doc = self.get_document(recno)
+            similarity = get_similarity(text, doc["source"])
+            if similarity >= min_similarity:
+                results.append((similarity, doc))
+        return sorted(results, key=lambda x: -x[0])
+
+
+class LocalTMBackend(SearchBackend):
+    """TM server that keeps a trigram index of each language on disk, so that
+    TM can be used without running Elasticsearch
+    """
+
+    index_class = LocalTMIndex
+
+    def __init__(self, config_name):
+        super(LocalTMBackend, self).__init__(config_name)
+        self.weight = min(max(self._settings.get('WEIGHT', self.weight),
+                              0.0), 1.0)
+        self.min_similarity = self._settings.get(
+            'MIN_SIMILARITY', DEFAULT_MIN_SIMILARITY)
+        if self.min_similarity <= 0 or self.min_similarity >= 1:
+            self.min_similarity = DEFAULT_MIN_SIMILARITY
+        self.max_candidates = self._settings.get(
+            'MAX_CANDIDATES', DEFAULT_MAX_CANDIDATES)
+        self.path = os.path.join(
+            self._settings.get(
+                'PATH', os.path.join(settings.WORKING_DIR, '.pootle_tm')),
+            self._settings['INDEX_NAME'])
+        self._indexes = {}
+
+    def get_index(self, language):
+        if language not in self._indexes:
+            self._indexes[language] = self.index_class(
+                os.path.join(self.path, "%s.log" % language))
+        return self._indexes[language]
+
+    @property
+    def languages(self):
+        if not os.path.isdir(self.path):
+            return []
+        return [
+            fname[:-4]
+            for fname
+            in os.listdir(self.path)
+            if fname.endswith(".log")]
+
+    @property
+    def revision(self):
+        """Latest revision indexed in any of the languages"""
+        revision = -1
+        for language in self.languages:
+            index = self.get_index(language)
+            index.refresh()
+            revision = max(revision, index.revision)
+        return revision
+
+    def _is_valuable_hit(self, unit, doc):
+        return str(unit.id) != str(doc['id'])
+
+    def _search(self, unit):
+        """Returns the results of `unit`, or `None` if its index cannot be
+        read.
+        """
+        counter = {}
+        res = []
+        language = unit.store.translation_project.language.code
+        try:
+            hits = self.get_index(language).search(
+                unit.source,
+                min_similarity=self.min_similarity,
+                max_candidates=self.max_candidates)
+        except (IOError, OSError, ValueError) as e:
+            logger.error("Local TM error for index (%s): %s", self.path, e)
+            return None
+        for similarity, doc in hits:
+            if not self._is_valuable_hit(unit, doc):
+                continue
+            translation_pair = doc['source'] + doc['target']
+            if translation_pair not in counter:
+                counter[translation_pair] = 1
+                res.append({
+                    'unit_id': doc['id'],
+                    'source': doc['source'],
+                    'target': doc['target'],
+                    'project': doc['project'],
+                    'path': doc['path'],
+                    'username': doc['username'],
+                    'fullname': doc['fullname'],
+                    'email_md5': doc['email_md5'],
+                    'iso_submitted_on': doc.get('iso_submitted_on', None),
+                    'display_submitted_on': doc.get('display_submitted_on',
+                                                    None),
+                    # score as a percentage, comparable to ES scores
+                    'score': similarity * 100 * self.weight,
+                })
+            else:
+                counter[translation_pair] += 1
+
+        for item in res:
+            item['count'] = counter[item['source']+item['target']]
+
+        return res
+
+    def search(self, unit):
+        results = self._search(unit)
+        return [] if results is None else results
+
+    def search_many(self, units):
+        results = {}
+        for unit in units:
+            unit_results = self._search(unit)
+            if unit_results is not None:
+                results[unit.id] = unit_results
+        return results
+
+    def update(self, language, obj):
+        self.bulk_update(language, [obj])
+
+    def bulk_update(self, language, objs):
+        """Adds or replaces the documents `objs` of `language`"""
+        self.get_index(language).append(objs)
+
+    def compact(self):
+        """Drops superseded documents from the indexes of all languages"""
+        for language in self.languages:
+            self.get_index(language).compact()
+
+    def clear(self):
+        """Removes the indexes of all languages"""
+        for index in self._indexes.values():
+            index.close()
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
@@ -45,6 +45,23 @@ class SearchBackend(object):
         """
         raise NotImplementedError
 
+    def search_many(self, units):
+        """Search for the TM results of several units.
+
+        :param units: iterable of :cls:`~pootle_store.models.Unit`
+        :return: dict of lists of results keyed by unit id, without the
+            units that could not be searched, eg as the server is offline
+        """
+        return {unit.id: self.search(unit) for unit in units}
+
     def update(self, language, obj):
         """Add a unit to the backend"""
         pass
+
+    def bulk_update(self, language, objs):
+        """Add several units to the backend
+
+        Unlike `update`, errors are raised so that the update can be retried.
+        """
+        for obj in objs:
+            self.update(language, obj)
@@ -8,10 +8,33 @@
 
 import importlib
 import logging
+import uuid
+
+from pootle.core.cache import get_cache
 
 from . import SearchBackend
 
 
+TM_REVISION_KEY = "pootle.core.search.tm_revision.%s"
+
+
+def get_tm_revision(language):
+    """Returns a token that is replaced whenever the TM of `language` is
+    updated.
+    """
+    cache = get_cache("redis")
+    key = TM_REVISION_KEY % language
+    revision = cache.get(key)
+    if revision is None:
+        cache.add(key, uuid.uuid4().hex)
+        revision = cache.get(key)
+    return revision
+
+
+def update_tm_revision(language):
+    get_cache("redis").set(TM_REVISION_KEY % language, uuid.uuid4().hex)
+
+
 class SearchBroker(SearchBackend):
     def __init__(self, config_name=None):
         super(SearchBroker, self).__init__(config_name)
@@ -43,14 +66,11 @@ class SearchBroker(SearchBackend):
                     logging.warning("Search backend '%s'. Cannot import '%s'",
                                     server, _module)
 
-    def search(self, unit):
-        if not self._servers:
-            return []
-
+    def _merge_results(self, server_results):
         results = []
         counter = {}
-        for server in self._servers:
-            for result in self._servers[server].search(unit):
+        for server_result in server_results:
+            for result in server_result:
                 translation_pair = result['source'] + result['target']
                 if translation_pair not in counter:
                     counter[translation_pair] = result['count']
@@ -68,7 +88,39 @@ class SearchBroker(SearchBackend):
 
         return results
 
+    def search(self, unit):
+        if not self._servers:
+            return []
+
+        return self._merge_results(
+            self._servers[server].search(unit)
+            for server in self._servers)
+
+    def search_many(self, units):
+        units = list(units)
+        if not self._servers:
+            return {unit.id: [] for unit in units}
+
+        server_results = [
+            self._servers[server].search_many(units)
+            for server in self._servers]
+        # units that could not be searched on any of the servers are left
+        # out, as their results are incomplete
+        return {
+            unit.id: self._merge_results(
+                results[unit.id]
+                for results in server_results)
+            for unit in units
+            if all(unit.id in results for results in server_results)}
+
     def update(self, language, obj):
         for server in self._servers:
             if self._servers[server].is_auto_updatable:
                 self._servers[server].update(language, obj)
+        update_tm_revision(language)
+
+    def bulk_update(self, language, objs):
+        for server in self._servers:
+            if self._servers[server].is_auto_updatable:
+                self._servers[server].bulk_update(language, objs)
+        update_tm_revision(language)
@@ -7,8 +7,13 @@
 # AUTHORS file for copyright and authorship information.
 
 from contextlib import contextmanager
+from threading import local
 
-from django.db import connection
+from django.db import connection, transaction
+
+
+# keys of the on_commit hooks added by this thread that have not run yet
+_commit_hooks = local()
 
 
 @contextmanager
@@ -18,6 +23,48 @@ def useable_connection():
     connection.close_if_unusable_or_obsolete()
 
 
+def _pending_hooks():
+    if not hasattr(_commit_hooks, "pending"):
+        _commit_hooks.pending = set()
+    return _commit_hooks.pending
+
+
+def clear_commit_hooks():
+    """Forgets the hooks of this thread that have not run, eg as their
+    transaction was rolled back.
+    """
+    _pending_hooks().clear()
+
+
+def on_commit_pending(key):
+    """Returns `True` if a hook for `key` was added with `on_commit_once`
+    in the current transaction, and it has not run yet.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        # hooks run straight away outside of transactions, and the hooks
+        # of rolled back transactions are dropped
+        clear_commit_hooks()
+        return False
+    return key in _pending_hooks()
+
+
+def on_commit_once(key, func):
+    """Runs `func` when the current transaction is committed, once for each
+    `key` however many times it is added in the transaction.
+    """
+    pending = _pending_hooks()
+    pending.add(key)
+
+    def run_once():
+        if key in pending:
+            pending.discard(key)
+            func()
+
+    # the hook is added every time, so that a rolled back savepoint does
+    # not drop it from the transaction
+    transaction.on_commit(run_once)
+
+
 def set_mysql_collation_for_column(apps, cursor, model, column, collation, schema):
     """Set the collation for a mysql column if it is not set already
     """
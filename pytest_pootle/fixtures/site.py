@@ -34,6 +34,14 @@ def test_timing(request, log_timings):
             start))
 
 
+@pytest.fixture(autouse=True)
+def commit_hooks():
+    """Forgets the commit hooks of previous tests, which are rolled back."""
+    from pootle.core.utils.db import clear_commit_hooks
+
+    clear_commit_hooks()
+
+
 @pytest.fixture
 def po_test_dir(request, tmpdir):
     po_dir = str(tmpdir.mkdir("po"))
@@ -44,6 +44,11 @@ def pytest_addoption(parser):
         action="store_true",
         default=False,
         help="Run memusage tests")
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="Run benchmarks with large data sets")
 
 
 def pytest_configure(config):
@@ -52,6 +57,8 @@ def pytest_configure(config):
         "markers", "pootle_vfolders: requires special virtual folder projects")
     config.addinivalue_line(
         "markers", "pootle_memusage: memory usage tests")
+    config.addinivalue_line(
+        "markers", "pootle_benchmark: benchmarks with large data sets")
     pytest_plugins = tuple(
         _load_fixtures(
             fixtures,
@@ -73,3 +80,6 @@ def pytest_runtest_setup(item):
                   or not item._request.getfixturevalue("memusage"))))
     if skip_memtests:
         pytest.skip("test requires memusage flag and dj.debug.memusage")
+    marker = item.get_marker("pootle_benchmark")
+    if marker is not None and not item.config.getoption("--benchmark"):
+        pytest.skip("test requires benchmark flag")
@@ -35,3 +35,12 @@ def test_calculate_checks_language(capfd, project1):
     call_command('calculate_checks', '--language=language0')
     out, err = capfd.readouterr()
     assert 'Running calculate_checks for /language0/project0/' in out
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_calculate_checks_jobs(capfd, project0, project1):
+    call_command('calculate_checks', '--jobs=2')
+    out, err = capfd.readouterr()
+    assert 'Running calculate_checks (noargs)' in out
+    assert 'Worker ' in out
@@ -18,6 +18,7 @@ from pootle_translationproject.models import TranslationProject
 
 DEFAULT_OPTIONS = {
     'reset': False,
+    'incremental': False,
     'users': None,
     'settings': None,
     'pythonpath': None,
@@ -129,6 +130,45 @@ def test_cmd_refresh_scores_reset(updater_mock, users_mock, user_mock):
         == [(), {}])
 
 
+@pytest.mark.cmd
+@patch('pootle_app.management.commands.refresh_scores.IncrementalScoreUpdater')
+@patch('pootle_app.management.commands.refresh_scores.Command.get_users')
+@patch('pootle_app.management.commands.refresh_scores.score_updater')
+def test_cmd_refresh_scores_refreshing(updater_mock, users_mock,
+                                       incremental_mock, settings):
+    """Recalculate all scores up to the start of the refresh."""
+    settings.POOTLE_SCORE_INCREMENTAL = True
+    users_mock.return_value = None
+    refreshing = incremental_mock.return_value.refreshing
+    refreshing.return_value.__enter__.return_value = "TIMESTAMP"
+    call_command('refresh_scores')
+    assert list(refreshing.call_args) == [(), {}]
+    assert (
+        list(updater_mock.get.return_value.return_value.refresh_scores.call_args)
+        == [(), {'end': "TIMESTAMP"}])
+    assert refreshing.return_value.__exit__.called
+    assert (
+        list(incremental_mock.return_value.update.call_args)
+        == [(), {}])
+
+
+@pytest.mark.cmd
+@patch('pootle_app.management.commands.refresh_scores.IncrementalScoreUpdater')
+@patch('pootle_app.management.commands.refresh_scores.score_updater')
+def test_cmd_refresh_scores_incremental(updater_mock, incremental_mock,
+                                        capsys):
+    """Add scores for new events only."""
+    incremental_mock.return_value.update.return_value = {
+        (1, "today", 3): {}, (2, "today", 3): {}}
+    call_command('refresh_scores', '--incremental')
+    assert (
+        list(incremental_mock.return_value.update.call_args)
+        == [(), {}])
+    assert not updater_mock.get.called
+    out, err = capsys.readouterr()
+    assert "Added scores for 1 users in 2 stores" in out
+
+
 @pytest.mark.cmd
 @patch('pootle_app.management.commands.PootleCommand.handle_all')
 @patch('pootle_app.management.commands.refresh_scores.Command.check_projects')
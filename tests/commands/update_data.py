@@ -78,3 +78,15 @@ def test_update_data_store(store0):
     store0.data.refresh_from_db()
     assert store0.data.total_words == total_words
     assert store0.data.critical_checks == critical_checks
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_data_reconcile(tp0):
+    """Repair drifted TP data"""
+    total_words = tp0.data.total_words
+    tp0.data.total_words = 0
+    tp0.data.save()
+    call_command("update_data", "--reconcile")
+    tp0.data.refresh_from_db()
+    assert tp0.data.total_words == total_words
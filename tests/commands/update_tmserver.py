@@ -11,6 +11,8 @@ import sys
 
 import pytest
 
+from mock import patch
+
 from django.core.management import call_command
 from django.core.management.base import CommandError
 
@@ -118,3 +120,227 @@ msgstr "test"
                  '--target-language=af', os.path.join(p.dirname, p.basename))
     out, err = capfd.readouterr()
     assert "1 translations to index" in out
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_checkpoints(capfd, settings, tmpdir, tp0):
+    """Each TP is indexed from its own checkpoint"""
+    from pootle.core.delegate import revision
+    from pootle_store.models import Unit
+    from pootle_translationproject.models import TranslationProject
+
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+        }
+    }
+    checkpoint_key = "pootle.tm.checkpoint.translations"
+    units_qs = (
+        Unit.objects
+            .exclude(target_f__isnull=True)
+            .exclude(target_f__exact='')
+            .exclude(store__translation_project__project__disabled=True)
+            .exclude(store__obsolete=True))
+    call_command('update_tmserver')
+    out, err = capfd.readouterr()
+    assert "Last indexed revision = -1" in out
+    assert ("%d translations indexed" % units_qs.count()) in out
+    tp_units = units_qs.filter(store__translation_project=tp0)
+    assert (
+        int(revision.get(TranslationProject)(tp0).get(key=checkpoint_key))
+        == max(tp_units.values_list("revision", flat=True)))
+
+    call_command('update_tmserver')
+    out, err = capfd.readouterr()
+    assert "0 translations indexed" in out
+
+    # a TP behind its checkpoint is resumed from there
+    unit = tp_units.first()
+    unit.target_f = "Updated translation"
+    unit.save()
+    call_command('update_tmserver')
+    out, err = capfd.readouterr()
+    assert "%s: 1 translations indexed" % tp0.pootle_path in out
+
+    call_command('update_tmserver', '--rebuild', '--dry-run')
+    out, err = capfd.readouterr()
+    assert ("%d translations to index" % units_qs.count()) in out
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_deleted_index(capfd, settings, tmpdir):
+    """All translations are indexed again if the index is deleted"""
+    from pootle.core.search import LocalTMBackend
+    from pootle_store.models import Unit
+
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+        }
+    }
+    units_qs = (
+        Unit.objects
+            .exclude(target_f__isnull=True)
+            .exclude(target_f__exact='')
+            .exclude(store__translation_project__project__disabled=True)
+            .exclude(store__obsolete=True))
+    call_command('update_tmserver')
+    out, err = capfd.readouterr()
+    assert ("%d translations indexed" % units_qs.count()) in out
+
+    LocalTMBackend('local').clear()
+    call_command('update_tmserver')
+    out, err = capfd.readouterr()
+    assert "Last indexed revision = -1" in out
+    assert ("%d translations indexed" % units_qs.count()) in out
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_refresh_compacts(capfd, settings, tmpdir, tp0):
+    """Refreshing a local TM drops the superseded translations"""
+    from pootle.core.search import LocalTMBackend
+    from pootle_store.models import Unit
+
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+        }
+    }
+    units_qs = (
+        Unit.objects
+            .exclude(target_f__isnull=True)
+            .exclude(target_f__exact='')
+            .exclude(store__translation_project__project__disabled=True)
+            .exclude(store__obsolete=True))
+    backend = LocalTMBackend('local')
+
+    def _count_records():
+        count = 0
+        for language in backend.languages:
+            with open(backend.get_index(language).path, "rb") as f:
+                count += len(f.readlines())
+        return count
+
+    call_command('update_tmserver')
+    assert _count_records() == units_qs.count()
+    call_command('update_tmserver', '--refresh')
+    out, err = capfd.readouterr()
+    assert _count_records() == units_qs.count()
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_jobs(capfd, settings, tmpdir):
+    """TPs are indexed in parallel with --jobs"""
+    from pootle.core.search import LocalTMBackend
+    from pootle_app.management.commands.update_tmserver import Command
+    from pootle_store.models import Unit
+
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+        }
+    }
+    units_qs = (
+        Unit.objects
+            .exclude(target_f__isnull=True)
+            .exclude(target_f__exact='')
+            .exclude(store__translation_project__project__disabled=True)
+            .exclude(store__obsolete=True))
+    checkpoints = {}
+
+    def _set_checkpoint(tp, last_revision):
+        checkpoints[tp.pk] = last_revision
+
+    # the threads commit their own writes, so keep the checkpoints out of
+    # the db
+    with patch.object(Command, "_set_checkpoint", side_effect=_set_checkpoint):
+        call_command('update_tmserver', '--rebuild', '--jobs=2')
+    out, err = capfd.readouterr()
+    assert ("%d translations indexed" % units_qs.count()) in out
+    tp_revisions = {}
+    for tp, rev in units_qs.values_list("store__translation_project",
+                                        "revision"):
+        tp_revisions[tp] = max(tp_revisions.get(tp, rev), rev)
+    for tp, rev in tp_revisions.items():
+        assert checkpoints[tp] == rev
+    backend = LocalTMBackend('local')
+    indexed = set()
+    for language in backend.languages:
+        index = backend.get_index(language)
+        index.refresh()
+        indexed.update(int(pk) for pk in index.latest)
+    assert indexed == set(units_qs.values_list("id", flat=True))
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_resume(capfd, settings, tmpdir, tp0):
+    """An interrupted run is resumed from the TP checkpoints"""
+    from pootle.core.delegate import revision
+    from pootle.core.search import LocalTMBackend
+    from pootle_app.management.commands.update_tmserver import Command
+    from pootle_store.models import Unit
+    from pootle_translationproject.models import TranslationProject
+
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+        }
+    }
+    checkpoint_key = "pootle.tm.checkpoint.translations"
+    units_qs = (
+        Unit.objects
+            .exclude(target_f__isnull=True)
+            .exclude(target_f__exact='')
+            .exclude(store__translation_project__project__disabled=True)
+            .exclude(store__obsolete=True))
+    tp_units = units_qs.filter(store__translation_project=tp0)
+    assert tp_units.count() > 2
+    bulk_index = Command._bulk_index
+    tp_chunks = []
+
+    def _bulk_index(self, docs):
+        docs = list(docs)
+        if docs[0]["path"].startswith(tp0.pootle_path):
+            tp_chunks.append(docs)
+            if len(tp_chunks) == 2:
+                raise IOError("Simulated failure")
+        return bulk_index(self, docs)
+
+    with patch(
+            "pootle_app.management.commands.update_tmserver.BULK_CHUNK_SIZE",
+            2):
+        with patch.object(Command, "_bulk_index", _bulk_index):
+            with pytest.raises(IOError):
+                call_command('update_tmserver')
+    checkpoint = int(
+        revision.get(TranslationProject)(tp0).get(key=checkpoint_key))
+    assert checkpoint == tp_chunks[0][-1]["revision"] - 1
+
+    call_command('update_tmserver')
+    out, err = capfd.readouterr()
+    assert (
+        "%s: %d translations indexed"
+        % (tp0.pootle_path, tp_units.filter(revision__gt=checkpoint).count())
+        in out)
+    backend = LocalTMBackend('local')
+    indexed = set()
+    for language in backend.languages:
+        index = backend.get_index(language)
+        index.refresh()
+        indexed.update(int(pk) for pk in index.latest)
+    assert indexed == set(units_qs.values_list("id", flat=True))
@@ -10,10 +10,13 @@ import pytest
 
 from django.dispatch import receiver
 
-from pootle.core.contextmanagers import bulk_operations, keep_data
-from pootle.core.signals import create, delete, update, update_data
+from pootle.core.contextmanagers import (
+    bulk_operations, coalesce_signals, keep_data)
+from pootle.core.signals import (
+    create, delete, update, update_checks, update_data)
 from pootle_data.models import StoreChecksData
 from pootle_store.models import QualityCheck, Store, Unit
+from pootle_translationproject.models import TranslationProject
 
 
 def qs_match(qs1, qs2):
@@ -298,3 +301,75 @@ def test_contextmanager_bulk_ops_update(tp0, store0):
             update.send(Unit, updates=d2)
         d1.update(d2)
         assert updated.unit_updates == d1
+
+
+@pytest.mark.django_db
+def test_contextmanager_coalesce_signals(tp0, no_update_data):
+    stores = list(tp0.stores.all()[:3])
+    result = []
+
+    with no_update_data():
+
+        @receiver(update_data, sender=Store)
+        def update_store_data_handler(**kwargs):
+            store = kwargs["instance"]
+            result.append(store)
+            update_data.send(
+                TranslationProject,
+                instance=store.translation_project)
+
+        @receiver(update_data, sender=TranslationProject)
+        def update_tp_data_handler(**kwargs):
+            result.append(kwargs["instance"])
+
+        with coalesce_signals() as coalescer:
+            for store in stores + stores:
+                update_data.send(Store, instance=store)
+            assert result == []
+        assert result == stores + [tp0]
+        assert coalescer.received["update_data"] == 9
+        assert coalescer.dispatched["update_data"] == 4
+        assert coalescer.coalesced["update_data"] == 5
+
+        # only the TP updates are coalesced
+        result = []
+        with coalesce_signals(senders=(TranslationProject, )) as coalescer:
+            for store in stores:
+                update_data.send(Store, instance=store)
+            assert result == stores
+        assert result == stores + [tp0]
+        assert coalescer.received["update_data"] == 3
+
+        # signals are sent as normal again
+        result = []
+        update_data.send(Store, instance=stores[0])
+        assert result == [stores[0], tp0]
+
+
+@pytest.mark.django_db
+def test_contextmanager_coalesce_signals_merge(store0):
+    result = []
+
+    with keep_data(signals=(update_checks, )):
+
+        @receiver(update_checks, sender=Store)
+        def update_checks_handler(**kwargs):
+            result.append(kwargs)
+
+        with coalesce_signals(signals=(update_checks, )):
+            update_checks.send(Store, instance=store0, units=[1, 2])
+            update_checks.send(Store, instance=store0, units=[2, 3])
+            update_checks.send(
+                Store, instance=store0, units=[4], clear_unknown=True)
+        assert len(result) == 2
+        assert result[0]["units"] == [1, 2, 3]
+        assert result[1]["units"] == [4]
+        assert result[1]["clear_unknown"] is True
+
+        # a send without units checks all units
+        result = []
+        with coalesce_signals(signals=(update_checks, )):
+            update_checks.send(Store, instance=store0, units=[1, 2])
+            update_checks.send(Store, instance=store0)
+        assert len(result) == 1
+        assert result[0]["units"] is None
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from mock import patch
+
+import pytest
+
+from django.db import transaction
+
+from pootle.core.utils.db import (
+    clear_commit_hooks, on_commit_once, on_commit_pending)
+
+
+@pytest.mark.django_db
+def test_on_commit_once():
+    hooks = []
+    called = []
+    with patch("pootle.core.utils.db.transaction.on_commit", hooks.append):
+        with transaction.atomic():
+            assert not on_commit_pending("foo")
+            on_commit_once("foo", lambda: called.append("foo"))
+            on_commit_once("foo", lambda: called.append("foo"))
+            on_commit_once("bar", lambda: called.append("bar"))
+            assert on_commit_pending("foo")
+            assert on_commit_pending("bar")
+    assert len(hooks) == 3
+    for hook in hooks:
+        hook()
+    assert called == ["foo", "bar"]
+    assert not on_commit_pending("foo")
+    assert not on_commit_pending("bar")
+
+
+@pytest.mark.django_db
+def test_on_commit_once_rolled_back():
+    hooks = []
+    called = []
+    with patch("pootle.core.utils.db.transaction.on_commit", hooks.append):
+        # the hook of a rolled back savepoint is dropped
+        on_commit_once("foo", lambda: called.append("foo"))
+        del hooks[:]
+        on_commit_once("foo", lambda: called.append("foo"))
+    for hook in hooks:
+        hook()
+    assert called == ["foo"]
+
+    on_commit_once("foo", lambda: called.append("foo"))
+    clear_commit_hooks()
+    assert not on_commit_pending("foo")
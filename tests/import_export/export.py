@@ -6,6 +6,9 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from io import BytesIO
+from zipfile import ZipFile
+
 import pytest
 
 from django.urls import reverse
@@ -57,3 +60,30 @@ def test_wrong_language_exported_tmx_url(client):
     args = ('language_foo', 'project0')
     response = client.get(reverse('pootle-offline-tm-tp', args=args))
     assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_export_store(client, store0):
+    response = client.get(
+        reverse('pootle-export'),
+        dict(path=store0.pootle_path))
+    assert response.status_code == 200
+    assert response.streaming
+    assert b"".join(response.streaming_content) == store0.serialize()
+
+
+@pytest.mark.django_db
+def test_export_tp_zip(client, tp0):
+    response = client.get(
+        reverse('pootle-export'),
+        dict(path=tp0.pootle_path))
+    assert response.status_code == 200
+    assert response.streaming
+    prefix = tp0.pootle_path.strip("/").replace("/", "-")
+    with ZipFile(BytesIO(b"".join(response.streaming_content))) as zf:
+        stores = tp0.stores.live()
+        assert (
+            sorted(zf.namelist())
+            == sorted(prefix + store.pootle_path for store in stores))
+        for store in stores:
+            assert zf.read(prefix + store.pootle_path) == store.serialize()
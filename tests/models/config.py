@@ -9,6 +9,7 @@
 from collections import OrderedDict
 
 import pytest
+from mock import patch
 
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
@@ -20,7 +21,8 @@ from pootle_config.delegate import (
 from pootle_config.exceptions import ConfigurationError
 from pootle_config.models import Config
 from pootle_config.utils import (
-    ConfigDict, ModelConfig, ObjectConfig, SiteConfig)
+    ConfigDict, ModelConfig, ObjectConfig, SiteConfig, config_pending,
+    get_config_revision, get_config_snapshot, update_config_revision)
 from pootle_project.models import Project
 
 
@@ -632,3 +634,59 @@ def test_config_qs_chaining(no_config_env):
     config.get(Project, instance=project).set_config("foo", "bar3")
     assert config.get(
         Project, instance=project).none().get_config("foo") == "bar3"
+
+
+@pytest.mark.django_db
+def test_config_snapshot(project0):
+    content_type = ContentType.objects.get_for_model(Project)
+    assert not config_pending(content_type.id)
+    snapshot = get_config_snapshot(content_type.id)
+    assert get_config_snapshot(content_type.id) is snapshot
+    assert (
+        ObjectConfig(project0).items()
+        == config.get(Project, instance=project0).list_config())
+    assert (
+        SiteConfig().items()
+        == config.get().list_config())
+
+    # uncommitted changes are read from the db
+    config.get(Project, instance=project0).set_config("foo", dict(bar=23))
+    assert config_pending(content_type.id)
+    assert ObjectConfig(project0)["foo"] == dict(bar=23)
+    # config of other content types is still read from the snapshot
+    assert not config_pending()
+    site_snapshot = get_config_snapshot(None)
+    assert get_config_snapshot(None) is site_snapshot
+    assert get_config_snapshot(content_type.id) is not snapshot
+
+    # snapshot values cannot be changed through config dicts
+    ObjectConfig(project0)["foo"]["bar"] = 17
+    assert ObjectConfig(project0)["foo"] == dict(bar=23)
+
+    revision = get_config_revision()
+    project_revision = get_config_revision(content_type.id)
+    update_config_revision(content_type.id)
+    assert get_config_revision(content_type.id) != project_revision
+    assert get_config_revision() == revision
+    update_config_revision()
+    assert get_config_revision() != revision
+
+
+@pytest.mark.django_db
+def test_config_updated_once(project0):
+    content_type = ContentType.objects.get_for_model(Project)
+    hooks = []
+    with patch("pootle.core.utils.db.transaction.on_commit", hooks.append):
+        config.get(Project, instance=project0).set_config("foo", "bar")
+        config.get(Project, instance=project0).set_config("foo", "baz")
+        assert config_pending(content_type.id)
+    hooks = [hook for hook in hooks if hook.__name__ == "run_once"]
+    assert len(hooks) == 2
+    revision = get_config_revision(content_type.id)
+    hooks[0]()
+    assert get_config_revision(content_type.id) != revision
+    assert not config_pending(content_type.id)
+    # the revision is only updated once for the transaction
+    revision = get_config_revision(content_type.id)
+    hooks[1]()
+    assert get_config_revision(content_type.id) == revision
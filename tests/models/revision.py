@@ -55,3 +55,53 @@ def test_revision_incr(store0):
     assert db_unit.revision != previous_revision
     assert Revision.get() != previous_revision
     assert db_unit.revision == Revision.get()
+
+
+@pytest.mark.django_db
+def test_revision_reserve(revision):
+    previous_revision = Revision.get()
+    block = Revision.reserve(5)
+    assert Revision.get() == previous_revision + 5
+    assert len(block) == 5
+    assert list(block) == list(
+        range(previous_revision + 1, previous_revision + 6))
+    assert len(block) == 0
+
+
+@pytest.mark.django_db
+def test_revision_reserved(revision):
+    previous_revision = Revision.get()
+    with Revision.reserved(3):
+        # reserved revisions are used first, then the counter
+        revisions = [Revision.incr() for i in range(4)]
+    assert revisions == list(
+        range(previous_revision + 1, previous_revision + 5))
+    assert Revision.incr() == previous_revision + 5
+
+    previous_revision = Revision.get()
+    with Revision.reserved(3):
+        outer = Revision.incr()
+        with Revision.reserved(2):
+            inner = Revision.incr()
+        # the rest of the outer block is abandoned to keep revisions ascending
+        after = Revision.incr()
+    assert outer == previous_revision + 1
+    assert inner == previous_revision + 4
+    assert after == previous_revision + 6
+
+
+@pytest.mark.django_db
+def test_revision_reserved_store_update(store0):
+    """A store update takes its revisions from a single reserved block."""
+    previous_revision = Revision.get()
+    units = list(store0.units[:3])
+    ttk = store0.deserialize(store0.serialize())
+    for unit in units:
+        ttk.findid(unit.getid()).target = "%s UPDATED" % unit.target
+    update_revision, changes = store0.updater.update(
+        ttk, store_revision=Revision.get())
+    assert changes["updated"] == 3
+    assert update_revision == previous_revision + 1
+    assert Revision.get() == previous_revision + 4
+    for unit in units:
+        assert store0.units.get(pk=unit.pk).revision == update_revision
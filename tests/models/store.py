@@ -12,6 +12,7 @@ import os
 import six
 
 import pytest
+from mock import patch
 
 from pytest_pootle.factories import (
     LanguageDBFactory, ProjectDBFactory, StoreDBFactory,
@@ -40,11 +41,11 @@ from pootle_fs.utils import FSPlugin
 from pootle_language.models import Language
 from pootle_project.models import Project
 from pootle_statistics.models import (
-    SubmissionFields, SubmissionTypes)
+    Submission, SubmissionFields, SubmissionTypes)
 from pootle_store.constants import (
     NEW, OBSOLETE, PARSED, POOTLE_WINS, TRANSLATED)
 from pootle_store.diff import DiffableStore, StoreDiff
-from pootle_store.models import Store
+from pootle_store.models import Store, Unit
 from pootle_store.util import parse_pootle_revision
 from pootle_translationproject.models import TranslationProject
 
@@ -594,6 +595,89 @@ def test_update_upload_new_revision_new_unit(store0, member):
     assert unit.change.changed_with == SubmissionTypes.WEB
 
 
+@pytest.mark.django_db
+def test_update_add_units_bulk(tp0, complex_ttk, system):
+    store = Store.objects.create(
+        name="bulk.po",
+        translation_project=tp0,
+        parent=tp0.directory)
+    update_revision, changes = store.update(complex_ttk)
+    units = list(store.units.select_related("unit_source"))
+    assert changes["added"] == store.unit_set.count()
+    for unit in units:
+        assert unit.revision == update_revision
+        assert unit.unit_source.created_by == system
+        assert unit.unit_source.creation_revision == update_revision
+        assert (
+            unit.unit_source.source_wordcount
+            == unit.counter.count_words(unit.source_f.strings))
+        assert unit.changed == any(unit.target_f.strings)
+        if unit.changed:
+            assert unit.change.submitted_by == system
+            assert unit.change.submitted_on == unit.creation_time
+    assert store.data.max_unit_revision == update_revision
+
+
+@pytest.mark.django_db
+def test_update_add_units_bulk_no_returned_ids(tp0, complex_ttk):
+    store = Store.objects.create(
+        name="bulk_ids.po",
+        translation_project=tp0,
+        parent=tp0.directory)
+    bulk_create = Unit.objects.bulk_create
+
+    def _bulk_create(units, **kwargs):
+        # as on dbs that dont return the ids of created rows
+        created = bulk_create(units, **kwargs)
+        for unit in units:
+            unit.id = None
+        return created
+
+    with patch.object(Unit.objects, "bulk_create", side_effect=_bulk_create):
+        update_revision, changes = store.update(complex_ttk)
+    assert changes["added"] == store.unit_set.count()
+    for unit in store.units.select_related("unit_source"):
+        assert (
+            unit.unit_source.source_wordcount
+            == unit.counter.count_words(unit.source_f.strings))
+        assert unit.changed == any(unit.target_f.strings)
+
+
+@pytest.mark.django_db
+def test_update_units_bulk(store0, member):
+    store0.state = PARSED
+    last_sub_pk = (
+        Submission.objects.order_by("id").values_list("id", flat=True).last()
+        or 0)
+    ttk = store0.deserialize(store0.serialize())
+    updated = []
+    for unit in ttk.units:
+        if unit.isheader() or unit.hasplural():
+            continue
+        unit.target = "%s UPDATED" % unit.source
+        unit.markfuzzy(False)
+        updated.append(unit.getid())
+    update_revision, changes = store0.update(
+        ttk,
+        store_revision=Revision.get() + 1,
+        user=member,
+        submission_type=SubmissionTypes.UPLOAD)
+    assert changes["updated"] == len(updated)
+    new_subs = Submission.objects.filter(id__gt=last_sub_pk)
+    for unit in store0.units.filter(unitid__in=updated):
+        assert unit.target == "%s UPDATED" % unit.source
+        assert unit.state == TRANSLATED
+        assert unit.revision == update_revision
+        assert unit.change.submitted_by == member
+        assert unit.change.changed_with == SubmissionTypes.UPLOAD
+        assert unit.change.submitted_on == unit.mtime
+        target_sub = new_subs.get(unit=unit, field=SubmissionFields.TARGET)
+        assert target_sub.new_value == unit.target
+        assert target_sub.submitter == member
+        assert target_sub.revision == update_revision
+    assert store0.data.max_unit_revision == update_revision
+
+
 @pytest.mark.django_db
 def test_update_upload_old_revision_new_unit(store0, member2):
     store0.units.delete()
@@ -165,3 +165,44 @@ def test_tp_cache_on_delete(tp0):
     assert (
         proj_revision.get("stats")
         != orig_revision)
+
+
+@pytest.mark.django_db
+def test_tp_init_from_templates_clone(project0_nongnu, project0, templates,
+                                      no_templates_tps, complex_ttk,
+                                      system):
+    template_tp = TranslationProject.objects.create(
+        language=templates, project=project0)
+    subdir = template_tp.directory.child_dirs.create(
+        name="subdir", tp=template_tp)
+    template = Store.objects.create(
+        name="foo.pot",
+        translation_project=template_tp,
+        parent=subdir)
+    template.update(complex_ttk)
+    tp = TranslationProject.objects.create(
+        project=project0, language=LanguageDBFactory())
+    tp.init_from_templates()
+    store = tp.stores.get()
+    assert store.parent == Directory.objects.get(
+        pootle_path="%ssubdir/" % tp.pootle_path)
+    fields = (
+        "index", "unitid", "unitid_hash", "source_f", "target_f", "state",
+        "context", "locations", "developer_comment", "translator_comment",
+        "unit_source__source_hash", "unit_source__source_wordcount")
+    assert (
+        list(template.units.values_list(*fields))
+        == list(store.units.values_list(*fields)))
+    assert all(
+        unit.unit_source.created_by == system
+        for unit in store.units)
+    assert all(
+        (unit.changed == bool(unit.target))
+        for unit in store.units)
+    assert store.state == template.state
+    assert store.data.total_words == template.data.total_words
+    assert store.data.max_unit_revision == store.get_max_unit_revision()
+
+    # existing stores are not initialized again
+    tp.init_from_templates()
+    assert tp.stores.count() == 1
@@ -7,9 +7,18 @@
 # AUTHORS file for copyright and authorship information.
 
 import pytest
+from mock import patch
+
+from django.contrib.auth import get_user_model
+
+from pytest_pootle.fixtures.models.permission_set import _require_permission_set
 
 from pootle.core.delegate import revision
 from pootle_app.models import Directory
+from pootle_app.models.permissions import (
+    build_permission_map, get_permission_map, get_permissions_by_user,
+    get_permissions_from_map, get_permissions_revision, permissions_pending,
+    permissions_updated, update_permissions_revision)
 
 
 @pytest.mark.django_db
@@ -33,3 +42,54 @@ def test_directory_lifecycle_revision(subdir0, tp0, project0, language0):
     assert new_key == revision.get(Directory)(tp0.directory).get(key="stats")
     assert new_key == revision.get(Directory)(tp0.directory.parent).get(key="stats")
     assert new_key == revision.get(Directory)(language0.directory).get(key="stats")
+
+
+@pytest.mark.django_db
+def test_permission_map(member, administrate, tp0, project0):
+    directories = list(
+        Directory.objects.live().filter(
+            pootle_path__startswith=tp0.language.directory.pootle_path))
+    directories += [project0.directory, tp0.directory]
+    users = get_user_model().objects.filter(
+        username__in=["member", "default", "nobody", "admin"])
+    for user in users:
+        permission_map = build_permission_map(user)
+        for directory in directories:
+            assert (
+                get_permissions_from_map(permission_map, directory.pootle_path)
+                == get_permissions_by_user(user, directory))
+
+    # changes are not cached until they are committed
+    cached_map = get_permission_map(member)
+    assert not permissions_pending()
+    _require_permission_set(member, project0.directory, [administrate])
+    assert permissions_pending()
+    permission_map = get_permission_map(member)
+    assert permission_map != cached_map
+    assert (
+        get_permissions_from_map(permission_map, tp0.pootle_path)
+        == get_permissions_by_user(member, tp0.directory))
+
+    revision = get_permissions_revision()
+    update_permissions_revision()
+    assert get_permissions_revision() != revision
+
+
+@pytest.mark.django_db
+def test_permissions_updated_once(member, administrate, project0):
+    hooks = []
+    with patch("pootle.core.utils.db.transaction.on_commit", hooks.append):
+        _require_permission_set(member, project0.directory, [administrate])
+        permissions_updated()
+        assert permissions_pending()
+    hooks = [hook for hook in hooks if hook.__name__ == "run_once"]
+    assert len(hooks) > 1
+    revision = get_permissions_revision()
+    hooks[0]()
+    # the revision is updated by the first hook, and the others do nothing
+    assert get_permissions_revision() != revision
+    assert not permissions_pending()
+    revision = get_permissions_revision()
+    for hook in hooks[1:]:
+        hook()
+    assert get_permissions_revision() == revision
@@ -9,11 +9,32 @@
 import pytest
 
 from pootle.core.delegate import check_updater
-from pootle_checks.utils import TPQCUpdater, StoreQCUpdater
-from pootle_store.constants import OBSOLETE
+from pootle_checks.checkers import get_checker
+from pootle_checks.constants import EXCLUDED_FILTERS
+from pootle_checks.results import CheckResultCache
+from pootle_checks.utils import (
+    ParallelQCUpdater, TPQCUpdater, StoreQCUpdater, _get_worker_checker)
+from pootle_store.constants import OBSOLETE, UNTRANSLATED
 from pootle_store.models import QualityCheck
 
 
+@pytest.mark.django_db
+def test_checkers_get_checker(tp0):
+    checker = get_checker(tp0.project.checkstyle, tp0.language.code)
+    tp_checker = tp0.checker
+    worker_checker = _get_worker_checker(
+        tp0.project.checkstyle, tp0.language.code)
+    for _checker in [checker, tp_checker, worker_checker]:
+        assert (
+            [c.__class__ for c in _checker.checkers]
+            == [c.__class__ for c in checker.checkers])
+        assert (
+            sorted(_checker.combinedfilters)
+            == sorted(checker.combinedfilters))
+        assert not set(_checker.combinedfilters) & set(EXCLUDED_FILTERS)
+    assert tp_checker.checkers[0].errorhandler == tp0.filtererrorhandler
+
+
 @pytest.mark.django_db
 def test_tp_qualitycheck_updater(tp0):
     qc_updater = check_updater.get(tp0.__class__)
@@ -96,3 +117,89 @@ def test_store_qualitycheck_updater(tp0, store0):
     newest_revision = tp0.directory.revisions.filter(
         key="stats").values_list("value", flat=True).first()
     assert newest_revision == new_revision
+
+
+def _check_values(checks):
+    return sorted(
+        checks.values_list(
+            "unit_id", "name", "category", "message", "false_positive"))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("tp_only", [True, False])
+def test_parallel_qualitycheck_updater(tp0, tp_only):
+    checks = QualityCheck.objects.all()
+    if tp_only:
+        checks = checks.filter(unit__store__translation_project=tp0)
+    TPQCUpdater(
+        translation_project=tp0 if tp_only else None).update()
+    serial_checks = _check_values(checks)
+    assert serial_checks
+    checks.delete()
+    updater = ParallelQCUpdater(
+        translation_project=tp0 if tp_only else None,
+        jobs=2,
+        batch_size=10)
+    updater.update(update_data_after=True)
+    assert _check_values(checks) == serial_checks
+    assert (
+        sum(count for count, elapsed_ in updater.worker_stats.values())
+        == updater.units.filter(state__gt=UNTRANSLATED).count())
+    # running again makes no changes
+    assert not ParallelQCUpdater(
+        translation_project=tp0 if tp_only else None,
+        jobs=2).update()
+    assert _check_values(checks) == serial_checks
+
+
+@pytest.mark.django_db
+def test_check_results_cache(tp0, settings):
+    settings.POOTLE_CHECKS_CACHE_REDIS = False
+    results = CheckResultCache(size=2)
+    checker = tp0.checker
+    unit = tp0.stores.first().units.exclude(target_f="").first()
+    calculated = []
+
+    def _calculate():
+        calculated.append(unit)
+        return checker.run_filters(unit, categorised=True)
+
+    failures = results.get_failures(checker, unit, None, _calculate)
+    assert failures == checker.run_filters(unit, categorised=True)
+    assert results.get_failures(checker, unit, None, _calculate) == failures
+    assert len(calculated) == 1
+    assert results.hits == 1
+    assert results.misses == 1
+
+    # the key depends on the content, checker config and check names
+    key = results.get_key(checker, unit)
+    assert results.get_key(tp0.checker, unit) == key
+    assert results.get_key(checker, unit, ["printf"]) != key
+    other_tp = tp0.project.translationproject_set.exclude(
+        language=tp0.language).first()
+    assert results.get_key(other_tp.checker, unit) != key
+    unit.target = "%s CHANGED" % unit.target
+    assert results.get_key(checker, unit) != key
+
+    # least recently used results are dropped
+    results.set("key1", {})
+    results.set("key2", {})
+    assert results.get(key) is None
+    assert results.get("key1") == {}
+
+
+@pytest.mark.django_db
+def test_check_results_cache_disabled(tp0):
+    results = CheckResultCache(size=0, use_redis=False)
+    checker = tp0.checker
+    unit = tp0.stores.first().units.exclude(target_f="").first()
+    calculated = []
+
+    def _calculate():
+        calculated.append(unit)
+        return {}
+
+    results.get_failures(checker, unit, None, _calculate)
+    results.get_failures(checker, unit, None, _calculate)
+    assert len(calculated) == 2
+    assert not results.results
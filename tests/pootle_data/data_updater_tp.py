@@ -14,11 +14,13 @@ from django.db.models import Max
 
 from pootle.core.delegate import review
 from pootle.core.signals import update_checks, update_data
-from pootle_data.tp_data import TPDataTool, TPDataUpdater
+from pootle_data.models import TPData
+from pootle_data.tp_data import (
+    TPDataReconciler, TPDataRollup, TPDataTool, TPDataUpdater)
 from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED, UNTRANSLATED
 from pootle_store.models import Suggestion
 from pootle_statistics.models import Submission
-from pootle_store.models import QualityCheck, Unit
+from pootle_store.models import QualityCheck, Store, Unit
 
 from .data_updater_store import _calc_word_counts, _calculate_checks
 
@@ -295,3 +297,77 @@ def test_data_tp_checks(tp0):
     assert len(check_data) == len(checks)
     for (category, name), count in checks.items():
         assert (category, name, count) in check_data
+
+
+@pytest.mark.django_db
+def test_data_tp_incremental(settings, tp0):
+    settings.POOTLE_DATA_INCREMENTAL = True
+    units = Unit.objects.filter(
+        state__gt=OBSOLETE,
+        store__translation_project=tp0)
+    unit = units.filter(state=TRANSLATED).first()
+    unit.state = FUZZY
+    unit.save()
+    unit = units.filter(state=UNTRANSLATED).first()
+    unit.target = "NEW TARGET"
+    unit.state = TRANSLATED
+    unit.save()
+    tp0.data.refresh_from_db()
+    expected = tp0.data_tool.updater.get_store_data()
+    for k in ["total_words", "fuzzy_words", "translated_words",
+              "critical_checks", "pending_suggestions",
+              "max_unit_revision"]:
+        assert getattr(tp0.data, k) == expected[k]
+    assert (
+        dict(tp0.check_data.values_list("name", "count"))
+        == {check["name"]: check["count"]
+            for check in expected["checks"]})
+    assert not TPDataReconciler(tp0).get_drift()
+
+
+@pytest.mark.django_db
+def test_data_tp_incremental_stale(settings, tp0):
+    settings.POOTLE_DATA_INCREMENTAL = True
+    unit = Unit.objects.filter(
+        state=TRANSLATED,
+        store__translation_project=tp0).first()
+    store = Store.objects.get(pk=unit.store_id)
+    updater = store.data_tool.updater
+    # load the store data before another update of the store
+    assert updater.data.pk
+    unit.state = FUZZY
+    unit.save()
+    updater.update()
+    tp0.data.refresh_from_db()
+    assert not TPDataReconciler(tp0).get_drift()
+
+
+@pytest.mark.django_db
+def test_data_tp_rollup_delta(tp0):
+    rollup = TPDataRollup(tp0)
+    previous = dict(
+        total_words=10, fuzzy_words=2, translated_words=5,
+        critical_checks=1, pending_suggestions=0)
+    current = dict(
+        total_words=10, fuzzy_words=0, translated_words=7,
+        critical_checks=1, pending_suggestions=3)
+    assert (
+        rollup.get_delta(previous, current)
+        == dict(fuzzy_words=-2, translated_words=2, pending_suggestions=3))
+    assert (
+        rollup.get_checks_delta(
+            {(1, "foo"): 2, (2, "bar"): 1},
+            {(1, "foo"): 3, (3, "baz"): 1})
+        == {(1, "foo"): 1, (2, "bar"): -1, (3, "baz"): 1})
+
+
+@pytest.mark.django_db
+def test_data_tp_reconcile(tp0):
+    total_words = tp0.data.total_words
+    assert not TPDataReconciler(tp0).get_drift()
+    TPData.objects.filter(tp=tp0).update(total_words=total_words + 7)
+    drift = TPDataReconciler(tp0).reconcile()
+    assert drift == dict(total_words=(total_words + 7, total_words))
+    tp0.data.refresh_from_db()
+    assert tp0.data.total_words == total_words
+    assert not TPDataReconciler(tp0).get_drift()
@@ -17,7 +17,7 @@ from translate.storage.factory import getclass
 
 from django.contrib.auth import get_user_model
 
-from pootle_fs.files import FSFile
+from pootle_fs.files import FSFile, ParsedStore, parse_fs_file
 from pootle_statistics.models import SubmissionTypes
 from pootle_store.constants import POOTLE_WINS
 
@@ -164,6 +164,36 @@ def test_wrap_store_fs_pull(store_fs_file):
     assert unit_count == len(fs_file.deserialize().units) - 1
 
 
+@pytest.mark.django_db
+def test_wrap_store_fs_pull_parsed(store_fs_file):
+    fs_file = store_fs_file
+    file_units = [
+        unit
+        for unit
+        in fs_file.deserialize().units
+        if not unit.isheader()]
+    assert fs_file.should_pull
+    fs_file.prepare_store()
+    assert fs_file.store
+    parsed = ParsedStore(parse_fs_file(fs_file.parse_job))
+    assert (
+        [(unit.getid(), unit.source, unit.target, unit.isfuzzy())
+         for unit in parsed.units]
+        == [(unit.getid(), unit.source, unit.target, unit.isfuzzy())
+            for unit in file_units])
+    assert parsed.findid(file_units[-1].getid()) is parsed.units[-1]
+    fs_file.pull(parsed=parsed)
+    assert fs_file.store.units.count() == len(file_units)
+    assert (
+        list(fs_file.store.units.values_list("unitid", flat=True))
+        == [unit.getid() for unit in file_units])
+    fs_file.on_sync(
+        fs_file.latest_hash, fs_file.store.data.max_unit_revision)
+    assert not fs_file.should_pull
+    os.unlink(fs_file.file_path)
+    assert parse_fs_file(fs_file.parse_job) is None
+
+
 @pytest.mark.django_db
 def test_wrap_store_fs_read(store_fs_file):
     fs_file = store_fs_file
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import hashlib
+import os
+
+from pootle_fs.finder import TranslationFileFinder
+from pootle_fs.index import FSFileIndex, file_digest
+
+
+def _write_file(root, path, content):
+    file_path = os.path.join(root, path)
+    if not os.path.exists(os.path.dirname(file_path)):
+        os.makedirs(os.path.dirname(file_path))
+    with open(file_path, "w") as f:
+        f.write(content)
+    return file_path
+
+
+def test_fs_file_digest(tmpdir):
+    file_path = _write_file(str(tmpdir), "foo.po", "FOO")
+    assert file_digest(file_path) == hashlib.sha1(b"FOO").hexdigest()
+
+
+def test_fs_file_index_update(tmpdir):
+    root = os.path.join(str(tmpdir), "root")
+    index_path = os.path.join(str(tmpdir), "index", "root.json")
+    foo = _write_file(root, "language0/foo.po", "FOO")
+    _write_file(root, "language1/bar.po", "BAR")
+    index = FSFileIndex(root, index_path)
+    assert index.update() == ["/language0/foo.po", "/language1/bar.po"]
+    assert index.modified
+    assert (
+        index.get_hash("/language0/foo.po")
+        == hashlib.sha1(b"FOO").hexdigest())
+    fs_hash = index.fs_hash
+    index.save()
+    assert not index.modified
+    assert os.listdir(os.path.dirname(index_path)) == ["root.json"]
+
+    # touching a file leaves the digest and tree hash unchanged
+    os.utime(foo, (1, 1))
+    index = FSFileIndex(root, index_path)
+    index.update()
+    assert index.modified
+    assert index.entries["/language0/foo.po"][1] == 1
+    assert index.fs_hash == fs_hash
+
+    # changed content changes the digest
+    _write_file(root, "language0/foo.po", "FOO CHANGED")
+    assert (
+        index.get_hash("/language0/foo.po")
+        == hashlib.sha1(b"FOO CHANGED").hexdigest())
+    assert index.fs_hash != fs_hash
+
+    # removed files are dropped
+    os.unlink(foo)
+    assert index.get_hash("/language0/foo.po") is None
+    assert index.update() == ["/language1/bar.po"]
+    assert index.entries.keys() == ["/language1/bar.po"]
+
+
+def test_fs_file_index_unchanged(tmpdir):
+    root = os.path.join(str(tmpdir), "root")
+    index_path = os.path.join(str(tmpdir), "index", "root.json")
+    _write_file(root, "language0/foo.po", "FOO")
+    index = FSFileIndex(root, index_path)
+    index.update()
+    index.save()
+    index = FSFileIndex(root, index_path)
+    index.update()
+    assert not index.modified
+    # a different root invalidates the index
+    assert not FSFileIndex(str(tmpdir), index_path).entries
+
+
+def test_fs_file_index_bad_index(tmpdir):
+    index_path = _write_file(str(tmpdir), "index.json", "NOT JSON")
+    assert FSFileIndex(str(tmpdir), index_path).entries == {}
+
+
+def test_fs_finder_file_index(tmpdir):
+    root = os.path.join(str(tmpdir), "root")
+    index_path = os.path.join(str(tmpdir), "index", "root.json")
+    _write_file(root, "po/language0.po", "FOO")
+    _write_file(root, "po/language1.po", "BAR")
+    _write_file(root, "other/language2.po", "BAZ")
+    index = FSFileIndex(root, index_path)
+    finder = TranslationFileFinder(
+        os.path.join(root, "po/<language_code>.<ext>"),
+        file_index=index)
+    assert (
+        sorted(file_path for file_path, matched in finder.find())
+        == [os.path.join(root, "po/language0.po"),
+            os.path.join(root, "po/language1.po")])
+    assert os.path.exists(index_path)
+    assert len(index.entries) == 3
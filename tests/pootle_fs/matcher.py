@@ -69,6 +69,7 @@ class DummyFinder(TranslationFileFinder):
 
 
 class DummyContext(object):
+    file_index = None
 
     def __init__(self, project):
         self.project = project
@@ -273,12 +273,13 @@ def test_fs_plugin_sync_all():
             return response
 
         def sync_merge(self, state, response, fs_path=None,
-                       pootle_path=None, update=None):
-            self._merged = (state, response, fs_path, pootle_path)
+                       pootle_path=None, update=None, jobs=None):
+            self._merged = (state, response, fs_path, pootle_path, jobs)
             self.sync_order.append("merge")
 
-        def sync_pull(self, state, response, fs_path=None, pootle_path=None):
-            self._pulled = (state, response, fs_path, pootle_path)
+        def sync_pull(self, state, response, fs_path=None, pootle_path=None,
+                      jobs=None):
+            self._pulled = (state, response, fs_path, pootle_path, jobs)
             self.sync_order.append("pull")
 
         def sync_push(self, state, response, fs_path=None, pootle_path=None):
@@ -305,8 +306,13 @@ def test_fs_plugin_sync_all():
         assert result[1] is response
         assert result[2] == "FOO"
         assert result[3] == "BAR"
+    assert plugin._merged[4] is None
+    assert plugin._pulled[4] is None
     assert plugin._push_response is response
     assert plugin.sync_order == ["rm", "merge", "pull", "push", "plugin_push"]
+    plugin.sync(state, response, jobs=4)
+    assert plugin._merged[4] == 4
+    assert plugin._pulled[4] == 4
 
 
 @pytest.mark.django_db
@@ -350,6 +356,40 @@ def test_fs_plugin_localfs_push(localfs_pootle_staged_real):
                 assert src.read() == target.read()
 
 
+@pytest.mark.django_db
+@pytest.mark.xfail(
+    sys.platform == 'win32',
+    reason="path mangling broken on windows")
+def test_fs_plugin_localfs_pull_jobs(localfs_pootle_staged_real):
+    plugin = localfs_pootle_staged_real
+    plugin.sync()
+    changed = {}
+    for store_fs in plugin.resources.tracked:
+        ttk = store_fs.file.deserialize()
+        unit = [
+            unit
+            for unit
+            in ttk.units
+            if not unit.isheader() and not unit.hasplural()][0]
+        unit.target = "Changed in %s" % store_fs.pootle_path
+        unit.markfuzzy(False)
+        with open(store_fs.file.file_path, "w") as f:
+            f.write(str(ttk))
+        changed[store_fs.pootle_path] = (unit.getid(), unit.target)
+    state = plugin.state()
+    assert len(state["fs_ahead"]) == len(changed)
+    response = plugin.sync(jobs=2)
+    assert len(response["pulled_to_pootle"]) == len(changed)
+    for pootle_path, (unitid, target) in changed.items():
+        store = plugin.resources.stores.get(pootle_path=pootle_path)
+        assert store.findid(unitid).target == target
+    for store_fs in plugin.resources.tracked:
+        assert (
+            store_fs.last_sync_revision
+            == store_fs.store.data.max_unit_revision)
+    assert not [x for x in plugin.state()]
+
+
 @pytest.mark.django_db
 def test_fs_plugin_cache_key(project_fs):
     plugin = project_fs
@@ -763,3 +763,46 @@ def test_grouped_events(store_po):
         for x in GroupedEvents(store_log).sorted_events()]
 
     assert expected == result
+
+
+def _event_key(event):
+    return (
+        event.unit, event.user, event.timestamp, event.action, event.value,
+        event.old_value, event.revision)
+
+
+@pytest.mark.django_db
+def test_grouped_events_paged(store0):
+    store_log = log.get(store0.__class__)(store0)
+    expected = [
+        _event_key(x)
+        for x in sorted(
+            [ComparableLogEvent(ev)
+             for ev in store_log.get_events()],
+            reverse=True)]
+    grouped = GroupedEvents(store_log)
+    assert (
+        [_event_key(x) for x in grouped.sorted_events(reverse=True)]
+        == expected)
+    page = [
+        _event_key(x)
+        for x in grouped.sorted_events(reverse=True, limit=5)]
+    assert page == expected[:5]
+
+
+def test_grouped_events_merge():
+    grouped = GroupedEvents(None)
+    times = [timezone.now() - timedelta(minutes=i) for i in range(6)]
+    sources = [
+        [LogEvent(None, None, t, "a", None) for t in times[::2]],
+        [LogEvent(None, None, t, "b", None) for t in times[1::2]],
+        [LogEvent(None, None, None, "c", None)]]
+    merged = list(
+        grouped.merge_events(
+            [iter(source) for source in sources],
+            reverse=True))
+    assert [ev.timestamp for ev in merged] == times + [None]
+    merged = list(
+        grouped.merge_events(
+            [iter(reversed(source)) for source in sources]))
+    assert [ev.timestamp for ev in merged] == [None] + times[::-1]
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from datetime import timedelta
+
+import pytest
+from mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+
+from pootle.core.delegate import scores
+from pootle.core.utils.timezone import localdate
+from pootle_language.models import Language
+from pootle_score.leaderboard import LeaderboardUpdater
+from pootle_score.models import UserTPScore
+
+
+User = get_user_model()
+
+
+def _top_scores(qs, days=30):
+    return [
+        (score["user__username"], round(score["score__sum"], 2))
+        for score
+        in qs.exclude(
+            user__username__in=User.objects.META_USERS).filter(
+                date__range=(localdate() - timedelta(days), localdate())).values(
+                    "user__username").annotate(
+                        Sum("score")).filter(
+                            score__sum__gt=0).order_by("-score__sum")]
+
+
+def _leaderboard_scores(scorers):
+    return [
+        (score["user__username"], round(score["score__sum"], 2))
+        for score in scorers]
+
+
+@pytest.mark.django_db
+def test_leaderboard_rebuild(settings, language0, tp0, member):
+    settings.POOTLE_SCORE_LEADERBOARDS = True
+    LeaderboardUpdater().rebuild()
+    language_scores = scores.get(language0.__class__)(language0)
+    assert language_scores.leaderboard.context == "language.%s" % language0.id
+    top = language_scores.get_top_scorers()
+    assert (
+        sorted(_leaderboard_scores(top))
+        == sorted(
+            _top_scores(UserTPScore.objects.filter(tp__language=language0))))
+    assert (
+        [score["score__sum"] for score in top]
+        == sorted([score["score__sum"] for score in top], reverse=True))
+    assert language_scores.count_top_scorers() == len(top)
+    assert (
+        _leaderboard_scores(language_scores.leaderboard.get_top(
+            offset=1, limit=2))
+        == _leaderboard_scores(top[1:3]))
+
+    tp_scores = scores.get(tp0.__class__)(tp0)
+    assert (
+        sorted(_leaderboard_scores(tp_scores.get_top_scorers()))
+        == sorted(_top_scores(UserTPScore.objects.filter(tp=tp0))))
+
+    # ranks are 1-based positions in the top scorers
+    for i, score in enumerate(top):
+        user = User.objects.get(username=score["user__username"])
+        assert (
+            language_scores.leaderboard.get_top(offset=i, limit=1)[0]
+            ["user__username"]
+            == user.username)
+        assert language_scores.leaderboard.rank(user.id) <= i + 1
+
+
+@pytest.mark.django_db
+def test_leaderboard_update(settings, tp0, member):
+    settings.POOTLE_SCORE_LEADERBOARDS = True
+    LeaderboardUpdater().rebuild()
+    leaderboard = scores.get(tp0.__class__)(tp0).leaderboard
+    before = dict(_leaderboard_scores(leaderboard.get_top()))
+    today_score, created = UserTPScore.objects.get_or_create(
+        tp=tp0, user=member, date=localdate())
+    today_score.score += 1000
+    today_score.translated += 10
+    LeaderboardUpdater().update([today_score])
+    top = leaderboard.get_top()
+    assert top[0]["user__username"] == member.username
+    assert (
+        round(top[0]["score__sum"], 2)
+        == round(before.get(member.username, 0) + 1000, 2))
+    assert leaderboard.rank(member.id) == 1
+
+    # updates set the daily score, so repeating them changes nothing
+    LeaderboardUpdater().update([today_score])
+    assert (
+        round(leaderboard.get_top()[0]["score__sum"], 2)
+        == round(top[0]["score__sum"], 2))
+
+    # the users top language is taken from the leaderboard
+    user_scores = scores.get(member.__class__)(member)
+    assert user_scores.top_language == (
+        1, Language.objects.get(id=tp0.language_id))
+
+
+@pytest.mark.django_db
+def test_leaderboard_top_language_days(settings, tp0, member, member2):
+    settings.POOTLE_SCORE_LEADERBOARDS = True
+    LeaderboardUpdater().rebuild()
+    member_score, created = UserTPScore.objects.get_or_create(
+        tp=tp0, user=member, date=localdate())
+    member_score.score += 100000
+    member2_score, created = UserTPScore.objects.get_or_create(
+        tp=tp0, user=member2, date=localdate() - timedelta(days=20))
+    member2_score.score += 200000
+    LeaderboardUpdater().update([member_score, member2_score])
+    language = Language.objects.get(id=tp0.language_id)
+    user_scores = scores.get(member.__class__)(member)
+    # the rank is for the same period as the top language
+    assert user_scores.get_top_language(7) == (1, language)
+    assert user_scores.get_top_language(30) == (2, language)
+
+
+@pytest.mark.django_db
+def test_leaderboard_deleted_scores(settings, tp0, member):
+    settings.POOTLE_SCORE_LEADERBOARDS = True
+    LeaderboardUpdater().rebuild()
+    leaderboard = scores.get(tp0.__class__)(tp0).leaderboard
+    member_score, created = UserTPScore.objects.get_or_create(
+        tp=tp0, user=member, date=localdate())
+    member_score.score += 1000
+    LeaderboardUpdater().update([member_score])
+    assert leaderboard.rank(member.id) == 1
+
+    hooks = []
+    with patch("pootle.core.utils.db.transaction.on_commit", hooks.append):
+        UserTPScore.objects.filter(user=member).delete()
+    assert hooks
+    with patch.object(LeaderboardUpdater, "rebuild",
+                      autospec=True,
+                      side_effect=LeaderboardUpdater.rebuild) as rebuild:
+        for hook in hooks:
+            hook()
+    # the leaderboards are rebuilt once
+    assert rebuild.call_count == 1
+    # deleted scores are removed from the leaderboards
+    assert leaderboard.rank(member.id) is None
+    assert (
+        member.username
+        not in dict(_leaderboard_scores(leaderboard.get_top())))
@@ -12,17 +12,21 @@ from mock import PropertyMock, patch
 
 import pytest
 
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
 
 from pootle.core.delegate import event_score, score_updater
 from pootle.core.plugin import provider
 from pootle.core.plugin.results import GatheredDict
 from pootle.core.utils.timezone import localdate
 from pootle_log.utils import LogEvent, StoreLog
-from pootle_score.models import UserStoreScore
+from pootle_score.models import UserStoreScore, UserTPScore
 from pootle_score.updater import (
-    StoreScoreUpdater, TPScoreUpdater, UserScoreUpdater)
+    IncrementalScoreUpdater, StoreScoreUpdater, TPScoreUpdater,
+    UserScoreUpdater, incremental_scores_pending, queue_incremental_scores)
 from pootle_score.utils import to_datetime
+from pootle_store.constants import TRANSLATED, UNTRANSLATED
 from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
 
@@ -386,3 +390,160 @@ def test_score_tp_updater_clear_users(tp0, admin, member):
     assert (
         round(member.score, 2)
         == round(member_score - member_tp_score, 2))
+
+
+def _score_values(score):
+    return dict(
+        (k, getattr(score, k, 0) if score else 0)
+        for k in IncrementalScoreUpdater.score_fields)
+
+
+@pytest.mark.django_db
+def test_score_incremental_updater(store0, member, settings):
+    settings.POOTLE_SCORE_INCREMENTAL = True
+    updater = IncrementalScoreUpdater()
+    # nothing is scored until scores have been refreshed
+    assert updater.get_refreshed() is None
+    assert updater.update() == {}
+    assert updater.get_refreshed()
+    assert not updater.scored_events.exists()
+    today = localdate()
+    store_score = UserStoreScore.objects.filter(
+        store=store0, user=member, date=today)
+    tp_score = UserTPScore.objects.filter(
+        tp=store0.translation_project, user=member, date=today)
+    old_store_score = _score_values(store_score.first())
+    old_tp_score = _score_values(tp_score.first())
+
+    unit = store0.units.filter(state=UNTRANSLATED).first()
+    unit.target = "INCREMENTAL TARGET"
+    unit.state = TRANSLATED
+    unit.save(user=member)
+    scores = updater.update()
+    assert list(scores) == [(store0.id, today, member.id)]
+    added = scores[(store0.id, today, member.id)]
+    assert added["translated"]
+    new_store_score = _score_values(store_score.get())
+    new_tp_score = _score_values(tp_score.get())
+    for k, score in added.items():
+        assert (
+            round(new_store_score[k], 2)
+            == round(old_store_score[k] + score, 2))
+        assert (
+            round(new_tp_score[k], 2)
+            == round(old_tp_score[k] + score, 2))
+
+    assert (
+        sorted(updater.scored_events.filter(
+            event_type="submission").values_list("object_id", flat=True))
+        == sorted(unit.submission_set.values_list("id", flat=True)))
+
+    # events are only scored once
+    assert updater.update() == {}
+    assert _score_values(store_score.get()) == new_store_score
+
+
+@pytest.mark.django_db
+def test_score_incremental_updater_late_events(store0, member):
+    updater = IncrementalScoreUpdater()
+    updater.set_refreshed(timezone.now() - timedelta(hours=2))
+    updater.update()
+    units = store0.units.filter(state=UNTRANSLATED)
+    unit = units.first()
+    unit.target = "INCREMENTAL TARGET"
+    unit.state = TRANSLATED
+    unit.save(user=member)
+    assert updater.update()
+    last_scored = updater.scored_events.aggregate(
+        last_scored=Max("timestamp"))["last_scored"]
+
+    # an event committed after later events were scored is still scored
+    late_unit = units.exclude(pk=unit.pk).first()
+    late_unit.target = "LATE INCREMENTAL TARGET"
+    late_unit.state = TRANSLATED
+    late_unit.save(user=member)
+    late_unit.submission_set.update(
+        creation_time=last_scored - timedelta(minutes=10))
+    scores = updater.update()
+    assert list(scores) == [
+        (store0.id,
+         localdate(last_scored - timedelta(minutes=10)),
+         member.id)]
+    assert updater.update() == {}
+
+    # events scored before the safety window are forgotten
+    old_event = updater.scored_event_model.objects.create(
+        event_type="submission",
+        object_id=0,
+        timestamp=last_scored - timedelta(days=1))
+    updater.update()
+    assert not updater.scored_events.filter(pk=old_event.pk).exists()
+    assert updater.scored_events.filter(timestamp=last_scored).exists()
+
+
+@pytest.mark.django_db
+def test_score_incremental_updater_claim(store0, member):
+    updater = IncrementalScoreUpdater()
+    updater.set_refreshed()
+    unit = store0.units.filter(state=UNTRANSLATED).first()
+    unit.target = "INCREMENTAL TARGET"
+    unit.state = TRANSLATED
+    unit.save(user=member)
+    events = list(updater.get_events(updater.get_refreshed()))
+    assert events
+    # the first event is scored by a concurrent update
+    event_type, event = events[0]
+    updater.scored_event_model.objects.create(
+        event_type=event_type,
+        object_id=event.value.id,
+        timestamp=event.timestamp)
+    assert updater.claim(events) == events[1:]
+    assert updater.claim(events) == []
+
+
+@pytest.mark.django_db
+def test_score_incremental_updater_queued_once():
+    hooks = []
+    with patch("pootle.core.utils.db.transaction.on_commit", hooks.append):
+        with transaction.atomic():
+            assert not incremental_scores_pending()
+            queue_incremental_scores()
+            queue_incremental_scores()
+            assert incremental_scores_pending()
+    with patch("pootle_score.updater.IncrementalScoreUpdater.update") as update:
+        for hook in hooks:
+            hook()
+    assert update.call_count == 1
+
+
+@pytest.mark.django_db
+def test_score_incremental_updater_refreshing(store0, member):
+    updater = IncrementalScoreUpdater()
+    with updater.refreshing() as timestamp:
+        assert updater.get_refreshed() == timestamp
+        assert updater.is_refreshing()
+        unit = store0.units.filter(state=UNTRANSLATED).first()
+        unit.target = "INCREMENTAL TARGET"
+        unit.state = TRANSLATED
+        unit.save(user=member)
+        # events are not scored while refreshing
+        assert updater.update() == {}
+        assert not updater.scored_events.exists()
+    assert not updater.is_refreshing()
+    # events from the start of the refresh are scored after it
+    assert list(updater.update()) == [
+        (store0.id, localdate(), member.id)]
+
+
+@pytest.mark.django_db
+def test_score_store_updater_end(store0, member):
+    unit = store0.units.filter(state=UNTRANSLATED).first()
+    timestamp = timezone.now()
+    unit.target = "REFRESHED TARGET"
+    unit.state = TRANSLATED
+    unit.save(user=member)
+    updater = StoreScoreUpdater(store0)
+    # events from `end` are not counted
+    assert (
+        updater.calculate(end=timestamp)
+        != updater.calculate())
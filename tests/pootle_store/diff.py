@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import difflib
+import logging
+import random
+import time
+from collections import OrderedDict
+
+import pytest
+
+from pootle_store.constants import OBSOLETE, TRANSLATED
+from pootle_store.diff import (
+    DiffableStore, DifflibSequenceMatcher, KeyedSequenceMatcher, StoreDiff)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_opcodes(a, b, opcodes):
+    result = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            result += a[i1:i2]
+        elif tag in ["insert", "replace"]:
+            result += b[j1:j2]
+    return result
+
+
+def _synthetic_unit(unitid, index, state=TRANSLATED, revision=1):
+    return dict(
+        unitid=unitid,
+        id=index,
+        index=index,
+        state=state,
+        revision=revision,
+        source_f=unitid,
+        target_f=unitid,
+        context="",
+        developer_comment="",
+        translator_comment="",
+        locations="")
+
+
+def _synthetic_stores(size, seed=23):
+    rand = random.Random(seed)
+    target_units = OrderedDict()
+    for index in range(1, size + 1):
+        unitid = "unit%s" % index
+        target_units[unitid] = _synthetic_unit(
+            unitid,
+            index,
+            state=(OBSOLETE if not index % 211 else TRANSLATED))
+    source_ids = [
+        unitid
+        for unitid, unit
+        in target_units.items()
+        if unit["state"] != OBSOLETE and rand.random() > 0.01]
+    for added in range(size // 100):
+        source_ids.insert(
+            rand.randint(0, len(source_ids)),
+            "new%s" % added)
+    source_units = OrderedDict()
+    for index, unitid in enumerate(source_ids):
+        source_units[unitid] = (
+            target_units.get(unitid)
+            or _synthetic_unit(unitid, index + 1))
+    return target_units, source_units
+
+
+class SyntheticStoreDiff(StoreDiff):
+
+    def __init__(self, target_units, source_units, matcher_class):
+
+        class SyntheticDiffableStore(DiffableStore):
+            sequence_matcher_class = matcher_class
+            source_unit_class = DiffableStore.db_unit_class
+
+        self.synthetic_diffable = SyntheticDiffableStore(None, None)
+        self.synthetic_diffable.target_units = target_units
+        self.synthetic_diffable.source_units = source_units
+        super(SyntheticStoreDiff, self).__init__(None, None, 0)
+
+    def get_target_revision(self):
+        return 0
+
+    @property
+    def diffable(self):
+        return self.synthetic_diffable
+
+
+def test_keyed_sequence_matcher_opcodes():
+    rand = random.Random(7)
+    for _i in range(500):
+        a = rand.sample(range(60), rand.randint(0, 30))
+        b = (
+            [k for k in a if rand.random() > 0.2]
+            + rand.sample(range(60, 90), rand.randint(0, 5)))
+        if rand.random() < 0.3:
+            rand.shuffle(b)
+        opcodes = KeyedSequenceMatcher(a, b).get_opcodes()
+        assert _apply_opcodes(a, b, opcodes) == b
+        matched = sum(i2 - i1 for tag, i1, i2, j1_, j2_ in opcodes
+                      if tag == "equal")
+        difflib_matched = sum(
+            block.size
+            for block
+            in difflib.SequenceMatcher(None, a, b).get_matching_blocks())
+        # keyed matching finds the longest common subsequence
+        assert matched >= difflib_matched
+
+
+def test_keyed_sequence_matcher_duplicates():
+    a = ["a", "b", "a", "c"]
+    b = ["a", "c", "b", "a"]
+    assert (
+        KeyedSequenceMatcher(a, b).get_opcodes()
+        == DifflibSequenceMatcher(a, b).get_opcodes())
+
+
+def test_keyed_sequence_matcher_empty():
+    assert KeyedSequenceMatcher([], []).get_opcodes() == []
+    assert (
+        KeyedSequenceMatcher([], ["a", "b"]).get_opcodes()
+        == [("insert", 0, 0, 0, 2)])
+    assert (
+        KeyedSequenceMatcher(["a", "b"], []).get_opcodes()
+        == [("delete", 0, 2, 0, 0)])
+
+
+def test_store_diff_default_sequence_matcher():
+    assert DiffableStore.sequence_matcher_class is KeyedSequenceMatcher
+
+
+@pytest.mark.parametrize(
+    "size",
+    [1000,
+     10000,
+     pytest.param(50000, marks=pytest.mark.pootle_benchmark),
+     pytest.param(200000, marks=pytest.mark.pootle_benchmark)])
+def test_store_diff_sequence_matcher_benchmark(size):
+    target_units, source_units = _synthetic_stores(size)
+    results = {}
+    timings = {}
+    for matcher_class in [KeyedSequenceMatcher, DifflibSequenceMatcher]:
+        differ = SyntheticStoreDiff(
+            target_units, source_units, matcher_class)
+        start = time.time()
+        differ.opcodes
+        timings[matcher_class.__name__] = time.time() - start
+        results[matcher_class.__name__] = (
+            differ.insert_points,
+            differ.get_indexes_to_update(),
+            [(unit.unitid, index)
+             for unit, index
+             in differ.get_units_to_add()],
+            differ.get_units_to_obsolete())
+    logger.info(
+        "[diff] %s units: keyed %.3fs difflib %.3fs",
+        size,
+        timings["KeyedSequenceMatcher"],
+        timings["DifflibSequenceMatcher"])
+    assert (
+        results["KeyedSequenceMatcher"]
+        == results["DifflibSequenceMatcher"])
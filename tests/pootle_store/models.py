@@ -6,9 +6,53 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import logging
+import random
+import time
+from hashlib import md5
+
 import pytest
 
 from pootle_store.constants import UNTRANSLATED
+from pootle_store.models import Store, Unit
+
+
+logger = logging.getLogger(__name__)
+
+
+def _index_store(tp, name, size):
+    store = Store.objects.create(
+        name=name,
+        translation_project=tp,
+        parent=tp.directory)
+    Unit.objects.bulk_create(
+        [Unit(store=store,
+              index=index,
+              unitid="unit%s" % index,
+              unitid_hash=md5("unit%s" % index).hexdigest(),
+              source_f="unit%s" % index,
+              state=UNTRANSLATED,
+              revision=1)
+         for index
+         in range(1, size + 1)],
+        batch_size=1000)
+    return store
+
+
+def _store_indexes(store):
+    return list(
+        store.unit_set.order_by("unitid").values_list("unitid", "index"))
+
+
+def _scattered_index_updates(size, seed=23):
+    rand = random.Random(seed)
+    index_updates = []
+    offset = 0
+    for start in sorted(rand.sample(range(1, size + 1), size // 20)):
+        delta = rand.randint(1, 3)
+        index_updates.append((start + offset, delta))
+        offset += delta
+    return index_updates
 
 
 @pytest.mark.django_db
@@ -43,3 +87,52 @@ def test_store_update_source_change_subs(store0, member, system):
     unit.save(user=member)
     created_sub = unit.submission_set.latest()
     assert created_sub.submitter == member
+
+
+@pytest.mark.django_db
+def test_store_stream(store0):
+    assert b"".join(store0.stream()) == store0.serialize()
+    assert (
+        b"".join(store0.stream(include_obsolete=True, raw=True))
+        == store0.serialize(include_obsolete=True, raw=True))
+    assert len(list(store0.stream())) == store0.units.count() + 1
+
+
+@pytest.mark.django_db
+def test_store_update_indexes(tp0):
+    store = _index_store(tp0, "indexes.po", 10)
+    store.update_indexes([(3, 2), (7, 1), (9, 3)])
+    assert (
+        list(store.unit_set.order_by("index").values_list("index", flat=True))
+        == [1, 2, 5, 6, 8, 12, 13, 14, 15, 16])
+    # updates that are out of order are applied as given
+    store.update_indexes([(13, 1), (2, 1)])
+    assert (
+        list(store.unit_set.order_by("index").values_list("index", flat=True))
+        == [1, 3, 6, 7, 9, 13, 15, 16, 17, 18])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "size",
+    [1000,
+     pytest.param(10000, marks=pytest.mark.pootle_benchmark)])
+def test_store_update_indexes_benchmark(tp0, size):
+    index_updates = _scattered_index_updates(size)
+    store = _index_store(tp0, "update_index.po", size)
+    start = time.time()
+    for index_start, delta in index_updates:
+        store.update_index(start=index_start, delta=delta)
+    update_index_time = time.time() - start
+    other_store = _index_store(tp0, "update_indexes.po", size)
+    start = time.time()
+    other_store.update_indexes(index_updates)
+    update_indexes_time = time.time() - start
+    logger.info(
+        "[update_indexes] %s units, %s updates: "
+        "update_index %.3fs update_indexes %.3fs",
+        size,
+        len(index_updates),
+        update_index_time,
+        update_indexes_time)
+    assert _store_indexes(store) == _store_indexes(other_store)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+from mock import patch
+
+from pootle.core.models import Revision
+from pootle.core.search.broker import update_tm_revision
+from pootle_store.tm import TMSuggestions, TMUpdateQueue
+
+
+def _clear_queue(queue):
+    queue.redis.delete(
+        queue.queue_key,
+        queue.processing_key,
+        queue.lock_key,
+        queue.scheduled_key,
+        queue.dropped_key)
+
+
+@pytest.mark.django_db
+@patch("pootle_store.tm.TMUpdateQueue.schedule")
+@patch("pootle_store.tm.get_tm_broker")
+def test_tm_queue_flush(broker_mock, schedule_mock, settings, store0):
+    settings.POOTLE_TM_QUEUE_BATCH_SIZE = 2
+    queue = TMUpdateQueue()
+    _clear_queue(queue)
+    units = list(store0.units.exclude(target_f="")[:3])
+    unit_ids = [unit.id for unit in units]
+    queue.add(unit_ids)
+    # repeated updates are coalesced
+    queue.add(unit_ids[:1])
+    assert schedule_mock.call_count == 2
+    assert queue.size == 3
+    assert queue.lag >= 0
+    assert queue.stats()["dropped"] == 0
+
+    assert queue.flush() == 3
+    assert queue.size == 0
+    assert queue.lag == 0
+    language = store0.translation_project.language.code
+    calls = broker_mock.return_value.bulk_update.call_args_list
+    assert len(calls) == 2
+    assert all(call[0][0] == language for call in calls)
+    assert (
+        sorted(obj["id"] for call in calls for obj in call[0][1])
+        == sorted(unit_ids))
+    assert (
+        [obj for call in calls for obj in call[0][1]
+         if obj["id"] == units[0].id][0]
+        == units[0].get_tm_document())
+
+    # ids left by a dead flusher are recovered
+    queue.add(unit_ids[:1])
+    assert queue.claim() == unit_ids[:1]
+    assert queue.redis.zcard(queue.queue_key) == 0
+    assert queue.flush() == 1
+    assert queue.size == 0
+
+    # only one flusher runs at a time
+    queue.add(unit_ids[:1])
+    queue.redis.set(queue.lock_key, 1)
+    assert queue.flush() is None
+    assert queue.size == 1
+    _clear_queue(queue)
+
+
+@pytest.mark.django_db
+@patch("pootle_store.tm.TMUpdateQueue.schedule")
+@patch("pootle_store.tm.get_tm_broker")
+def test_tm_queue_flush_lock(broker_mock, schedule_mock, settings, store0):
+    settings.POOTLE_TM_QUEUE_BATCH_SIZE = 1
+    queue = TMUpdateQueue()
+    _clear_queue(queue)
+    unit_ids = list(
+        store0.units.exclude(target_f="").values_list("id", flat=True)[:3])
+    queue.add(unit_ids)
+    ttls = []
+
+    def _bulk_update(language, objs):
+        ttls.append(queue.redis.ttl(queue.lock_key))
+        queue.redis.expire(queue.lock_key, 5)
+
+    broker_mock.return_value.bulk_update.side_effect = _bulk_update
+    assert queue.flush() == 3
+    # the lock is renewed after each batch
+    assert len(ttls) == 3
+    assert all(ttl > 5 for ttl in ttls)
+    assert not queue.redis.exists(queue.lock_key)
+
+    def _lose_lock(language, objs):
+        # the lock expires and another flusher takes over
+        queue.redis.set(queue.lock_key, "other")
+
+    broker_mock.return_value.bulk_update.side_effect = _lose_lock
+    queue.add(unit_ids)
+    assert queue.flush() == 0
+    # the batch is left to the other flusher, which keeps its lock
+    assert queue.redis.zcard(queue.processing_key) == 1
+    assert queue.redis.zcard(queue.queue_key) == 2
+    assert queue.redis.get(queue.lock_key) == b"other"
+    _clear_queue(queue)
+
+
+@pytest.mark.django_db
+@patch("pootle_store.tm.TMUpdateQueue.retry_delay", 0)
+@patch("pootle_store.tm.TMUpdateQueue.schedule")
+@patch("pootle_store.tm.get_tm_broker")
+def test_tm_queue_retry(broker_mock, schedule_mock, settings, store0):
+    settings.POOTLE_TM_QUEUE_RETRIES = 2
+    queue = TMUpdateQueue()
+    _clear_queue(queue)
+    unit_ids = list(
+        store0.units.exclude(target_f="").values_list("id", flat=True)[:2])
+    bulk_update = broker_mock.return_value.bulk_update
+    bulk_update.side_effect = [IOError("TM server down"), None]
+    queue.add(unit_ids)
+    assert queue.flush() == 2
+    assert bulk_update.call_count == 2
+    assert queue.dropped == 0
+
+    bulk_update.reset_mock()
+    bulk_update.side_effect = IOError("TM server down")
+    queue.add(unit_ids)
+    assert queue.flush() == 2
+    assert bulk_update.call_count == 3
+    assert queue.dropped == 2
+    assert queue.size == 0
+
+    # updates are dropped rather than blocking when the queue is full
+    settings.POOTLE_TM_QUEUE_MAX_SIZE = 1
+    queue.add(unit_ids[:1])
+    queue.add(unit_ids[1:])
+    assert queue.size == 1
+    assert queue.dropped == 3
+    _clear_queue(queue)
+
+
+@pytest.mark.django_db
+@patch("pootle_store.tm.get_tm_broker")
+def test_tm_suggestions_prefetch(broker_mock, store0):
+    units = list(store0.units.exclude(target_f="")[:3])
+    broker = broker_mock.return_value
+    broker.search_many.side_effect = lambda units: {
+        unit.id: [{"unit_id": unit.id, "score": 1}] for unit in units}
+    suggestions = TMSuggestions()
+    suggestions.cache.delete_many(
+        [suggestions.get_cache_key(unit) for unit in units])
+
+    suggestions.prefetch(units[:2])
+    assert (
+        [unit.id for unit in broker.search_many.call_args[0][0]]
+        == [unit.id for unit in units[:2]])
+    # prefetched units are served from the cache
+    assert suggestions.get(units[0]) == [{"unit_id": units[0].id, "score": 1}]
+    assert broker.search_many.call_count == 1
+    assert suggestions.get(units[2]) == [{"unit_id": units[2].id, "score": 1}]
+    assert broker.search_many.call_count == 2
+
+    # only missing units are searched for
+    suggestions.prefetch(units)
+    assert broker.search_many.call_count == 2
+
+    # other revisions do not invalidate the results
+    Revision.incr()
+    suggestions = TMSuggestions()
+    suggestions.prefetch(units)
+    assert broker.search_many.call_count == 2
+
+    # updating the TM of the language invalidates the results
+    update_tm_revision(units[0].store.translation_project.language.code)
+    suggestions = TMSuggestions()
+    suggestions.prefetch(units)
+    assert broker.search_many.call_count == 3
+    assert len(broker.search_many.call_args[0][0]) == 3
+
+
+@pytest.mark.django_db
+@patch("pootle_store.tm.get_tm_broker")
+def test_tm_suggestions_failed(broker_mock, store0):
+    units = list(store0.units.exclude(target_f="")[:3])
+    broker = broker_mock.return_value
+    # the search of the first unit fails
+    failed = units[0].id
+    broker.search_many.side_effect = lambda units: {
+        unit.id: [{"unit_id": unit.id, "score": 1}]
+        for unit in units
+        if unit.id != failed}
+    suggestions = TMSuggestions()
+    suggestions.cache.delete_many(
+        [suggestions.get_cache_key(unit) for unit in units])
+    suggestions.prefetch(units)
+    assert suggestions.cache.get(suggestions.get_cache_key(units[0])) is None
+    assert suggestions.cache.get(suggestions.get_cache_key(units[1]))
+
+    # failed searches are not cached
+    broker.search_many.side_effect = lambda units: {}
+    assert suggestions.get(units[0]) == []
+    assert suggestions.cache.get(suggestions.get_cache_key(units[0])) is None
+    assert broker.search_many.call_count == 2
+    assert suggestions.get(units[0]) == []
+    assert broker.search_many.call_count == 3
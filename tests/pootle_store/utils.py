@@ -9,6 +9,7 @@
 from collections import OrderedDict
 
 import pytest
+from mock import patch
 
 from translate.filters.decorators import Category
 from translate.misc.multistring import multistring
@@ -19,9 +20,9 @@ from pootle.core.delegate import frozen, lifecycle
 from pootle.core.user import get_system_user
 from pootle_statistics.models import (
     MUTED, UNMUTED, Submission, SubmissionFields, SubmissionTypes)
-from pootle_store.constants import FUZZY, TRANSLATED
+from pootle_store.constants import FUZZY, TRANSLATED, UNTRANSLATED
 from pootle_store.models import QualityCheck, Unit, UnitChange
-from pootle_store.utils import UnitLifecycle
+from pootle_store.utils import UnitLifecycle, update_changed_units
 
 
 @pytest.mark.django_db
@@ -437,3 +438,31 @@ def test_mute_qualitycheck(store_po, member):
 
     sub = unit.submission_set.get(quality_check__id=check_id)
     assert sub.submitter == member
+
+
+@pytest.mark.django_db
+@patch("pootle_store.utils.queue_tm_update")
+@patch("pootle_store.utils.terminology")
+@patch("pootle_store.utils.update_checks")
+def test_update_changed_units(checks_mock, terminology_mock, tm_mock,
+                              settings, store0):
+    settings.POOTLE_TM_QUEUE = True
+    units = list(store0.units.filter(state=TRANSLATED)[:2])
+    units += list(store0.units.filter(state=FUZZY)[:1])
+    units += list(store0.units.filter(state=UNTRANSLATED)[:1])
+    translated = [unit.id for unit in units if unit.state == TRANSLATED]
+    update_changed_units(store0, units)
+    assert (
+        [call[1]["instance"] for call in checks_mock.send.call_args_list]
+        == units)
+    assert list(tm_mock.call_args) == [(translated, ), {}]
+    assert not terminology_mock.get.called
+
+    # translated units of terminology stores are stemmed
+    store0.name = "pootle-terminology.po"
+    update_changed_units(store0, units)
+    assert (
+        [call[0][0]
+         for call
+         in terminology_mock.get.return_value.call_args_list]
+        == [unit for unit in units if unit.state == TRANSLATED])
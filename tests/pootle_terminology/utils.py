@@ -12,7 +12,18 @@ import pytest
 
 from pootle.core.delegate import (
     stemmer, stopwords, terminology, terminology_matcher)
-from pootle_terminology.utils import UnitTerminology
+from pootle_terminology.index import TerminologyIndex
+from pootle_terminology.utils import UnitTerminology, UnitTerminologyMatcher
+
+
+def _term_matches(matches):
+    # the index and the db can pick different units for duplicated terms
+    return sorted(
+        (round(similarity, 6),
+         unit.source_f.lower().strip(),
+         unit.target_f.lower().strip())
+        for similarity, unit
+        in matches)
 
 
 @pytest.mark.django_db
@@ -95,10 +106,11 @@ def test_terminology_matcher(store0, terminology0):
                 and t not in matcher.stopwords)])
     assert matcher.stems == set(matcher.stemmer(t) for t in matcher.tokens)
     assert (
-        matcher.matches
-        == matcher.similar(
-            matcher.terminology_units.filter(
-                stems__root__in=matcher.stems).distinct()))
+        _term_matches(matcher.matches)
+        == _term_matches(
+            matcher.similar(
+                matcher.terminology_units.filter(
+                    stems__root__in=matcher.stems).distinct())))
     unit.source_f = "on the cycle home"
     unit.save()
     matches = []
@@ -119,5 +131,49 @@ def test_terminology_matcher(store0, terminology0):
         matcher.similar(results)
         == sorted(matches, key=lambda x: -x[0])[:matcher.max_matches])
     assert (
-        matcher.matches
-        == matcher.similar(results))
+        _term_matches(matcher.matches)
+        == _term_matches(matcher.similar(results)))
+
+
+@pytest.mark.django_db
+def test_terminology_index(terminology0):
+    language_id = terminology0.language_id
+    index = TerminologyIndex.get(language_id)
+    units = index.terminology_units
+    assert (
+        set(index.terms)
+        == set(
+            unit.id
+            for unit
+            in units
+            if UnitTerminologyMatcher(unit).tokens))
+    for term in index.terms.values():
+        for stem in term.stems:
+            assert term.id in index.postings[stem]
+
+    # cached indexes are reused
+    assert TerminologyIndex.get(language_id) is index
+    loaded = TerminologyIndex(language_id)
+    loaded.loads(index.dumps())
+    assert set(loaded.terms) == set(index.terms)
+    assert loaded.postings == index.postings
+    assert loaded.revision == index.revision
+
+    # changed units are reindexed in a copy of the index
+    unit = units.first()
+    old_term = index.terms.get(unit.id)
+    unit.source_f = "Zebracrossing Yakshaving"
+    unit.save()
+    old_index = index
+    index = TerminologyIndex.get(language_id)
+    assert index is not old_index
+    assert old_index.terms.get(unit.id) is old_term
+    assert index.terms[unit.id].text == unit.source_f
+    assert (
+        index.postings[list(index.terms[unit.id].stems)[0]]
+        == set([unit.id]))
+
+    # deleted units are removed
+    unit.delete()
+    index = TerminologyIndex.get(language_id)
+    assert unit.id not in index.terms
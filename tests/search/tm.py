@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+import pytest
+from mock import patch
+
+from pootle.core.search import SearchBroker
+from pootle.core.search.backends.local import (
+    LocalTMBackend, LocalTMIndex, get_similarity, get_trigrams)
+
+
+def _tm_doc(id, source, target, revision=1):
+    return dict(
+        id=id,
+        revision=revision,
+        project="Project 0",
+        path="/language0/project0/store0.po",
+        source=source,
+        target=target,
+        username="member",
+        fullname="Member",
+        email_md5="")
+
+
+def test_local_tm_trigrams():
+    assert get_trigrams("Ab") == set(["  a", " ab", "ab ", "b  "])
+    assert get_trigrams("") == set(["   "])
+    assert get_similarity("cat", "cat") == 1
+    assert get_similarity("cat", "cut") == 1 - 1 / 3.0
+
+
+def test_local_tm_index(tmpdir):
+    path = os.path.join(str(tmpdir), "tm", "language0.log")
+    index = LocalTMIndex(path)
+    assert index.search("Open the file") == []
+    index.append(
+        [_tm_doc(1, "Open the file", "Abre el fichero"),
+         _tm_doc(2, "Open the files", "Abre los ficheros", revision=3),
+         _tm_doc(3, "Close the window", "Cierra la ventana"),
+         _tm_doc(4, "Open a file", "")])
+    results = index.search("Open the file")
+    assert (
+        [(round(similarity, 4), doc["id"]) for similarity, doc in results]
+        == [(1, 1), (round(1 - 1 / 14.0, 4), 2)])
+    assert index.revision == 3
+
+    # a second index shares the log, and records for an existing id
+    # supersede the previous one
+    other = LocalTMIndex(path)
+    other.append([_tm_doc(2, "Close the windows", "Cierra las ventanas", 4)])
+    results = index.search("Open the file")
+    assert [doc["id"] for similarity, doc in results] == [1]
+    results = index.search("Close the window")
+    assert [doc["id"] for similarity, doc in results] == [3, 2]
+    assert results[1][1]["target"] == "Cierra las ventanas"
+    assert index.revision == 4
+
+    # partially written records are ignored until complete
+    with open(path, "ab") as f:
+        f.write(b'{"id": 5')
+    assert len(index.search("Close the window")) == 2
+    assert len(index.offsets) == 5
+
+    # removing the log resets the index
+    os.unlink(path)
+    assert index.search("Close the window") == []
+    assert index.latest == {}
+
+
+def test_local_tm_index_compact(tmpdir):
+    path = os.path.join(str(tmpdir), "tm", "language0.log")
+    index = LocalTMIndex(path)
+    index.compact()
+    assert not os.path.exists(path)
+    index.append(
+        [_tm_doc(1, "Open the file", "Abre el fichero"),
+         _tm_doc(2, "Close the window", "Cierra la ventana")])
+    index.append(
+        [_tm_doc(1, "Open the file", "Abre el archivo", revision=2)])
+    other = LocalTMIndex(path)
+    assert len(other.search("Open the file")) == 1
+    assert len(other.offsets) == 3
+
+    # superseded records are dropped, and other indexes sharing the log
+    # rebuild their postings
+    index.compact()
+    assert len(index.offsets) == 2
+    results = other.search("Open the file")
+    assert len(other.offsets) == 2
+    assert [doc["target"] for similarity, doc in results] == [
+        "Abre el archivo"]
+    assert other.revision == 2
+    with open(path, "rb") as f:
+        assert len(f.readlines()) == 2
+
+    # appends after compaction go to the compacted log
+    other.append([_tm_doc(3, "Close the windows", "Cierra las ventanas")])
+    assert len(index.search("Close the window")) == 2
+
+
+@pytest.mark.django_db
+def test_local_tm_backend(settings, monkeypatch, tmpdir, store0):
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+            'WEIGHT': 0.5,
+        }}
+    broker = SearchBroker()
+    backend = broker._servers["local"]
+    assert isinstance(backend, LocalTMBackend)
+    assert backend.is_auto_updatable
+    monkeypatch.setattr("pootle_store.models.TM_BROKER", broker)
+    units = list(store0.units.exclude(target_f="")[:2])
+    for unit in units:
+        unit.update_tmserver()
+    unit = units[0]
+    assert backend.languages == [unit.store.translation_project.language.code]
+    assert backend.revision == max(u.revision for u in units)
+
+    # the unit itself is not a valuable hit
+    assert not [
+        result
+        for result
+        in broker.search(unit)
+        if str(result["unit_id"]) == str(unit.id)]
+    unit.id = 0
+    results = broker.search(unit)
+    assert results[0]["unit_id"] == units[0].id
+    assert results[0]["target"] == unit.target
+    assert results[0]["score"] == 50
+    assert results[0]["count"] == 1
+    backend.clear()
+    assert backend.languages == []
+    assert broker.search(unit) == []
+
+
+@pytest.mark.django_db
+def test_tm_broker_search_many(settings, tmpdir, store0):
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+        },
+        'external': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations-external',
+            'WEIGHT': 0.9,
+        }}
+    broker = SearchBroker()
+    units = list(store0.units.exclude(target_f=""))
+    language = store0.translation_project.language.code
+    for server in broker._servers.values():
+        server.bulk_update(
+            language, [unit.get_tm_document() for unit in units[:3]])
+    results = broker.search_many(units)
+    assert sorted(results.keys()) == sorted(unit.id for unit in units)
+    for unit in units:
+        assert results[unit.id] == broker.search(unit)
+
+
+@pytest.mark.django_db
+def test_tm_broker_search_many_failed(settings, tmpdir, store0):
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+        }}
+    broker = SearchBroker()
+    units = list(store0.units.exclude(target_f="")[:2])
+    with patch("pootle.core.search.backends.local.LocalTMIndex.search",
+               side_effect=IOError):
+        # units that could not be searched are left out
+        assert broker.search_many(units) == {}
+        assert broker.search(units[0]) == []
+    assert sorted(broker.search_many(units)) == sorted(u.id for u in units)
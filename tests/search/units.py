@@ -10,6 +10,7 @@ import pytest
 
 from pootle.core.delegate import search_backend
 from pootle.core.plugin import getter
+from pootle.core.url_helpers import split_pootle_path
 from pootle_project.models import Project
 from pootle_statistics.models import Submission, SubmissionTypes
 from pootle_store.getters import get_search_backend
@@ -334,3 +335,179 @@ def test_unit_search_backend_custom():
     search_backend.connect(get_search_backend, sender=Unit)
 
     assert search_backend.get(Unit) is CustomSearchBackend
+
+
+def _search_kwargs(**kwargs):
+    search_kwargs = {
+        "category": None,
+        "checks": [],
+        "soptions": [],
+        "modified-since": None,
+        "month": None,
+        "search": None,
+        "sfields": [],
+        "user": None,
+        "filter": "all",
+        "offset": 0,
+        "count": 5}
+    search_kwargs.update(kwargs)
+    return search_kwargs
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_keyset(admin, settings):
+    settings.POOTLE_SEARCH_SNAPSHOT_TIMEOUT = 0
+    qs = Unit.objects.get_translatable(user=admin).order_by(
+        "store__pootle_path", "index")
+    expected = list(qs.values_list("pk", flat=True))
+    backend = DBSearchBackend(admin, **_search_kwargs())
+    assert backend.keyset_paginated
+    total, start, end, uids = backend.search()
+    assert total == len(expected)
+    assert (start, end) == (0, 10)
+    assert uids == expected[:10]
+
+    # next slice seeks from the last of the previous uids
+    backend = DBSearchBackend(
+        admin,
+        **_search_kwargs(offset=10, previous_uids=uids))
+    assert backend.get_unit_key(uids) == tuple(
+        qs.filter(pk=uids[-1]).values_list(
+            "store__pootle_path", "index", "pk").first())
+    assert backend.get_position(backend.get_unit_key(uids)) == 9
+    total, start, end, uids = backend.search()
+    assert (start, end) == (10, 20)
+    assert uids == expected[10:20]
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_keyset_duplicate_index(admin, store0, settings):
+    settings.POOTLE_SEARCH_SNAPSHOT_TIMEOUT = 0
+    # indexes are not unique, so units sharing one are ordered by pk
+    store0.units.update(index=1)
+    qs = Unit.objects.get_translatable(user=admin).order_by(
+        "store__pootle_path", "index", "pk")
+    expected = list(qs.values_list("pk", flat=True))
+    paged = []
+    total, start, end, uids = DBSearchBackend(
+        admin, **_search_kwargs()).search()
+    while uids:
+        assert start == len(paged)
+        paged += uids
+        total, start, end, uids = DBSearchBackend(
+            admin,
+            **_search_kwargs(offset=end, previous_uids=uids)).search()
+    assert paged == expected
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_find_unit(admin, store0, settings):
+    settings.POOTLE_SEARCH_SNAPSHOT_TIMEOUT = 0
+    language_code, project_code, dir_path, filename = split_pootle_path(
+        store0.pootle_path)
+    path_kwargs = dict(
+        language_code=language_code,
+        project_code=project_code,
+        dir_path=dir_path,
+        filename=filename)
+    qs = Unit.objects.get_translatable(
+        user=admin, **path_kwargs).order_by("store__pootle_path", "index")
+    expected = list(qs.values_list("pk", flat=True))
+    unit_index = len(expected) - 1
+    backend = DBSearchBackend(
+        admin,
+        **_search_kwargs(uids=[expected[unit_index]], **path_kwargs))
+    total, start, end, uids = backend.search()
+    assert total == len(expected)
+    assert start == (unit_index // 10) * 10
+    assert uids == expected[start:start + 10]
+    assert expected[unit_index] in uids
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_cached_total(admin):
+    backend = DBSearchBackend(admin, **_search_kwargs())
+    total = backend.get_total()
+    # paging kwargs dont change the cache key
+    assert (
+        DBSearchBackend(
+            admin,
+            **_search_kwargs(offset=10, count=3)).total_cache_key
+        == backend.total_cache_key)
+    assert (
+        DBSearchBackend(
+            admin,
+            **_search_kwargs(filter="translated")).total_cache_key
+        != backend.total_cache_key)
+    # changing a unit invalidates the total
+    unit = Unit.objects.get_translatable(user=admin).first()
+    unit.makeobsolete()
+    unit.save()
+    assert (
+        DBSearchBackend(admin, **_search_kwargs()).get_total()
+        == total - 1)
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_snapshot(admin, settings):
+    settings.POOTLE_SEARCH_SNAPSHOT_TIMEOUT = 300
+    qs = Unit.objects.get_translatable(user=admin).order_by(
+        "-store__priority", "store__pootle_path", "index")
+    expected = list(qs.values_list("pk", flat=True))
+    sorted_kwargs = dict(sort_by="-store__priority", sort_on="units")
+
+    # results in the default order are keyset paginated without snapshots
+    assert DBSearchBackend(admin, **_search_kwargs()).snapshot is None
+
+    backend = DBSearchBackend(admin, **_search_kwargs(**sorted_kwargs))
+    assert not backend.keyset_paginated
+    assert backend.snapshot == expected
+    assert backend.unpack_uids(backend.pack_uids(expected)) == expected
+    total, start, end, uids = backend.search()
+    assert total == len(expected)
+    assert (start, end) == (0, 10)
+    assert uids == expected[:10]
+
+    # further pages are sliced from the cached snapshot
+    backend = DBSearchBackend(
+        admin,
+        **_search_kwargs(offset=10, previous_uids=uids, **sorted_kwargs))
+    assert backend.snapshot_cache_key == DBSearchBackend(
+        admin, **_search_kwargs(**sorted_kwargs)).snapshot_cache_key
+    total, start, end, uids = backend.search()
+    assert (start, end) == (10, 20)
+    assert uids == expected[10:20]
+
+    # changing a unit outside of the searched path keeps the snapshot
+    unit = qs.get(pk=uids[0])
+    language_code = split_pootle_path(unit.store.pootle_path)[0]
+    language_kwargs = dict(language_code=language_code, **sorted_kwargs)
+    snapshot_key = DBSearchBackend(
+        admin, **_search_kwargs(**language_kwargs)).snapshot_cache_key
+    other_unit = qs.exclude(
+        store__translation_project__language__code=language_code).first()
+    other_unit.target = "changed elsewhere"
+    other_unit.save()
+    assert (
+        DBSearchBackend(
+            admin,
+            **_search_kwargs(**language_kwargs)).snapshot_cache_key
+        == snapshot_key)
+
+    # changing a unit in the searched path invalidates the snapshot
+    unit.makeobsolete()
+    unit.save()
+    assert (
+        DBSearchBackend(
+            admin,
+            **_search_kwargs(**language_kwargs)).snapshot_cache_key
+        != snapshot_key)
+    expected.remove(unit.pk)
+    backend = DBSearchBackend(
+        admin,
+        **_search_kwargs(offset=20, previous_uids=uids, **sorted_kwargs))
+    assert backend.snapshot == expected
+    total, start, end, uids = backend.search()
+    assert total == len(expected)
+    assert (start, end) == (19, 29)
+    assert uids == expected[19:29]
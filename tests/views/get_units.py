@@ -10,6 +10,7 @@ import json
 from urlparse import parse_qs
 
 import pytest
+from mock import patch
 
 from pytest_pootle.search import calculate_search_results
 
@@ -245,3 +246,30 @@ def test_get_next_slice(client, request_users):
 
     assert uids3 == list(
         qs[start:end].values_list("pk", flat=True))
+
+
+@pytest.mark.django_db
+@patch("pootle_store.tm.get_tm_broker")
+def test_get_units_tm_prefetch(broker_mock, client, settings):
+    settings.POOTLE_TM_SERVER = {
+        "local": {
+            "ENGINE": "pootle.core.search.backends.LocalTMBackend"}}
+    broker = broker_mock.return_value
+    broker.search_many.side_effect = lambda units: {
+        unit.id: [] for unit in units}
+    client.login(username="admin", password="admin")
+    resp = client.get(
+        "/xhr/units/?filter=all&count=5&path=/",
+        HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    assert resp.status_code == 200
+    result = json.loads(resp.content)
+    uids = [
+        unit["id"]
+        for group in result["unitGroups"]
+        for group_data in group.values()
+        for unit in group_data["units"]]
+    assert uids
+    prefetched = set()
+    for call in broker.search_many.call_args_list:
+        prefetched |= set(unit.id for unit in call[0][0])
+    assert prefetched <= set(uids)